@@ -0,0 +1,91 @@
+# Compare the delivery latency of the blocking and asyncio listener modes
+# against a fake notification channel fed from a producer thread.
+#
+#   python3 -m benchmarks.aio_latency
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from lttng_listen import aio, fake
+from lttng_listen.channel import NotificationChannel
+
+
+def produce(ctl, count, rate):
+    period = 1.0 / rate
+    for i in range(count):
+        ctl.emit(ctl.rotation_completed("session", i, "/tmp/archive"))
+        time.sleep(period)
+
+
+def report(mode, latencies):
+    latencies.sort()
+    print(
+        "{}: p50 {:.1f} us, p99 {:.1f} us, max {:.1f} us".format(
+            mode,
+            statistics.median(latencies) * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6,
+            latencies[-1] * 1e6,
+        )
+    )
+
+
+# Record, for every received notification, the time elapsed since the fake
+# session daemon emitted it.
+def instrument(ctl, latencies):
+    get_next = ctl.lttng_notification_channel_get_next_notification
+
+    def timed_get_next(channel, out):
+        status = get_next(channel, out)
+        latencies.append(time.perf_counter() - out[0].sent)
+        return status
+
+    ctl.lttng_notification_channel_get_next_notification = timed_get_next
+
+
+def blocking(count, rate):
+    ffi, ctl = fake.load()
+    channel = NotificationChannel(ffi, ctl)
+    latencies = []
+    instrument(ctl, latencies)
+
+    producer = threading.Thread(target=produce, args=(ctl, count, rate))
+    producer.start()
+    for _ in range(count):
+        channel.next()
+
+    producer.join()
+    channel.close()
+    return latencies
+
+
+def asynchronous(count, rate):
+    ffi, ctl = fake.load()
+    channel = NotificationChannel(ffi, ctl)
+    latencies = []
+    instrument(ctl, latencies)
+
+    async def consume():
+        received = 0
+        async for _ in aio.notifications(channel):
+            received += 1
+            if received == count:
+                return
+
+    producer = threading.Thread(target=produce, args=(ctl, count, rate))
+    producer.start()
+    asyncio.run(consume())
+    producer.join()
+    channel.close()
+    return latencies
+
+
+parser = argparse.ArgumentParser(description="Listener latency benchmark.")
+parser.add_argument("--count", type=int, default=2000)
+parser.add_argument("--rate", type=float, default=1000.0, help="notifications/s")
+args = parser.parse_args()
+
+report("blocking", blocking(args.count, args.rate))
+report("async", asynchronous(args.count, args.rate))
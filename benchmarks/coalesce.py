@@ -0,0 +1,112 @@
+# Feed aligned bursts of buffer usage and rotation notifications from many
+# sessions through the coalescer, and compare the handler calls and the
+# latency it adds with handling every notification. With coalescing, the
+# handlers are either called once per record or once per group.
+#
+#   python3 -m benchmarks.coalesce
+
+import argparse
+import statistics
+import time
+
+from lttng_listen.coalesce import Coalesced, Coalescer, expand
+from lttng_listen.dispatch import Dispatcher
+from lttng_listen.notification import BufferUsageHigh, RotationCompleted
+
+
+def bursts(sessions, samples, rotations):
+    for i in range(sessions):
+        name = "session-{}".format(i)
+        for j in range(samples):
+            yield BufferUsageHigh, (name, "channel0", j, 0.8)
+        for j in range(rotations):
+            yield RotationCompleted, (name, j, "/tmp/{}/{}".format(name, j))
+
+
+def run(args, window, coalesced):
+    calls = 0
+    latencies = []
+
+    # The handler calls, and the latency of every record when it is handled.
+    def handler(record):
+        nonlocal calls
+        calls += 1
+        now = time.monotonic_ns()
+        if type(record) is Coalesced:
+            latencies.extend(now - r.timestamp for r in record.records)
+        else:
+            latencies.append(now - record.timestamp)
+
+    dispatch = Dispatcher()
+    if window is not None and coalesced:
+        dispatch.register(RotationCompleted.condition_type, handler)
+        dispatch.register(BufferUsageHigh.condition_type, expand(handler))
+    else:
+        dispatch.register_all(expand(handler))
+
+    coalescer = None
+    if window is not None:
+        coalescer = Coalescer(dispatch.dispatch_batch, window, args.max_size)
+        coalescer.start()
+
+    received = 0
+    start = time.perf_counter()
+    for _ in range(args.bursts):
+        burst = list(bursts(args.sessions, args.samples, args.rotations))
+        received += len(burst)
+        # The receive loop hands the records over by batch, as they arrive.
+        for i in range(0, len(burst), args.batch):
+            now = time.monotonic_ns()
+            batch = [
+                record(*fields, now) for record, fields in burst[i : i + args.batch]
+            ]
+            if coalescer is None:
+                dispatch.dispatch_batch(batch)
+            else:
+                coalescer.extend(batch)
+        time.sleep(args.period)
+    if coalescer is not None:
+        coalescer.close()
+    elapsed = time.perf_counter() - start - args.bursts * args.period
+
+    latencies.sort()
+    return (
+        received,
+        calls,
+        statistics.median(latencies) / 1e6,
+        latencies[int(len(latencies) * 0.99)] / 1e6,
+        received / elapsed,
+    )
+
+
+parser = argparse.ArgumentParser(description="Coalescing benchmark.")
+parser.add_argument("--sessions", type=int, default=2000)
+parser.add_argument("--samples", type=int, default=4, help="samples per burst")
+parser.add_argument("--rotations", type=int, default=4, help="rotations per burst")
+parser.add_argument("--bursts", type=int, default=5)
+parser.add_argument("--period", type=float, default=0.5, help="seconds")
+parser.add_argument("--batch", type=int, default=256, help="notifications/wakeup")
+parser.add_argument("--window", type=float, nargs="+", default=[0.01, 0.1])
+parser.add_argument("--max-size", type=int, default=64)
+args = parser.parse_args()
+
+runs = [(None, False)] + [
+    (window, coalesced) for window in args.window for coalesced in (False, True)
+]
+for window, coalesced in runs:
+    received, calls, p50, p99, rate = run(args, window, coalesced)
+    print(
+        "{}: {} notifications, {} handler calls, latency p50 {:.2f} ms, "
+        "p99 {:.2f} ms, {:.0f} notifications/s".format(
+            "no coalescing"
+            if window is None
+            else "window {} s, {}".format(
+                window, "rotations by group" if coalesced else "rotations by record"
+            ),
+            received,
+            calls,
+            p50,
+            p99,
+            rate,
+        )
+    )
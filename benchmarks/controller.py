@@ -0,0 +1,187 @@
+# Play recorded (or generated) buffer usage curves through a simulated
+# session daemon and compare the adaptive rotation controller with plain
+# size-based rotations.
+#
+#   python3 -m benchmarks.controller [--curves FILE.csv]
+#
+# Curves are CSV rows of "session,time,usage_ratio,consumed_bytes", sorted
+# by time. A usage ratio above 1 stands for data that did not fit in the
+# buffers (discarded events in the recording). The simulation model: a
+# rotation drains the buffers of the session (its usage falls to 0 once the
+# rotation completes), after which the usage follows the variations of the
+# recorded curve. Whatever does not fit in the buffers is dropped. As with
+# the session daemon, a consumed size notification is only sent when the
+# consumed size of a session crosses the threshold of its trigger, which
+# the controllers move after each notification.
+
+import argparse
+import collections
+import csv
+import math
+import random
+
+from lttng_listen.controller import RotationController
+from lttng_listen.notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+)
+
+
+def generate_curves(sessions, duration, step, seed):
+    rng = random.Random(seed)
+    curves = collections.defaultdict(list)
+    for i in range(sessions):
+        name = "session-{}".format(i)
+        period = rng.uniform(60, 300)
+        phase = rng.uniform(0, period)
+        rate = rng.uniform(1, 4) * 1024 * 1024
+        consumed = 0
+        t = 0.0
+        while t < duration:
+            burst = math.sin(2 * math.pi * (t + phase) / period)
+            usage = max(0.5 + 0.7 * burst + rng.gauss(0, 0.05), 0.0)
+            consumed += int(rate * step * (1 + max(burst, 0) * 3))
+            curves[name].append((t, usage, consumed))
+            t += step
+    return curves
+
+
+def load_curves(path):
+    curves = collections.defaultdict(list)
+    with open(path) as f:
+        for session, t, usage, consumed in csv.reader(f):
+            curves[session].append((float(t), float(usage), int(consumed)))
+    return curves
+
+
+class SimulatedSessiond:
+    def __init__(self, curves, high, low, capacity, rotation_latency, threshold):
+        self._curves = curves
+        self._high = high
+        self._low = low
+        self._capacity = capacity
+        self._rotation_latency = rotation_latency
+        self.now = 0.0
+        self.dropped = 0
+        self.rotations = 0
+        self._usage = {name: 0.0 for name in curves}
+        self._pending = {}
+        self._rotation_ids = collections.Counter()
+        self._thresholds = {name: threshold for name in curves}
+        self._armed = {name: True for name in curves}
+        self.notifications = 0
+        self.rearms = 0
+
+    def rotate(self, session_name):
+        if session_name in self._pending:
+            return False
+        self._pending[session_name] = self.now + self._rotation_latency
+        self.rotations += 1
+        return True
+
+    def rearm(self, session_name, threshold):
+        self._thresholds[session_name] = threshold
+        self._armed[session_name] = True
+        self.rearms += 1
+        return True
+
+    def run(self, handle):
+        events = sorted(
+            (t, name, usage, consumed, previous)
+            for name, curve in self._curves.items()
+            for (t, usage, consumed), previous in zip(curve, [None] + curve[:-1])
+        )
+        for t, name, recorded, consumed, previous in events:
+            self.now = t
+            if name in self._pending and self._pending[name] <= t:
+                del self._pending[name]
+                self._usage[name] = 0.0
+                self._rotation_ids[name] += 1
+                handle(
+                    RotationCompleted(name, self._rotation_ids[name], "", int(t * 1e9))
+                )
+
+            before = self._usage[name]
+            delta = recorded - previous[1] if previous else recorded
+            after = before + delta
+            if after > 1.0:
+                self.dropped += int((after - 1.0) * self._capacity)
+                after = 1.0
+            after = max(after, 0.0)
+            self._usage[name] = after
+
+            stamp = int(t * 1e9)
+            usage = int(after * self._capacity)
+            if before < self._high <= after:
+                handle(BufferUsageHigh(name, "channel0", usage, after, stamp))
+            elif before > self._low >= after:
+                handle(BufferUsageLow(name, "channel0", usage, after, stamp))
+            if self._armed[name] and consumed >= self._thresholds[name]:
+                self._armed[name] = False
+                self.notifications += 1
+                handle(ConsumedSize(name, consumed, stamp))
+
+
+def simulate(curves, args, adaptive):
+    sessiond = SimulatedSessiond(
+        curves,
+        args.high,
+        args.low,
+        args.capacity,
+        args.rotation_latency,
+        args.target_size,
+    )
+    controller = RotationController(
+        sessiond.rotate,
+        args.target_size,
+        args.min_interval,
+        min_factor=0.125 if adaptive else 1.0,
+        clock=lambda: sessiond.now,
+        rearm=sessiond.rearm,
+    )
+    sessiond.run(controller)
+    return sessiond
+
+
+parser = argparse.ArgumentParser(description="Rotation controller benchmark.")
+parser.add_argument("--curves", help="CSV file of recorded usage curves")
+parser.add_argument("--sessions", type=int, default=50)
+parser.add_argument("--duration", type=float, default=3600.0, help="seconds")
+parser.add_argument("--step", type=float, default=1.0, help="seconds")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--target-size", type=int, default=512 * 1024 * 1024)
+parser.add_argument("--min-interval", type=float, default=5.0)
+parser.add_argument("--high", type=float, default=0.75)
+parser.add_argument("--low", type=float, default=0.25)
+parser.add_argument("--capacity", type=int, default=64 * 1024 * 1024)
+parser.add_argument("--rotation-latency", type=float, default=2.0)
+args = parser.parse_args()
+
+if args.curves:
+    curves = load_curves(args.curves)
+else:
+    curves = generate_curves(args.sessions, args.duration, args.step, args.seed)
+duration = max(curve[-1][0] for curve in curves.values()) or 1.0
+
+results = {}
+for name, adaptive in (("size-based", False), ("adaptive", True)):
+    sessiond = simulate(curves, args, adaptive)
+    results[name] = sessiond
+    print(
+        "{}: {} rotations ({:.2f}/session/hour), {:.1f} MiB dropped, "
+        "{} consumed size notifications, {} rearms".format(
+            name,
+            sessiond.rotations,
+            sessiond.rotations / len(curves) / duration * 3600,
+            sessiond.dropped / (1024 * 1024),
+            sessiond.notifications,
+            sessiond.rearms,
+        )
+    )
+
+baseline = results["size-based"].dropped
+if baseline:
+    avoided = 1 - results["adaptive"].dropped / baseline
+    print("drops avoided: {:.1%}".format(avoided))
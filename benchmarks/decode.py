@@ -0,0 +1,48 @@
+# Compare the cost of decoding whole notifications, whose session names are
+# interned by the decoder, with reading only the session name from a lazy
+# notification view.
+#
+#   python3 -m benchmarks.decode
+
+import argparse
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+
+
+def backlog(count, sessions):
+    ffi, ctl = fake.load()
+    channel = NotificationChannel(ffi, ctl)
+    for i in range(count):
+        ctl.emit(
+            ctl.rotation_completed(
+                "session-{}".format(i % sessions), i, "/tmp/archives/{}".format(i)
+            )
+        )
+    ctl.emit(fake.CLOSED)
+    return channel
+
+
+def records(count, sessions):
+    channel = backlog(count, sessions)
+    start = time.perf_counter()
+    names = [record.session_name for record in channel]
+    return time.perf_counter() - start, len(names)
+
+
+def views(count, sessions):
+    channel = backlog(count, sessions)
+    start = time.perf_counter()
+    names = [view.session_name for view in channel.views()]
+    return time.perf_counter() - start, len(names)
+
+
+parser = argparse.ArgumentParser(description="Notification decoding benchmark.")
+parser.add_argument("--count", type=int, default=200000)
+parser.add_argument("--sessions", type=int, default=300)
+args = parser.parse_args()
+
+for name, run in (("records", records), ("views, session name only", views)):
+    elapsed, received = min(run(args.count, args.sessions) for _ in range(3))
+    print("{}: {:.0f} notifications/s".format(name, received / elapsed))
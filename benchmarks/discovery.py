@@ -0,0 +1,76 @@
+# Measure the cost of a change of the monitored session set: restarting the
+# listener (new channel, every subscription set up again, warm trigger cache)
+# against updating the subscriptions of the running channel incrementally.
+#
+#   python3 -m benchmarks.discovery
+
+import argparse
+import os
+import tempfile
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.discovery import SubscriptionSet
+from lttng_listen.triggers import (
+    ConditionSpec,
+    RegistrationCache,
+    setup_conditions,
+)
+
+
+def make_specs(session_name):
+    return [
+        ConditionSpec("rotation-completed", session_name),
+        ConditionSpec("consumed-size", session_name, threshold=1 << 30),
+    ]
+
+
+def restart(ffi, ctl, names, cache):
+    start = time.perf_counter()
+    channel = NotificationChannel(ffi, ctl)
+    specs = [spec for name in names for spec in make_specs(name)]
+    setup_conditions(ffi, ctl, channel, specs, cache)
+    elapsed = time.perf_counter() - start
+    channel.close()
+    return elapsed
+
+
+parser = argparse.ArgumentParser(description="Session discovery benchmark.")
+parser.add_argument("--sessions", type=int, default=1000)
+parser.add_argument("--changes", type=int, nargs="+", default=[1, 10, 100])
+parser.add_argument("--latency", type=float, default=0.0002, help="seconds")
+args = parser.parse_args()
+
+ffi, ctl = fake.load(args.latency)
+names = ["session-{}".format(i) for i in range(args.sessions)]
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    cache = RegistrationCache(os.path.join(tmp_dir, "triggers.json"))
+    channel = NotificationChannel(ffi, ctl)
+    subscriptions = SubscriptionSet(ffi, ctl, channel, make_specs, cache)
+    subscriptions.update(names)
+
+    for changes in args.changes:
+        # Replace `changes` sessions by new ones.
+        current = subscriptions.sessions()
+        replaced = sorted(current)[:changes]
+        new = ["new-{}-{}".format(changes, i) for i in range(changes)]
+        target = (current - set(replaced)) | set(new)
+
+        # Warm the cache for the new sessions, as a restart would find it.
+        restart_time = restart(ffi, ctl, sorted(target), cache)
+
+        start = time.perf_counter()
+        added, removed = subscriptions.update(target)
+        update_time = time.perf_counter() - start
+        assert len(added) == len(removed) == changes
+
+        print(
+            "{} of {} sessions changed: restart {:.1f} ms, "
+            "incremental {:.1f} ms".format(
+                changes, args.sessions, restart_time * 1e3, update_time * 1e3
+            )
+        )
+
+    channel.close()
@@ -0,0 +1,60 @@
+# Measure notifications/s when a synthetic backlog is consumed one
+# notification at a time and in drained batches, each flushed to a file,
+# as the listener flushes its output before waiting for notifications.
+#
+#   python3 -m benchmarks.drain
+
+import argparse
+import os
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+
+
+def backlog(count):
+    ffi, ctl = fake.load()
+    channel = NotificationChannel(ffi, ctl)
+    for i in range(count):
+        ctl.emit(ctl.rotation_completed("session-{}".format(i % 100), i, "/tmp/a"))
+    return channel
+
+
+def format_notification(notification):
+    return "Completed trace archive chunk for session {} available at: {}".format(
+        notification.session_name, notification.archive_path
+    )
+
+
+def one_at_a_time(count):
+    channel = backlog(count)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as out:
+        for _ in range(count):
+            out.write(format_notification(channel.next()) + "\n")
+            out.flush()
+    return time.perf_counter() - start
+
+
+def batched(count):
+    channel = backlog(count)
+    start = time.perf_counter()
+    received = 0
+    with open(os.devnull, "w") as out:
+        for batch in channel.batches():
+            out.write("".join(format_notification(n) + "\n" for n in batch))
+            out.flush()
+            received += len(batch)
+            if received == count:
+                break
+    return time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser(description="Backlog drain benchmark.")
+parser.add_argument("--count", type=int, default=100000)
+parser.add_argument("--runs", type=int, default=5, help="best of")
+args = parser.parse_args()
+
+for name, consume in (("one-at-a-time", one_at_a_time), ("batched", batched)):
+    elapsed = min(consume(args.count) for _ in range(args.runs))
+    print("{}: {:.0f} notifications/s".format(name, args.count / elapsed))
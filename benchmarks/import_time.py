@@ -0,0 +1,93 @@
+# Measure the cold-start cost of importing the package, the listener and the
+# command line, and list the slowest modules they import.
+#
+#   python3 -m benchmarks.import_time
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+STATEMENTS = (
+    "import lttng_listen",
+    "from lttng_listen import Listener",
+    "import lttng_listen.cli",
+)
+
+# Modules which must only be imported when used.
+LAZY = ("asyncio", "multiprocessing", "cffi", "http.server", "inspect")
+
+
+def run_python(args):
+    return subprocess.run(
+        [sys.executable] + args,
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+
+
+def cold_import(statement, runs):
+    in_process = []
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = run_python(["-c", IMPORT.format(statement=statement)])
+        wall.append(time.perf_counter() - start)
+        in_process.append(float(out.stdout))
+
+    return statistics.median(in_process), statistics.median(wall)
+
+
+def cold_help(runs):
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_python(["lttng-listen.py", "--help"])
+        wall.append(time.perf_counter() - start)
+    return statistics.median(wall)
+
+
+# Return the modules imported by `statement`, by cumulative import time.
+def import_times(statement):
+    out = run_python(["-X", "importtime", "-c", statement])
+    modules = []
+    for line in out.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)
+
+
+parser = argparse.ArgumentParser(description="Import time benchmark.")
+parser.add_argument("--runs", type=int, default=20)
+parser.add_argument("--top", type=int, default=10, help="slowest modules listed")
+args = parser.parse_args()
+
+for statement in STATEMENTS:
+    import_time, wall_time = cold_import(statement, args.runs)
+    print(
+        "{}: import {:.2f} ms, process {:.2f} ms".format(
+            statement, import_time * 1e3, wall_time * 1e3
+        )
+    )
+print("lttng-listen.py --help: process {:.2f} ms".format(cold_help(args.runs) * 1e3))
+
+modules = import_times("import lttng_listen.cli")
+eager = sorted({name for _, name in modules if name in LAZY})
+if eager:
+    print("Imported eagerly: {}".format(", ".join(eager)))
+print("Slowest modules imported by the command line:")
+for cumulative, name in modules[: args.top]:
+    print("  {:.2f} ms {}".format(cumulative / 1e3, name))
@@ -0,0 +1,83 @@
+# Measure the discovery of the triggers of the session daemon: listing them
+# once and subscribing to the selected ones, against registering the
+# triggers of every session again.
+#
+#   python3 -m benchmarks.inventory
+
+import argparse
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.inventory import TriggerInventory, subscribe_triggers
+from lttng_listen.triggers import ConditionSpec, setup_conditions
+
+
+def populate(ctl, count):
+    kinds = [
+        ctl.lttng_condition_session_rotation_completed_create,
+        ctl.lttng_condition_session_consumed_size_create,
+        ctl.lttng_condition_buffer_usage_high_create,
+        ctl.lttng_condition_buffer_usage_low_create,
+    ]
+    for i in range(count):
+        condition = kinds[i % len(kinds)]()
+        condition.session_name = "session-{}".format(i // len(kinds)).encode("utf-8")
+        if i % 3:
+            action = ctl.lttng_action_notify_create()
+        else:
+            action = fake.Action(
+                ctl.LTTNG_ACTION_TYPE_GROUP,
+                [
+                    fake.Action(ctl.LTTNG_ACTION_TYPE_ROTATE_SESSION),
+                    ctl.lttng_action_notify_create(),
+                ],
+            )
+        ctl.triggers.append(
+            fake.Trigger("trigger{}".format(i).encode("utf-8"), condition, action)
+        )
+
+
+parser = argparse.ArgumentParser(description="Trigger discovery benchmark.")
+parser.add_argument("--triggers", type=int, default=10000)
+parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+args = parser.parse_args()
+
+ffi, ctl = fake.load(args.latency)
+populate(ctl, args.triggers)
+
+for glob in (None, "session-1*"):
+    channel = NotificationChannel(ffi, ctl)
+    start = time.perf_counter()
+    inventory = TriggerInventory(ffi, ctl)
+    listed = time.perf_counter()
+    selected = inventory.select(session_glob=glob)
+    subscribed = subscribe_triggers(channel, selected)
+    end = time.perf_counter()
+    print(
+        "{} triggers, glob {}: list {:.1f} ms, select + subscribe {:.1f} ms "
+        "({} subscriptions)".format(
+            len(inventory.entries),
+            glob,
+            (listed - start) * 1e3,
+            (end - listed) * 1e3,
+            len(subscribed),
+        )
+    )
+    inventory.close()
+    channel.close()
+
+# The same rotation completed conditions, registered session by session.
+channel = NotificationChannel(ffi, ctl)
+specs = [
+    ConditionSpec("rotation-completed", "session-{}".format(i))
+    for i in range((args.triggers + 3) // 4)
+]
+start = time.perf_counter()
+setup_conditions(ffi, ctl, channel, specs)
+print(
+    "{} rotation completed triggers registered: {:.1f} ms".format(
+        len(specs), (time.perf_counter() - start) * 1e3
+    )
+)
+channel.close()
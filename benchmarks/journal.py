@@ -0,0 +1,70 @@
+# Measure the throughput of the journal with group commit, when records are
+# appended in bursts, against one fsync per record, when every record waits
+# for the previous one to be committed. Also reports the cost of append()
+# on the receive path.
+#
+#   python3 -m benchmarks.journal [--directory DIR]
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from lttng_listen.journal import Journal
+from lttng_listen.notification import RotationCompleted
+
+
+def records(count):
+    return [
+        RotationCompleted(
+            "session-{}".format(i % 100),
+            i,
+            "/var/lib/lttng/session-{}/archives/chunk-{}".format(i % 100, i),
+            0,
+        )
+        for i in range(count)
+    ]
+
+
+def run(directory, batch, count):
+    delivered = threading.Semaphore(0)
+    journal = Journal(directory)
+    journal.start(lambda record: (journal.ack(record), delivered.release()))
+
+    latencies = []
+    start = time.perf_counter()
+    pending = records(count)
+    for i in range(0, count, batch):
+        for record in pending[i : i + batch]:
+            before = time.perf_counter()
+            journal.append(record)
+            latencies.append(time.perf_counter() - before)
+        for _ in range(min(batch, count - i)):
+            delivered.acquire()
+    elapsed = time.perf_counter() - start
+
+    journal.close()
+    return elapsed, journal.commits, latencies
+
+
+parser = argparse.ArgumentParser(description="Journal throughput benchmark.")
+parser.add_argument("--count", type=int, default=2000)
+parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 256])
+parser.add_argument("--directory", help="Journal directory (default: a temporary one)")
+args = parser.parse_args()
+
+for batch in args.batches:
+    with tempfile.TemporaryDirectory(dir=args.directory) as tmp_dir:
+        elapsed, commits, latencies = run(tmp_dir, batch, args.count)
+    latencies.sort()
+    print(
+        "bursts of {}: {:.0f} records/s, {} fsync(s), append p50 {:.1f} us, "
+        "p99 {:.1f} us".format(
+            batch,
+            args.count / elapsed,
+            commits,
+            statistics.median(latencies) * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6,
+        )
+    )
@@ -0,0 +1,95 @@
+# Compare the mmap-based manifest builder with a naive read() implementation
+# on generated CTF-like stream files.
+#
+#   python3 -m benchmarks.manifest --size 4096   # MiB per stream file
+
+import argparse
+import hashlib
+import os
+import struct
+import tempfile
+import time
+import tracemalloc
+
+from lttng_listen.manifest import (
+    CTF_MAGIC,
+    PACKET_HEADER_SIZE,
+    PACKET_SIZE_OFFSET,
+    TIMESTAMP_BEGIN_OFFSET,
+    build_manifest,
+)
+
+
+# Only the packet headers are written: the rest of the file is a hole.
+def make_stream(path, size, packet_size):
+    header = bytearray(PACKET_HEADER_SIZE)
+    struct.pack_into("<I", header, 0, CTF_MAGIC)
+    struct.pack_into("<Q", header, PACKET_SIZE_OFFSET, packet_size * 8)
+
+    with open(path, "wb") as f:
+        for offset in range(0, size, packet_size):
+            f.seek(offset)
+            f.write(header)
+        f.truncate(size)
+
+
+def naive_manifest(path, algorithm="sha256"):
+    files = {}
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            with open(file_path, "rb") as f:
+                data = f.read()
+
+            packets = []
+            offset = 0
+            while offset + PACKET_HEADER_SIZE <= len(data):
+                header = data[offset : offset + PACKET_HEADER_SIZE]
+                if struct.unpack_from("<I", header)[0] != CTF_MAGIC:
+                    break
+                size = struct.unpack_from("<Q", header, PACKET_SIZE_OFFSET)[0] // 8
+                begin, end = struct.unpack_from("<QQ", header, TIMESTAMP_BEGIN_OFFSET)
+                packets.append((offset, size, begin, end))
+                offset += size
+
+            files[os.path.relpath(file_path, path)] = {
+                "size": len(data),
+                "digest": hashlib.new(algorithm, data).hexdigest(),
+                "packets": packets,
+            }
+    return files
+
+
+def measure(function, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+parser = argparse.ArgumentParser(description="Chunk manifest benchmark.")
+parser.add_argument("--size", type=int, default=2048, help="MiB per stream file")
+parser.add_argument("--streams", type=int, default=2)
+parser.add_argument("--packet-size", type=int, default=1024 * 1024)
+args = parser.parse_args()
+
+with tempfile.TemporaryDirectory() as chunk:
+    os.mkdir(os.path.join(chunk, "kernel"))
+    for i in range(args.streams):
+        make_stream(
+            os.path.join(chunk, "kernel", "channel0_{}".format(i)),
+            args.size * 1024 * 1024,
+            args.packet_size,
+        )
+
+    total = args.size * args.streams
+    for name, function in (("read()", naive_manifest), ("mmap", build_manifest)):
+        elapsed, peak = measure(function, chunk)
+        print(
+            "{}: {:.2f} s, {:.0f} MiB/s, peak Python allocations {:.1f} MiB".format(
+                name, elapsed, total / elapsed, peak / (1024 * 1024)
+            )
+        )
@@ -0,0 +1,83 @@
+# Measure the cost of the instrumentation per notification: a backlog is
+# received, counted and written to a text sink with and without metrics, as
+# the listener does one notification at a time and by batch, and the
+# difference is compared to the overhead budget.
+#
+#   python3 -m benchmarks.metrics
+
+import argparse
+import io
+import time
+
+from lttng_listen import fake, metrics
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.dispatch import Dispatcher
+from lttng_listen.output import TextSink
+
+# Overhead budget of the instrumentation, per notification: six clock reads,
+# three histogram observations and a counter update.
+BUDGET = 2.5e-6
+
+
+def run(count, instrumented, batched):
+    ffi, ctl = fake.load()
+    if instrumented:
+        listener_metrics = metrics.ListenerMetrics()
+        channel = metrics.InstrumentedChannel(ffi, ctl, listener_metrics)
+    else:
+        channel = NotificationChannel(ffi, ctl)
+    for i in range(count):
+        ctl.emit(ctl.rotation_completed("session-{}".format(i % 100), i, "/tmp/a"))
+    ctl.emit(fake.CLOSED)
+
+    sink = TextSink(io.BytesIO())
+    handle = Dispatcher()
+    flush = sink.flush
+    if instrumented:
+        handle.register_all(listener_metrics.output(sink.write))
+        flush = metrics.timed(listener_metrics.flush_time, sink.flush)
+    else:
+        handle.register_all(sink.write)
+
+    # The receive loops of Listener.run().
+    start = time.perf_counter()
+    if batched:
+        for batch in channel.batches():
+            handle.dispatch_batch(batch)
+            flush()
+    else:
+        for notification in channel:
+            handle(notification)
+            if not channel.has_pending():
+                flush()
+    elapsed = time.perf_counter() - start
+
+    channel.close()
+    return elapsed
+
+
+parser = argparse.ArgumentParser(description="Instrumentation overhead benchmark.")
+parser.add_argument("--count", type=int, default=100000)
+parser.add_argument("--repeat", type=int, default=7)
+parser.add_argument("--budget", type=float, default=BUDGET * 1e6, help="us")
+args = parser.parse_args()
+
+for name, batched in (("one at a time", False), ("batched", True)):
+    # Interleave the runs so that both see the same machine noise.
+    plain = instrumented = float("inf")
+    for _ in range(args.repeat):
+        plain = min(plain, run(args.count, False, batched))
+        instrumented = min(instrumented, run(args.count, True, batched))
+    overhead = (instrumented - plain) / args.count
+
+    print(
+        "{}: plain {:.2f} us/notification, instrumented {:.2f} us/notification, "
+        "overhead {:.2f} us, budget {:.2f} us: {}".format(
+            name,
+            plain / args.count * 1e6,
+            instrumented / args.count * 1e6,
+            overhead * 1e6,
+            args.budget,
+            "ok" if overhead * 1e6 <= args.budget else "OVER",
+        )
+    )
@@ -0,0 +1,63 @@
+# Measure records/s of the output sinks against the former print() path. The
+# sinks are driven like by the listener: write() is called for each record
+# and flush() once per batch.
+#
+#   python3 -m benchmarks.output
+
+import argparse
+import contextlib
+import os
+import time
+
+from lttng_listen.notification import RotationCompleted
+from lttng_listen.output import SINKS
+
+
+def records(count):
+    return [
+        RotationCompleted(
+            "session-{}".format(i % 300),
+            i,
+            "/var/lib/lttng/session-{}/archives/{}".format(i % 300, i),
+            time.monotonic_ns(),
+        )
+        for i in range(count)
+    ]
+
+
+def print_path(batch, devnull):
+    with open(devnull, "w", buffering=1) as f, contextlib.redirect_stdout(f):
+        start = time.perf_counter()
+        for record in batch:
+            print(
+                "Completed trace archive chunk for session {} available at: {}".format(
+                    record.session_name, record.archive_path
+                )
+            )
+        return time.perf_counter() - start
+
+
+def sink_path(sink_class, batch, devnull, batch_size):
+    with open(devnull, "wb") as f:
+        sink = sink_class(f)
+        start = time.perf_counter()
+        write = sink.write
+        for i in range(0, len(batch), batch_size):
+            for record in batch[i : i + batch_size]:
+                write(record)
+            sink.flush()
+        sink.close()
+        return time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser(description="Output sink benchmark.")
+parser.add_argument("--count", type=int, default=200000)
+parser.add_argument("--batch-size", type=int, default=64)
+args = parser.parse_args()
+
+batch = records(args.count)
+elapsed = print_path(batch, os.devnull)
+print("print(): {:.0f} records/s".format(args.count / elapsed))
+for name, sink_class in sorted(SINKS.items()):
+    elapsed = sink_path(sink_class, batch, os.devnull, args.batch_size)
+    print("{}: {:.0f} records/s".format(name, args.count / elapsed))
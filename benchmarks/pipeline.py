@@ -0,0 +1,88 @@
+# Run the archive processing pipeline over synthetic chunk directories and
+# report its queue-depth and per-stage latency metrics. The output of the
+# stages is checked by tests/test_pipeline.py.
+#
+#   python3 -m benchmarks.pipeline
+
+import argparse
+import os
+import tempfile
+import time
+
+from lttng_listen.notification import RotationCompleted
+from lttng_listen.pipeline import (
+    BLOCK,
+    DROP,
+    CompressStage,
+    HashStage,
+    MoveStage,
+    Pipeline,
+)
+
+
+def make_chunk(root, session_name, index, files, file_size):
+    path = os.path.join(root, session_name, "archives", "chunk-{}".format(index))
+    os.makedirs(os.path.join(path, "kernel"))
+    for i in range(files):
+        with open(os.path.join(path, "kernel", "channel0_{}".format(i)), "wb") as f:
+            f.write(os.urandom(file_size))
+    return path
+
+
+parser = argparse.ArgumentParser(description="Archive pipeline benchmark.")
+parser.add_argument("--chunks", type=int, default=64)
+parser.add_argument("--files", type=int, default=4)
+parser.add_argument("--file-size", type=int, default=1024 * 1024)
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--queue-size", type=int, default=64)
+parser.add_argument("--overflow", choices=[DROP, BLOCK], default=DROP)
+args = parser.parse_args()
+
+with tempfile.TemporaryDirectory() as root:
+    destination = os.path.join(root, "uploaded")
+    notifications = [
+        RotationCompleted(
+            "session-{}".format(i % 4),
+            i,
+            make_chunk(root, "session-{}".format(i % 4), i, args.files, args.file_size),
+            time.monotonic_ns(),
+        )
+        for i in range(args.chunks)
+    ]
+
+    stages = [HashStage(), CompressStage(), MoveStage(destination)]
+    pipeline = Pipeline(
+        stages, args.workers, args.queue_size, overflow=args.overflow
+    )
+    pipeline.start()
+
+    # Under the drop policy, the listener side never waits for the pipeline.
+    start = time.perf_counter()
+    pipeline.submit_batch(notifications)
+    submit_time = time.perf_counter() - start
+
+    pipeline.close()
+    total_time = time.perf_counter() - start
+
+    metrics = pipeline.metrics()
+    print(
+        "{} chunks: submitted in {:.2f} ms, {} processed in {:.2f} s, {} dropped, "
+        "max queue depth {}".format(
+            args.chunks,
+            submit_time * 1e3,
+            metrics["completed"],
+            total_time,
+            metrics["dropped"],
+            metrics["max_queue_depth"],
+        )
+    )
+    for name, stage in metrics["stages"].items():
+        print(
+            "  {}: {} ok, {} failed, mean {:.2f} ms, max {:.2f} ms".format(
+                name,
+                stage["count"],
+                stage["failures"],
+                stage["mean"] * 1e3,
+                stage["max"] * 1e3,
+            )
+        )
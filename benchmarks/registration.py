@@ -0,0 +1,57 @@
+# Measure the setup cost of the rotation completed subscriptions with a cold
+# and a warm trigger cache, registering serially or from a process pool.
+#
+#   python3 -m benchmarks.registration
+
+import argparse
+import functools
+import os
+import statistics
+import tempfile
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.triggers import (
+    ConditionSpec,
+    RegistrationCache,
+    setup_conditions,
+)
+
+
+def run(names, jobs, cache_path, latency):
+    load = functools.partial(fake.load, latency)
+    ffi, ctl = load()
+    channel = NotificationChannel(ffi, ctl)
+    cache = RegistrationCache(cache_path)
+
+    start = time.perf_counter()
+    specs = [ConditionSpec("rotation-completed", name) for name in names]
+    timings = setup_conditions(ffi, ctl, channel, specs, cache, jobs, load)
+    elapsed = time.perf_counter() - start
+
+    channel.close()
+    per_session = [t.register + t.subscribe for t in timings]
+    return elapsed, statistics.median(per_session), max(per_session)
+
+
+# The registration processes import the main module again.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trigger registration benchmark.")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.0005, help="seconds")
+    args = parser.parse_args()
+
+    names = ["session-{}".format(i) for i in range(args.sessions)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for jobs in args.jobs:
+            cache_path = os.path.join(tmp_dir, "triggers-{}.json".format(jobs))
+            for state in ("cold", "warm"):
+                elapsed, p50, worst = run(names, jobs, cache_path, args.latency)
+                print(
+                    "{} jobs, {} cache: {:.2f} s total, "
+                    "{:.2f} ms/session p50, {:.2f} ms max".format(
+                        jobs, state, elapsed, p50 * 1e3, worst * 1e3
+                    )
+                )
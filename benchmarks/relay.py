@@ -0,0 +1,83 @@
+# Announce relay chunks to a local stand-in collector through the pipeline,
+# with pooled connections and with a new connection per chunk.
+#
+#   python3 -m benchmarks.relay
+
+import argparse
+import json
+import socketserver
+import threading
+import time
+
+from lttng_listen import pipeline
+from lttng_listen.notification import RotationCompleted
+from lttng_listen.relay import ConnectionPool, RelayLocation, RelayStage
+
+
+class Collector(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, requests_per_connection):
+        super().__init__(address, CollectorHandler)
+        self.requests_per_connection = requests_per_connection
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.chunks = 0
+
+
+# Reply "ok" to every announced chunk. The connection is closed after
+# `requests_per_connection` chunks, like an idle timeout would.
+class CollectorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+
+        for count, line in enumerate(self.rfile, 1):
+            json.loads(line)
+            with server.lock:
+                server.chunks += 1
+            self.wfile.write(b"ok\n")
+            if count == server.requests_per_connection:
+                return
+
+
+def run(collector, chunks, workers, max_idle):
+    port = collector.server_address[1]
+    stage = RelayStage(port, "127.0.0.1", ConnectionPool(max_idle))
+    start = time.perf_counter()
+    with pipeline.Pipeline([stage], workers, chunks) as archives:
+        for i in range(chunks):
+            path = RelayLocation("relay.example", "tcp", 5342, 5343, "s/{}".format(i))
+            archives.submit(RotationCompleted("s", i, path, 0))
+    elapsed = time.perf_counter() - start
+
+    failures = archives.metrics()["stages"]["relay"]["failures"]
+    return elapsed, stage.pool.opened, failures
+
+
+parser = argparse.ArgumentParser(description="Relay stage benchmark.")
+parser.add_argument("--chunks", type=int, default=5000)
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument(
+    "--requests-per-connection",
+    type=int,
+    default=1000,
+    help="chunks after which the collector closes a connection",
+)
+args = parser.parse_args()
+
+collector = Collector(("127.0.0.1", 0), args.requests_per_connection)
+threading.Thread(target=collector.serve_forever, daemon=True).start()
+
+for name, max_idle in (("pooled", args.workers), ("connection per chunk", 0)):
+    collector.chunks = 0
+    elapsed, opened, failures = run(collector, args.chunks, args.workers, max_idle)
+    print(
+        "{}: {:.0f} chunks/s, {} connections opened, {} failures, "
+        "{} chunks received".format(
+            name, args.chunks / elapsed, opened, failures, collector.chunks
+        )
+    )
+collector.shutdown()
@@ -0,0 +1,92 @@
+# Measure how many notifications are lost when a slow consumer is called
+# from the receive loop, against handing the notifications to it through a
+# ring buffer. The fake session daemon drops the notifications sent to a
+# channel with too many of them queued.
+#
+#   python3 -m benchmarks.ring
+
+import argparse
+import threading
+import time
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.ring import RingBuffer
+
+
+def produce(ctl, count, burst, interval, done):
+    for i in range(count):
+        ctl.emit(ctl.rotation_completed("session-{}".format(i % 100), i, "/tmp/a"))
+        if i % burst == burst - 1:
+            time.sleep(interval)
+    done.set()
+
+
+def run(args, ring_size):
+    ffi, ctl = fake.load()
+    ctl.queue_limit = args.queue_limit
+    channel = NotificationChannel(ffi, ctl)
+    consumed = [0]
+
+    def consume(batch):
+        for _ in batch:
+            time.sleep(args.consumer_cost)
+        consumed[0] += len(batch)
+
+    ring = None
+    if ring_size:
+        ring = RingBuffer(ring_size)
+        reader = ring.reader()
+        consumer = threading.Thread(
+            target=lambda: [consume(batch) for batch in reader]
+        )
+        consumer.start()
+
+    done = threading.Event()
+    producer = threading.Thread(
+        target=produce, args=(ctl, args.count, args.burst, args.interval, done)
+    )
+    start = time.perf_counter()
+    producer.start()
+
+    while not done.is_set() or channel.has_pending():
+        batch = channel.drain()
+        if not batch:
+            time.sleep(0.0005)
+        elif ring is None:
+            consume(batch)
+        else:
+            ring.extend(batch)
+    received = time.perf_counter() - start
+
+    producer.join()
+    if ring is not None:
+        ring.close()
+        consumer.join()
+    channel.close()
+
+    return received, channel.dropped, 0 if ring is None else ring.dropped, consumed[0]
+
+
+parser = argparse.ArgumentParser(description="Ring buffer benchmark.")
+parser.add_argument("--count", type=int, default=20000)
+parser.add_argument("--burst", type=int, default=200)
+parser.add_argument("--interval", type=float, default=0.02, help="seconds")
+parser.add_argument("--queue-limit", type=int, default=256)
+parser.add_argument("--consumer-cost", type=float, default=0.0001, help="seconds")
+parser.add_argument("--ring-sizes", type=int, nargs="+", default=[0, 1024, 16384])
+args = parser.parse_args()
+
+for ring_size in args.ring_sizes:
+    received, sessiond_dropped, ring_dropped, consumed = run(args, ring_size)
+    print(
+        "{}: receive loop done in {:.2f} s, {} session daemon drop(s), "
+        "{} dropped from the ring, {}/{} consumed".format(
+            "ring of {}".format(ring_size) if ring_size else "inline",
+            received,
+            sessiond_dropped,
+            ring_dropped,
+            consumed,
+            args.count,
+        )
+    )
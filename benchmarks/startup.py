@@ -0,0 +1,74 @@
+# Compare the cold-start time and per-call overhead of the ABI-mode
+# (cdef + dlopen) and API-mode (compiled _lttng_listen_ffi) bindings.
+#
+#   python3 -m lttng_listen.build      # optional, enables the API mode
+#   python3 -m benchmarks.startup
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from lttng_listen.binding import load
+
+COLD_START = """
+import time
+start = time.perf_counter()
+from lttng_listen.binding import load
+ffi, ctl = load("{mode}")
+ctl.lttng_strerror(ctl.LTTNG_OK)
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(mode, runs):
+    in_process = []
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", COLD_START.format(mode=mode)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        wall.append(time.perf_counter() - start)
+        in_process.append(float(out.stdout))
+
+    return statistics.median(in_process), statistics.median(wall)
+
+
+def per_call(mode, calls):
+    ffi, ctl = load(mode)
+    condition = ctl.lttng_condition_session_rotation_completed_create()
+    get_type = ctl.lttng_condition_get_type
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        get_type(condition)
+    elapsed = time.perf_counter() - start
+
+    ctl.lttng_condition_destroy(condition)
+    return elapsed / calls
+
+
+parser = argparse.ArgumentParser(description="Binding startup benchmark.")
+parser.add_argument("--runs", type=int, default=20)
+parser.add_argument("--calls", type=int, default=1000000)
+args = parser.parse_args()
+
+for mode in ("abi", "api"):
+    try:
+        load(mode)
+    except (ImportError, OSError) as e:
+        print("{}: unavailable ({})".format(mode, e))
+        continue
+
+    load_time, wall_time = cold_start(mode, args.runs)
+    call_time = per_call(mode, args.calls)
+    print(
+        "{}: load {:.2f} ms, process {:.2f} ms, {:.1f} ns/call".format(
+            mode, load_time * 1e3, wall_time * 1e3, call_time * 1e9
+        )
+    )
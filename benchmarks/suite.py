@@ -0,0 +1,206 @@
+# End-to-end benchmarks of the listener process: notifications/s, p50/p99
+# latencies and peak RSS of lttng-listen.py, in several modes, fed by the
+# fake session daemon of lttng_listen.fake. The decode latency spans from
+# the emission of a notification to its destruction, once decoded, and the
+# output latency from its reception to its output, once handled and
+# flushed, when the benchmark reads it.
+#
+#   python3 -m benchmarks.suite
+#
+# With --listen-c, listen.c and lttng-listen.py --all-triggers also listen
+# to a real session daemon for --duration seconds, whatever load it
+# generates, for comparison. Only the rate and RSS are known then.
+#
+#   python3 -m benchmarks.suite --listen-c ./listen --duration 30
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from lttng_listen import binding, fake
+from lttng_listen.rotations import percentile
+
+LISTENER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "lttng-listen.py")
+
+MODES = {
+    "default": [],
+    "batch": ["--batch"],
+    "async": ["--async"],
+    "ring": ["--ring-size", "65536"],
+    "async+ring": ["--async", "--ring-size", "65536"],
+}
+
+
+def write_script(path, sessions, count, rate):
+    with open(path, "w") as f:
+        f.write("rate {}\n".format(rate))
+        f.write(
+            "generate {} rotation-completed session-{{i}} {{i}} "
+            "/tmp/archives/{{i}}\n".format(count)
+        )
+        f.write("closed\n")
+
+
+# Run a process to completion and return its wall time and peak RSS (KiB).
+def run(command, env=None, stdout=subprocess.DEVNULL):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, env=env, stdout=stdout, stderr=subprocess.DEVNULL
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0:
+        raise RuntimeError("{} exited with {}".format(command[0], code))
+    return time.perf_counter() - start, usage.ru_maxrss
+
+
+# Run a listener to completion and return the latencies (ns) from the
+# reception of the records it writes on its standard output as NDJSON to
+# their reading, and its peak RSS (KiB). The reception timestamps and
+# time.monotonic_ns() read the same clock in both processes.
+def run_output(command, env):
+    latencies = []
+    process = subprocess.Popen(
+        command, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    with process.stdout:
+        for line in process.stdout:
+            now = time.monotonic_ns()
+            latencies.append(now - json.loads(line)["timestamp"])
+    _, status, usage = os.wait4(process.pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0:
+        raise RuntimeError("{} exited with {}".format(command[0], code))
+    return sorted(latencies), usage.ru_maxrss
+
+
+# With `output`, the records are written as NDJSON and their output
+# latencies are added to the stats.
+def run_fake(tmp_dir, mode_args, sessions, count, rate, output=False):
+    script = os.path.join(tmp_dir, "script")
+    stats = os.path.join(tmp_dir, "stats.json")
+    write_script(script, sessions, count, rate)
+    env = dict(
+        os.environ,
+        **{
+            binding.MODE_ENV: "fake",
+            fake.SCRIPT_ENV: script,
+            fake.STATS_ENV: stats,
+        }
+    )
+    command = [sys.executable, LISTENER, "--no-trigger-cache"]
+    if output:
+        command += ["--format", "ndjson"]
+    else:
+        command += ["--format", "binary", "--output", os.devnull]
+    command += mode_args
+    command += ["session-{}".format(i) for i in range(sessions)]
+    if output:
+        latencies, rss = run_output(command, env)
+    else:
+        _, rss = run(command, env)
+    with open(stats) as f:
+        result = json.load(f)
+    if output and latencies:
+        result.update(
+            output_p50=percentile(latencies, 0.5) / 1e9,
+            output_p99=percentile(latencies, 0.99) / 1e9,
+        )
+    return result, rss
+
+
+# The lines printed by listen.c for each notification it receives, and not
+# for the other events of the channel, like "Dropped notification".
+LISTEN_C_NOTIFICATIONS = {
+    "Consumed size notification",
+    "Buffer usage notification",
+    "Session rotation ongoing notification",
+    "Session rotation completed notification",
+}
+
+
+def is_listen_c_notification(line):
+    return (
+        line in LISTEN_C_NOTIFICATIONS
+        or (line.startswith('Event rule "') and line.endswith('" notification'))
+        or line.startswith("Unknown notification type (")
+    )
+
+
+# Count the notifications printed by a listener running for `duration`
+# seconds, i.e. the lines for which `is_notification` is true.
+def run_live(command, is_notification, duration):
+    with tempfile.TemporaryFile() as out:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=out, stderr=subprocess.DEVNULL)
+        time.sleep(duration)
+        # Not send_signal(), which would reap a listener that already exited.
+        os.kill(process.pid, signal.SIGINT)
+        _, _, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+
+        out.seek(0)
+        lines = out.read().decode("utf-8", "replace").splitlines()
+    count = sum(1 for line in lines if is_notification(line))
+    return count / elapsed, usage.ru_maxrss
+
+
+parser = argparse.ArgumentParser(description="End-to-end listener benchmarks.")
+parser.add_argument("--count", type=int, default=100000)
+parser.add_argument("--sessions", type=int, default=100)
+parser.add_argument(
+    "--rate",
+    type=float,
+    default=5000,
+    help="notifications/s of the latency runs (throughput runs are unpaced)",
+)
+parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+parser.add_argument("--listen-c", metavar="BINARY", help="listen.c executable")
+parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+args = parser.parse_args()
+
+print("{} notifications, {} sessions".format(args.count, args.sessions))
+with tempfile.TemporaryDirectory() as tmp_dir:
+    for mode in args.modes:
+        throughput, throughput_rss = run_fake(
+            tmp_dir, MODES[mode], args.sessions, args.count, 0
+        )
+        count = min(args.count, int(args.rate * 2))
+        paced, paced_rss = run_fake(
+            tmp_dir, MODES[mode], args.sessions, count, args.rate, output=True
+        )
+        print(
+            "{:>10}: {:8.0f} notifications/s, at {:.0f}/s: decode p50 {:.3f} ms, "
+            "p99 {:.3f} ms, output p50 {:.3f} ms, p99 {:.3f} ms, "
+            "max RSS {:.1f} MiB".format(
+                mode,
+                throughput["received"] / throughput["duration"],
+                args.rate,
+                paced["latency_p50"] * 1e3,
+                paced["latency_p99"] * 1e3,
+                paced["output_p50"] * 1e3,
+                paced["output_p99"] * 1e3,
+                max(throughput_rss, paced_rss) / 1024,
+            )
+        )
+
+if args.listen_c:
+    for name, command, is_notification in (
+        ("listen.c", [args.listen_c], is_listen_c_notification),
+        (
+            "python",
+            [sys.executable, LISTENER, "--all-triggers", "--format", "ndjson"],
+            lambda line: line.startswith("{"),
+        ),
+    ):
+        rate, rss = run_live(command, is_notification, args.duration)
+        print(
+            "{:>10}: {:8.0f} notifications/s, latency n/a, max RSS {:.1f} MiB".format(
+                name, rate, rss / 1024
+            )
+        )
@@ -0,0 +1,49 @@
+# Measure the time needed to subscribe to every session and receive its
+# notifications, for several session and worker counts, against a fake
+# session daemon with a fixed round-trip latency.
+#
+#   python3 -m benchmarks.workers
+
+import argparse
+import functools
+import time
+
+from lttng_listen import fake
+from lttng_listen.triggers import ConditionSpec
+from lttng_listen.workers import ShardedListener
+
+
+def run(sessions, workers, latency, rotations):
+    specs = [
+        ConditionSpec("rotation-completed", "session-{}".format(i))
+        for i in range(sessions)
+    ]
+    load = functools.partial(fake.load, latency, rotations)
+    expected = sessions * rotations
+
+    start = time.perf_counter()
+    received = 0
+    with ShardedListener(specs, workers, load) as listener:
+        for batch in listener.batches():
+            received += len(batch)
+            if received == expected:
+                break
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded listener benchmark.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.0002, help="seconds")
+    parser.add_argument("--rotations", type=int, default=4)
+    args = parser.parse_args()
+
+    for sessions in args.sessions:
+        for workers in args.workers:
+            elapsed = run(sessions, workers, args.latency, args.rotations)
+            print(
+                "{} sessions, {} workers: {:.2f} s ({:.0f} notifications/s)".format(
+                    sessions, workers, elapsed, sessions * args.rotations / elapsed
+                )
+            )
@@ -0,0 +1,10 @@
+__all__ = ["Listener"]
+
+
+# The listener is imported on first use, to keep `import lttng_listen` fast.
+def __getattr__(name):
+    if name == "Listener":
+        from .listener import Listener
+
+        return Listener
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
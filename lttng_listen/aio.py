@@ -0,0 +1,35 @@
+import asyncio
+
+from .channel import MAX_POLL_INTERVAL, MIN_POLL_INTERVAL
+
+
+async def batches(
+    channel,
+    stop=None,
+    limit=None,
+    min_interval=MIN_POLL_INTERVAL,
+    max_interval=MAX_POLL_INTERVAL,
+):
+    """Yield lists of the notifications queued on `channel` at each wakeup.
+
+    Stops when the `stop` event is set or the session daemon closes the
+    channel.
+    """
+    interval = min_interval
+    while (stop is None or not stop.is_set()) and not channel.closed:
+        # Only queued notifications are received: this does not block.
+        batch = channel.drain(limit)
+        if batch:
+            interval = min_interval
+            yield batch
+            continue
+
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+async def notifications(channel, stop=None, **kwargs):
+    """Yield the notifications of `channel` until the `stop` event is set."""
+    async for batch in batches(channel, stop, **kwargs):
+        for notification in batch:
+            yield notification
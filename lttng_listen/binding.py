@@ -0,0 +1,63 @@
+import functools
+import os
+
+# Selects how the bindings are loaded: "api" (the compiled
+# _lttng_listen_ffi extension), "abi" (runtime cdef + dlopen) or "auto"
+# (the extension when it was built, the ABI path otherwise). "fake" loads the
+# pure-Python stand-in of lttng_listen.fake, configured by the environment.
+MODE_ENV = "LTTNG_LISTEN_FFI"
+
+_loaded = {}
+
+
+def _load_api():
+    from ._lttng_listen_ffi import ffi, lib
+
+    return ffi, lib
+
+
+def _load_abi():
+    from cffi import FFI
+    from .cdef import CDEF
+
+    ffi = FFI()
+    ffi.cdef(CDEF)
+    return ffi, ffi.dlopen("liblttng-ctl.so")
+
+
+def load(mode=None):
+    """Return the (ffi, ctl) pair used to call into liblttng-ctl."""
+    if mode is None:
+        mode = os.environ.get(MODE_ENV, "auto")
+
+    if mode not in _loaded:
+        if mode == "api":
+            _loaded[mode] = _load_api()
+        elif mode == "abi":
+            _loaded[mode] = _load_abi()
+        elif mode == "auto":
+            try:
+                _loaded[mode] = load("api")
+            except ImportError:
+                _loaded[mode] = load("abi")
+        elif mode == "fake":
+            from . import fake
+
+            _loaded[mode] = fake.load_from_environment()
+        else:
+            raise ValueError("Unknown binding mode '{}'".format(mode))
+
+    return _loaded[mode]
+
+
+def loader(ctl):
+    """Return a function loading the bindings `ctl` was loaded with.
+
+    Unlike load(), which reads the mode from the environment, it can be
+    handed to other processes (e.g. by setup_conditions()) to load the
+    same bindings as this one.
+    """
+    for mode, (_, loaded) in _loaded.items():
+        if loaded is ctl:
+            return functools.partial(load, mode)
+    return load
@@ -0,0 +1,24 @@
+# Out-of-line API-mode build of the liblttng-ctl bindings.
+#
+# Run once, from the root of the repository:
+#
+#   python3 -m lttng_listen.build
+#
+# to produce lttng_listen/_lttng_listen_ffi.*.so. When it is present,
+# lttng_listen.binding uses it instead of parsing the declarations and
+# dlopen()-ing liblttng-ctl at every launch.
+
+from cffi import FFI
+
+from .cdef import CDEF
+
+ffibuilder = FFI()
+ffibuilder.cdef(CDEF)
+ffibuilder.set_source(
+    "lttng_listen._lttng_listen_ffi",
+    "#include <lttng/lttng.h>",
+    libraries=["lttng-ctl"],
+)
+
+if __name__ == "__main__":
+    ffibuilder.compile(verbose=True)
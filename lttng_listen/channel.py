@@ -0,0 +1,214 @@
+from .binding import load
+from .notification import Decoder, NotificationView
+
+# liblttng-ctl does not expose the channel's socket, but
+# lttng_notification_channel_has_pending_notification() polls it without
+# blocking. When polling, the wait between two polls doubles while the
+# channel is idle and is reset as soon as a notification arrives.
+MIN_POLL_INTERVAL = 0.001
+MAX_POLL_INTERVAL = 0.05
+
+# Returned by _receive() when the session daemon reports that notifications
+# were dropped.
+_DROPPED = object()
+
+
+class NotificationChannel:
+    """Session daemon notification channel yielding decoded notifications.
+
+    `dropped` counts the times the session daemon reported dropping
+    notifications because the channel was not drained fast enough and
+    `subscriptions` the conditions the channel is subscribed to. `closed` is
+    set once the channel is closed, by either end.
+    """
+
+    def __init__(self, ffi=None, ctl=None):
+        if ctl is None:
+            ffi, ctl = load()
+
+        self._ffi = ffi
+        self._ctl = ctl
+        self._pending_p = ffi.new("bool *")
+        self._notification_p = ffi.new("struct lttng_notification **")
+        # Every notification is received and decoded through these two
+        # functions, which subclasses may wrap (see metrics). Views decode
+        # their fields with the decoder itself.
+        self._get_next_notification = (
+            ctl.lttng_notification_channel_get_next_notification
+        )
+        self._decoder = self._decode = Decoder(ffi, ctl)
+        self.dropped = 0
+        self.subscriptions = 0
+        self.closed = False
+
+        endpoint = ctl.lttng_session_daemon_notification_endpoint
+        self._channel = ctl.lttng_notification_channel_create(endpoint)
+        if self._channel == ffi.NULL:
+            raise RuntimeError(
+                "Unable to create notification channel... Is a sessiond running?"
+            )
+
+    # Returns False, when `allow_unknown` is set, if the session daemon has
+    # no trigger for the condition and, when `allow_existing` is set, if the
+    # channel is already subscribed to it.
+    def subscribe(self, condition, allow_unknown=False, allow_existing=False):
+        ctl = self._ctl
+        status = ctl.lttng_notification_channel_subscribe(self._channel, condition)
+        if (
+            allow_unknown
+            and status == ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_UNKNOWN_CONDITION
+        ) or (
+            allow_existing
+            and status == ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_ALREADY_SUBSCRIBED
+        ):
+            return False
+        if status != ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK:
+            raise RuntimeError("Failed to subscribe to condition")
+
+        self.subscriptions += 1
+        return True
+
+    def unsubscribe(self, condition):
+        status = self._ctl.lttng_notification_channel_unsubscribe(
+            self._channel, condition
+        )
+        if status != self._ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK:
+            raise RuntimeError("Failed to unsubscribe from condition")
+        self.subscriptions -= 1
+
+    def has_pending(self):
+        status = self._ctl.lttng_notification_channel_has_pending_notification(
+            self._channel, self._pending_p
+        )
+        if status != self._ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK:
+            raise RuntimeError("Failed to check for pending notifications")
+
+        return bool(self._pending_p[0])
+
+    # Returns the next lttng_notification, to be destroyed by the caller,
+    # None or _DROPPED.
+    def _get_next(self):
+        status = self._get_next_notification(self._channel, self._notification_p)
+        if status != self._ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK:
+            return self._status(status)
+
+        return self._notification_p[0]
+
+    # Returns None or _DROPPED for a status other than OK.
+    def _status(self, status):
+        ctl = self._ctl
+        if status == ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_NOTIFICATIONS_DROPPED:
+            self.dropped += 1
+            return _DROPPED
+        if status == ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_CLOSED:
+            self.closed = True
+            return None
+        if status == ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_INTERRUPTED:
+            return None
+        raise RuntimeError("Failed to get next notification from channel")
+
+    def _receive(self):
+        notification = self._get_next()
+        if notification is None or notification is _DROPPED:
+            return notification
+
+        try:
+            return self._decode(notification)
+        finally:
+            self._ctl.lttng_notification_destroy(notification)
+
+    # Block until the next notification is received. Returns None if the
+    # wait was interrupted or the session daemon closed the channel.
+    def next(self):
+        while True:
+            notification = self._receive()
+            if notification is not _DROPPED:
+                return notification
+
+    # Collect the notifications that are already queued, up to `limit`,
+    # without blocking. get_next blocks on an empty channel, so each one is
+    # checked for first, in the same pass as its decoding.
+    def drain(self, limit=None):
+        ctl = self._ctl
+        channel = self._channel
+        pending_p = self._pending_p
+        notification_p = self._notification_p
+        has_pending = ctl.lttng_notification_channel_has_pending_notification
+        get_next = self._get_next_notification
+        ok = ctl.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK
+        decode = self._decode
+        destroy = ctl.lttng_notification_destroy
+
+        batch = []
+        append = batch.append
+        remaining = -1 if limit is None else limit
+        while remaining:
+            if has_pending(channel, pending_p) != ok:
+                raise RuntimeError("Failed to check for pending notifications")
+            if not pending_p[0]:
+                break
+
+            status = get_next(channel, notification_p)
+            if status != ok:
+                if self._status(status) is None:
+                    break
+                continue
+            notification = notification_p[0]
+            try:
+                append(decode(notification))
+            finally:
+                destroy(notification)
+            remaining -= 1
+
+        return batch
+
+    # Yield a NotificationView of each notification received, which is only
+    # valid until the next one is requested. Unless `block` is set, stops
+    # once no notification is queued.
+    def views(self, block=True):
+        while block or self.has_pending():
+            notification = self._get_next()
+            if notification is None:
+                return
+            if notification is _DROPPED:
+                continue
+
+            view = None
+            try:
+                view = NotificationView(self._decoder, notification)
+                yield view
+            finally:
+                if view is not None:
+                    view.release()
+                self._ctl.lttng_notification_destroy(notification)
+
+    # Yield lists holding every notification received on a wakeup.
+    def batches(self, limit=None):
+        while True:
+            notification = self.next()
+            if notification is None:
+                return
+
+            batch = [notification]
+            if limit is None or limit > 1:
+                batch += self.drain(None if limit is None else limit - 1)
+            yield batch
+
+    def __iter__(self):
+        while True:
+            notification = self.next()
+            if notification is None:
+                return
+            yield notification
+
+    def close(self):
+        if self._channel is not None:
+            self._ctl.lttng_notification_channel_destroy(self._channel)
+            self._channel = None
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
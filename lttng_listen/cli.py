@@ -0,0 +1,755 @@
+import argparse
+import logging
+import signal
+import sys
+
+from . import coalesce, discovery, metrics, pipeline
+from .controller import (
+    DEFAULT_MIN_INTERVAL,
+    RotationController,
+    consumed_size_rearmer,
+    session_rotator,
+)
+from .inventory import ACTION_TYPES, CONDITION_KINDS
+from .journal import DEAD_LETTERS_NAME, DEFAULT_MAX_ATTEMPTS, Journal
+from .listener import Listener
+from .notification import SESSION_ROTATION_COMPLETED
+from .output import DEFAULT_FLUSH_INTERVAL, SINKS
+from .rotations import RotationTracker
+from .triggers import (
+    DEFAULT_CACHE_PATH,
+    POOL_THRESHOLD,
+    ConditionSpec,
+    RegistrationCache,
+)
+
+
+class Color:
+    PURPLE = "\033[95m"
+    CYAN = "\033[96m"
+    DARKCYAN = "\033[36m"
+    BLUE = "\033[94m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    RED = "\033[91m"
+    WHITE = "\033[97m"
+    BOLD = "\033[1m"
+    UNDERLINE = "\033[4m"
+    END = "\033[0m"
+
+
+# Upper bounds of the rotation duration histogram buckets, in seconds.
+ROTATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Monitor the rotations of a set of sessions."
+    )
+    parser.add_argument(
+        "sessions",
+        metavar="s",
+        type=str,
+        nargs="*",
+        help="Session(s) to monitor for rotations",
+    )
+    parser.add_argument(
+        "--session-file",
+        metavar="PATH",
+        help="Monitor the sessions listed in PATH, one per line, following its "
+        "changes",
+    )
+    parser.add_argument(
+        "--session-commands",
+        action="store_true",
+        help="Read 'add SESSION...', 'remove SESSION...' and 'set SESSION...' "
+        "commands from the standard input",
+    )
+    parser.add_argument(
+        "--all-sessions",
+        action="store_true",
+        help="Monitor every session of the session daemon, following their "
+        "creation and destruction",
+    )
+    parser.add_argument(
+        "--discovery-interval",
+        type=float,
+        default=discovery.DEFAULT_POLL_INTERVAL,
+        metavar="SECONDS",
+        help="Polling interval of --session-file and --all-sessions "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--all-triggers",
+        action="store_true",
+        help="Subscribe to the notifications of the registered triggers with a "
+        "notify action instead of registering triggers",
+    )
+    parser.add_argument(
+        "--action-type",
+        dest="action_types",
+        action="append",
+        choices=sorted(ACTION_TYPES),
+        metavar="TYPE",
+        help="With --all-triggers, only subscribe to the triggers which also have "
+        "a TYPE action: {} (repeatable)".format(", ".join(sorted(ACTION_TYPES))),
+    )
+    parser.add_argument(
+        "--condition-type",
+        dest="condition_kinds",
+        action="append",
+        choices=sorted(CONDITION_KINDS),
+        metavar="KIND",
+        help="With --all-triggers, only subscribe to the conditions of type KIND: "
+        "{} (repeatable)".format(", ".join(sorted(CONDITION_KINDS))),
+    )
+    parser.add_argument(
+        "--session-glob",
+        metavar="GLOB",
+        help="With --all-triggers, only subscribe to the conditions of the "
+        "sessions matching GLOB",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Wait for notifications from an asyncio event loop",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Drain every pending notification on each wakeup and output them at once",
+    )
+    parser.add_argument(
+        "--ring-size",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Hand the notifications to a consumer thread through a ring buffer "
+        "keeping the last N of them, dropping the oldest when the consumer falls "
+        "behind",
+    )
+    parser.add_argument(
+        "--coalesce",
+        type=float,
+        metavar="SECONDS",
+        help="Group the notifications of each session and condition type received "
+        "within SECONDS, keeping the latest buffer usage and consumed size sample "
+        "of each group",
+    )
+    parser.add_argument(
+        "--coalesce-size",
+        type=int,
+        default=coalesce.DEFAULT_MAX_SIZE,
+        metavar="N",
+        help="Handle a group of --coalesce as soon as it holds N notifications "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Split the sessions across N listener processes",
+    )
+    parser.add_argument(
+        "--rotation-ongoing",
+        action="store_true",
+        help="Also monitor the start of the rotations",
+    )
+    parser.add_argument(
+        "--rotation-latency",
+        action="store_true",
+        help="Report the duration of the rotations, from their start to their "
+        "completion (implies --rotation-ongoing)",
+    )
+    parser.add_argument(
+        "--consumed-size",
+        type=int,
+        metavar="BYTES",
+        help="Notify when a session has consumed more than BYTES",
+    )
+    parser.add_argument(
+        "--buffer-usage-high",
+        type=float,
+        metavar="RATIO",
+        help="Notify when the buffer usage of --channel rises above RATIO",
+    )
+    parser.add_argument(
+        "--buffer-usage-low",
+        type=float,
+        metavar="RATIO",
+        help="Notify when the buffer usage of --channel falls below RATIO",
+    )
+    parser.add_argument(
+        "--channel",
+        default="channel0",
+        help="Channel monitored for buffer usage (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--domain",
+        choices=["kernel", "ust"],
+        default="ust",
+        help="Tracing domain of --channel (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--target-chunk-size",
+        type=int,
+        metavar="BYTES",
+        help="Rotate the sessions early, based on their buffer usage, to keep "
+        "their trace chunks close to BYTES",
+    )
+    parser.add_argument(
+        "--min-rotation-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        metavar="SECONDS",
+        help="Minimal time between two rotations requested by --target-chunk-size "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(SINKS),
+        default="text",
+        help="Output format of the notifications (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="PATH",
+        help="Write the notifications to PATH instead of the standard output",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL,
+        metavar="SECONDS",
+        help="Maximal time a notification stays buffered (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        dest="stages",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="Process every completed chunk through STAGE: hash[=ALGORITHM], "
+        "manifest[=ALGORITHM], compress[=FORMAT], move=DESTINATION or "
+        "relay=[HOST:]PORT, to announce the chunks stored by a relay daemon to "
+        "the collector listening on PORT on the relay host, or on HOST "
+        "(repeat to chain stages)",
+    )
+    parser.add_argument(
+        "--pipeline-workers",
+        type=int,
+        default=pipeline.DEFAULT_WORKERS,
+        metavar="N",
+        help="Number of threads running the pipeline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pipeline-queue-size",
+        type=int,
+        default=pipeline.DEFAULT_QUEUE_SIZE,
+        metavar="N",
+        help="Number of chunks queued to the pipeline threads (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pipeline-overflow",
+        choices=[pipeline.DROP, pipeline.BLOCK],
+        default=pipeline.DROP,
+        help="Drop the chunks completed while the pipeline queue is full, or "
+        "wait for room, delaying the listener (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="DIRECTORY",
+        help="Journal the completed chunks in DIRECTORY before processing them "
+        "through the pipeline, and resume their processing after a restart. "
+        "Chunks which fail {} times are recorded in DIRECTORY/{}".format(
+            DEFAULT_MAX_ATTEMPTS, DEAD_LETTERS_NAME
+        ),
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Periodically write Prometheus metrics to PATH",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=metrics.DEFAULT_INTERVAL,
+        metavar="SECONDS",
+        help="Interval between two writes of --metrics-file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Register the triggers of new sessions from N concurrent processes, "
+        "when at least {} need registering (default: %(default)s)".format(
+            POOL_THRESHOLD
+        ),
+    )
+    parser.add_argument(
+        "--trigger-cache",
+        default=DEFAULT_CACHE_PATH,
+        metavar="PATH",
+        help="Index of the triggers known to be registered (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-trigger-cache",
+        action="store_true",
+        help="Register every trigger, ignoring the trigger cache",
+    )
+    parser.add_argument(
+        "--setup-timings",
+        action="store_true",
+        help="Report the setup cost of each session",
+    )
+    return parser
+
+
+def parse_args(argv=None):
+    """Parse and check the command line. Returns (args, pipeline stages)."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        stages = [pipeline.parse_stage(spec) for spec in args.stages]
+    except ValueError as e:
+        parser.error(e)
+    if args.journal is not None and not stages:
+        parser.error("--journal requires --pipeline")
+
+    # Rotations are timed from their ongoing notification.
+    if args.rotation_latency:
+        args.rotation_ongoing = True
+
+    # The rotation controller is driven by the buffer usage and consumed
+    # size of the sessions.
+    if args.target_chunk_size is not None:
+        if args.workers > 1:
+            parser.error("--target-chunk-size cannot be combined with --workers")
+        # The controller moves the consumed size triggers, which is only
+        # done from the thread receiving the notifications.
+        if args.ring_size or args.coalesce is not None:
+            parser.error(
+                "--target-chunk-size cannot be combined with --ring-size or "
+                "--coalesce"
+            )
+        if args.buffer_usage_high is None:
+            args.buffer_usage_high = 0.75
+        if args.buffer_usage_low is None:
+            args.buffer_usage_low = 0.25
+        if args.consumed_size is None:
+            args.consumed_size = args.target_chunk_size
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.ring_size < 0:
+        parser.error("--ring-size must be positive")
+    if args.coalesce is not None and args.coalesce < 0:
+        parser.error("--coalesce must be positive")
+    if args.coalesce_size < 1:
+        parser.error("--coalesce-size must be at least 1")
+    if args.workers > 1 and args.use_async:
+        parser.error("--async cannot be combined with --workers")
+    # The channels of the workers are not instrumented.
+    if args.workers > 1 and (
+        args.metrics_port is not None or args.metrics_file is not None
+    ):
+        parser.error(
+            "{} cannot be combined with --workers".format(
+                "--metrics-port" if args.metrics_port is not None else "--metrics-file"
+            )
+        )
+
+    # The session set is only followed from the asyncio event loop, which
+    # updates the subscriptions between two polls of the channel.
+    follow = [
+        option
+        for option, enabled in (
+            ("--session-file", args.session_file is not None),
+            ("--session-commands", args.session_commands),
+            ("--all-sessions", args.all_sessions),
+        )
+        if enabled
+    ]
+    if len(follow) > 1:
+        parser.error("{} cannot be combined".format(" and ".join(follow)))
+    if follow and args.workers > 1:
+        parser.error("{} cannot be combined with --workers".format(follow[0]))
+    if follow:
+        args.use_async = True
+
+    if args.all_triggers:
+        if args.sessions or follow:
+            parser.error(
+                "--all-triggers cannot be combined with {}".format(
+                    follow[0] if follow else "sessions"
+                )
+            )
+        if args.workers > 1:
+            parser.error("--all-triggers cannot be combined with --workers")
+    elif args.action_types or args.condition_kinds or args.session_glob:
+        parser.error(
+            "--action-type, --condition-type and --session-glob require "
+            "--all-triggers"
+        )
+    elif not args.sessions and not follow:
+        parser.error("no session to monitor")
+
+    return args, stages
+
+
+# Return the function giving the conditions to subscribe to for a session.
+def condition_specs(args):
+    def session_specs(session_name):
+        specs = [ConditionSpec("rotation-completed", session_name)]
+        if args.rotation_ongoing:
+            specs.append(ConditionSpec("rotation-ongoing", session_name))
+        if args.consumed_size is not None:
+            specs.append(
+                ConditionSpec(
+                    "consumed-size", session_name, threshold=args.consumed_size
+                )
+            )
+        for kind, ratio in (
+            ("buffer-usage-high", args.buffer_usage_high),
+            ("buffer-usage-low", args.buffer_usage_low),
+        ):
+            if ratio is not None:
+                specs.append(
+                    ConditionSpec(kind, session_name, args.channel, args.domain, ratio)
+                )
+        return specs
+
+    return session_specs
+
+
+# The banner goes to the standard error when the output is meant for a
+# machine, and is only colored on a terminal.
+def print_banner(args):
+    if not args.sessions:
+        return
+
+    stream = sys.stdout if args.format == "text" and not args.output else sys.stderr
+    color, end = (Color.WHITE, Color.END) if stream.isatty() else ("", "")
+    print(
+        "Monitoring session"
+        + ("" if len(args.sessions) == 1 else "s")
+        + " {} for rotations".format(
+            ", ".join([(color + s + end) for s in args.sessions])
+        ),
+        file=stream,
+    )
+
+
+def subscribe_all_triggers(args, listener):
+    action_types = None
+    if args.action_types:
+        ctl = listener.load()[1]
+        action_types = [getattr(ctl, ACTION_TYPES[t]) for t in args.action_types]
+    condition_types = None
+    if args.condition_kinds:
+        condition_types = [CONDITION_KINDS[k] for k in args.condition_kinds]
+
+    subscribed = listener.subscribe_triggers(
+        action_types, condition_types, args.session_glob
+    )
+    for entry in subscribed:
+        print(
+            'Subscribed to notification of trigger "{}"'.format(entry.name),
+            file=sys.stderr,
+        )
+
+    return len(subscribed)
+
+
+def print_setup_timings(timings, elapsed):
+    for t in timings:
+        print(
+            "Session {} ({}): {}register {:.2f} ms, subscribe {:.2f} ms".format(
+                t.session_name,
+                t.kind,
+                "cached, " if t.cached else "",
+                t.register * 1e3,
+                t.subscribe * 1e3,
+            ),
+            file=sys.stderr,
+        )
+
+    cached = sum(1 for t in timings if t.cached)
+    print(
+        "Set up {} condition(s) ({} cached) in {:.2f} ms".format(
+            len(timings), cached, elapsed * 1e3
+        ),
+        file=sys.stderr,
+    )
+
+
+def print_pipeline_metrics(metrics):
+    print(
+        "Processed {} chunk(s), max queue depth {}".format(
+            metrics["completed"], metrics["max_queue_depth"]
+        ),
+        file=sys.stderr,
+    )
+    if metrics["dropped"]:
+        print(
+            "Dropped {} chunk(s) while the pipeline queue was full".format(
+                metrics["dropped"]
+            ),
+            file=sys.stderr,
+        )
+    for name, stage in metrics["stages"].items():
+        print(
+            "Stage {}: {} ok, {} failed, mean {:.2f} ms, max {:.2f} ms".format(
+                name,
+                stage["count"],
+                stage["failures"],
+                stage["mean"] * 1e3,
+                stage["max"] * 1e3,
+            ),
+            file=sys.stderr,
+        )
+
+
+def print_rotation_duration(duration):
+    print(
+        "Rotation {} of session {} took {:.3f} s".format(
+            duration.rotation_id, duration.session_name, duration.duration
+        ),
+        file=sys.stderr,
+    )
+
+
+def print_drops(listener):
+    if listener.dropped:
+        print(
+            "The session daemon dropped notifications {} time(s)".format(
+                listener.dropped
+            ),
+            file=sys.stderr,
+        )
+    ring = listener.ring
+    if ring is not None and ring.dropped:
+        print(
+            "Dropped {} of {} notification(s) from the ring buffer".format(
+                ring.dropped, ring.sequence
+            ),
+            file=sys.stderr,
+        )
+
+
+def follow_sessions(args, listener):
+    subscriptions = listener.subscriptions
+    if args.session_file is not None:
+        return discovery.follow_file(
+            subscriptions, args.session_file, args.discovery_interval
+        )
+    if args.session_commands:
+        return discovery.follow_commands(subscriptions)
+    if args.all_sessions:
+        return discovery.follow_sessiond(
+            subscriptions, *listener.load(), args.discovery_interval
+        )
+    return None
+
+
+async def listen_async(args, listener):
+    import asyncio
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGINT, listener.stop)
+    follower = follow_sessions(args, listener)
+    await listener.run_async(*([] if follower is None else [follower]))
+
+
+def main(argv=None):
+    args, stages = parse_args(argv)
+    # The library reports its errors and session changes on its loggers.
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+
+    output = open(args.output, "ab") if args.output else sys.stdout.buffer
+    sink = SINKS[args.format](output, flush_interval=args.flush_interval)
+    archives = None
+    journal = None
+    if stages:
+        # Chunks are journaled before being processed and acknowledged after.
+        if args.journal is not None:
+            journal = Journal(args.journal)
+        archives = pipeline.Pipeline(
+            stages,
+            args.pipeline_workers,
+            args.pipeline_queue_size,
+            None if journal is None else journal.ack,
+            args.pipeline_overflow,
+            None if journal is None else journal.fail,
+        )
+        archives.start()
+        if journal is not None:
+            journal.start(archives.submit)
+            journal.reconcile()
+
+    listener_metrics = None
+    channel_factory = None
+    if args.metrics_port is not None or args.metrics_file is not None:
+        listener_metrics = metrics.ListenerMetrics()
+
+        def channel_factory(ffi, ctl):
+            return metrics.InstrumentedChannel(ffi, ctl, listener_metrics)
+
+    cache = None if args.no_trigger_cache else RegistrationCache(args.trigger_cache)
+    listener = Listener(
+        args.sessions,
+        condition_specs(args),
+        cache=cache,
+        jobs=args.jobs,
+        batch=args.batch,
+        ring_size=args.ring_size,
+        coalesce=args.coalesce,
+        coalesce_size=args.coalesce_size,
+        workers=args.workers,
+        channel_factory=channel_factory,
+    )
+
+    if listener_metrics is None and args.coalesce is not None:
+        listener.add_handler(sink.write_coalesced, flush=sink.flush, coalesced=True)
+    elif listener_metrics is None:
+        listener.add_handler(sink.write, flush=sink.flush)
+    else:
+        listener.add_handler(
+            listener_metrics.output(sink.write),
+            flush=metrics.timed(listener_metrics.flush_time, sink.flush),
+        )
+    if journal is not None:
+        listener.add_handler(journal.append, [SESSION_ROTATION_COMPLETED])
+    elif archives is not None:
+        listener.add_handler(archives.submit, [SESSION_ROTATION_COMPLETED])
+
+    controller = None
+    if args.target_chunk_size is not None:
+        controller = RotationController(
+            session_rotator(*listener.load()),
+            args.target_chunk_size,
+            args.min_rotation_interval,
+            rearm=consumed_size_rearmer(listener),
+            threshold=args.consumed_size,
+        )
+        listener.add_handler(controller, controller.condition_types)
+
+    tracker = None
+    if args.rotation_latency:
+        on_duration = print_rotation_duration
+        if listener_metrics is not None:
+            observe = listener_metrics.registry.histogram(
+                "lttng_listen_rotation_seconds",
+                "Time between the start and the completion of the rotations",
+                ROTATION_BUCKETS,
+            ).observe
+
+            def on_duration(duration):
+                observe(duration.duration)
+                print_rotation_duration(duration)
+
+        tracker = RotationTracker(on_duration)
+        listener.add_handler(tracker, tracker.condition_types)
+
+    # Create the notification channel, subscribe to the conditions of the
+    # sessions and create their triggers.
+    try:
+        listener.open()
+    except RuntimeError as e:
+        print(e)
+        sys.exit(-1)
+
+    if listener_metrics is not None and listener.ring is not None:
+        listener_metrics.watch(
+            "lttng_listen_ring_drops_total",
+            "Notifications overwritten before being consumed",
+            lambda: listener.ring.dropped,
+            "counter",
+        )
+    metrics_server = None
+    stats_file = None
+    if listener_metrics is not None:
+        if args.metrics_port is not None:
+            metrics_server = metrics.serve(listener_metrics.registry, args.metrics_port)
+        if args.metrics_file is not None:
+            stats_file = metrics.StatsFile(
+                listener_metrics.registry, args.metrics_file, args.metrics_interval
+            )
+            stats_file.start()
+
+    count = None
+    if args.all_triggers:
+        # Subscribe to the conditions of the existing triggers
+        try:
+            count = subscribe_all_triggers(args, listener)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(-1)
+        if count == 0:
+            print("No matching trigger with a notify action found.", file=sys.stderr)
+    else:
+        if args.setup_timings and args.workers == 1:
+            print_setup_timings(listener.setup_timings, listener.setup_time)
+        print_banner(args)
+
+    try:
+        if count != 0:
+            if args.use_async:
+                import asyncio
+
+                asyncio.run(listen_async(args, listener))
+            else:
+                signal.signal(signal.SIGINT, lambda sig, frame: listener.stop())
+                listener.run()
+    finally:
+        listener.close()
+    print_drops(listener)
+
+    sink.close()
+    output.close()
+
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if stats_file is not None:
+        stats_file.close()
+
+    if journal is not None:
+        journal.stop()
+    if archives is not None:
+        archives.close()
+        print_pipeline_metrics(archives.metrics())
+    if journal is not None:
+        journal.close()
+
+    if tracker is not None:
+        for session_name, stats in sorted(tracker.stats().items()):
+            print(
+                "Session {}: {} rotation(s), p50 {:.3f} s, p90 {:.3f} s, "
+                "p99 {:.3f} s, max {:.3f} s".format(
+                    session_name,
+                    stats["rotations"],
+                    stats["p50"],
+                    stats["p90"],
+                    stats["p99"],
+                    stats["max"],
+                ),
+                file=sys.stderr,
+            )
+
+    if controller is not None:
+        for session_name, stats in sorted(controller.stats().items()):
+            print(
+                "Session {}: {} rotation(s) requested, {} early".format(
+                    session_name, stats["rotations"], stats["early_rotations"]
+                ),
+                file=sys.stderr,
+            )
@@ -0,0 +1,240 @@
+import heapq
+import itertools
+import threading
+import time
+
+from .notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+    RotationOngoing,
+)
+
+DEFAULT_WINDOW = 0.1
+DEFAULT_MAX_SIZE = 64
+
+# How the records of a group are aggregated: only the latest sample of a
+# level is kept, while every completed chunk is.
+LATEST = "latest"
+ALL = "all"
+
+DEFAULT_POLICIES = {
+    BufferUsageHigh.condition_type: LATEST,
+    BufferUsageLow.condition_type: LATEST,
+    ConsumedSize.condition_type: LATEST,
+    RotationOngoing.condition_type: ALL,
+    RotationCompleted.condition_type: ALL,
+}
+
+
+class Coalesced:
+    """Records of a session and condition type, emitted as one.
+
+    `count` is the number of records the group received and `records` the
+    ones it kept, in reception order. Records of rotations have their
+    rotation ids between `first_rotation_id` and `last_rotation_id`.
+    """
+
+    __slots__ = ("session_name", "condition_type", "kind", "count", "records")
+
+    def __init__(self, count, records):
+        first = records[0]
+        self.session_name = first.session_name
+        self.condition_type = first.condition_type
+        self.kind = first.kind
+        self.count = count
+        self.records = records
+
+    @property
+    def timestamp(self):
+        return self.records[0].timestamp
+
+    @property
+    def first_rotation_id(self):
+        return self.records[0].rotation_id
+
+    @property
+    def last_rotation_id(self):
+        return self.records[-1].rotation_id
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+# Wrap a handler of records to handle the Coalesced records one by one.
+def expand(handler):
+    def expanded(record):
+        if type(record) is Coalesced:
+            for r in record.records:
+                handler(r)
+        else:
+            handler(record)
+
+    return expanded
+
+
+class Group:
+    __slots__ = ("key", "policy", "deadline", "records", "received")
+
+    def __init__(self, key, policy, deadline):
+        self.key = key
+        self.policy = policy
+        self.deadline = deadline
+        self.records = []
+        self.received = 0
+
+    # The record emitted for the group.
+    def record(self):
+        if self.policy == ALL:
+            return Coalesced(self.received, self.records)
+        return self.records[-1]
+
+
+class Coalescer:
+    """Group the records of each session and condition type before handling.
+
+    The first record of a group opens it for `window` seconds; the group is
+    emitted when the window ends or once it received `max_size` records. A
+    group is emitted as a single record: its latest record under the LATEST
+    policy and a Coalesced of all its records under the ALL policy. Records
+    of condition types without a policy are emitted on their own, right
+    away. `emit` is called with the list of the records of the groups which
+    are due together.
+
+    Groups are emitted, oldest deadline first, from a single thread waiting
+    on a heap of deadlines, so every handler runs on that thread. A group
+    reaching `max_size` pushes a second, earlier, deadline: the heap entries
+    that no longer match the deadline of their group are skipped.
+    """
+
+    def __init__(
+        self,
+        emit,
+        window=DEFAULT_WINDOW,
+        max_size=DEFAULT_MAX_SIZE,
+        policies=None,
+        clock=time.monotonic,
+    ):
+        self._emit = emit
+        self._window = window
+        self._max_size = max_size
+        self._policies = DEFAULT_POLICIES if policies is None else policies
+        self._clock = clock
+        self._groups = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._closed = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.received = 0
+        self.emitted = 0
+
+    def _schedule(self, group, deadline):
+        group.deadline = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), group))
+        return self._heap[0][2] is group
+
+    # Add a record, the lock being held. Returns whether the emitting thread
+    # must wake up earlier than planned.
+    def _add(self, record, now):
+        self.received += 1
+        policy = self._policies.get(record.condition_type)
+        if policy is None:
+            group = Group(None, None, now)
+            group.records.append(record)
+            group.received = 1
+            return self._schedule(group, now)
+
+        key = (record.session_name, record.condition_type)
+        group = self._groups.get(key)
+        wake = False
+        if group is None:
+            group = self._groups[key] = Group(key, policy, None)
+            wake = self._schedule(group, now + self._window)
+
+        group.received += 1
+        if policy == LATEST:
+            group.records[:] = (record,)
+        else:
+            group.records.append(record)
+        if group.received == self._max_size:
+            # The next record of the key opens a new group.
+            del self._groups[key]
+            wake = self._schedule(group, now)
+        return wake
+
+    def add(self, record):
+        with self._changed:
+            if self._add(record, self._clock()):
+                self._changed.notify()
+
+    def extend(self, records):
+        with self._changed:
+            now = self._clock()
+            wake = False
+            for record in records:
+                wake = self._add(record, now) or wake
+            if wake:
+                self._changed.notify()
+
+    def expire(self, now=None, everything=False):
+        """Remove and return the groups due at `now`, oldest deadline first."""
+        if now is None:
+            now = self._clock()
+        heap = self._heap
+        groups = []
+        while heap and (everything or heap[0][0] <= now):
+            deadline, _, group = heapq.heappop(heap)
+            if deadline != group.deadline:
+                continue
+            # Emitted groups keep no deadline.
+            group.deadline = None
+            if self._groups.get(group.key) is group:
+                del self._groups[group.key]
+            groups.append(group)
+        return groups
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while True:
+                    groups = self.expire(everything=self._closed)
+                    if groups or self._closed:
+                        break
+                    deadline = self.next_deadline()
+                    self._changed.wait(
+                        None if deadline is None else deadline - self._clock()
+                    )
+                closed = self._closed
+
+            if groups:
+                self.emitted += len(groups)
+                self._emit([group.record() for group in groups])
+            if closed:
+                return
+
+    def start(self):
+        self._thread.start()
+
+    # Emit the pending groups without waiting for their deadline and stop
+    # the emitting thread.
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,196 @@
+import collections
+import logging
+import time
+
+from .notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+)
+
+DEFAULT_MIN_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def session_rotator(ffi, ctl):
+    """Return a function requesting an immediate rotation of a session."""
+    handle_p = ffi.new("struct lttng_rotation_handle **")
+
+    def rotate(session_name):
+        ret = ctl.lttng_rotate_session(
+            ffi.new("char[]", bytes(session_name, "utf-8")), ffi.NULL, handle_p
+        )
+        if ret < 0:
+            # A rotation already in progress is as good as a new one.
+            if -ret != ctl.LTTNG_ERR_ROTATION_PENDING:
+                logger.error(
+                    "Failed to rotate session %s: %s",
+                    session_name,
+                    ffi.string(ctl.lttng_strerror(ret)).decode(),
+                )
+            return False
+
+        ctl.lttng_rotation_handle_destroy(handle_p[0])
+        return True
+
+    return rotate
+
+
+def consumed_size_rearmer(listener):
+    """Return a function moving the consumed size trigger of a session.
+
+    The triggers are those subscribed to by `listener`, once opened.
+    """
+
+    def rearm(session_name, threshold):
+        try:
+            listener.subscriptions.set_threshold(
+                session_name, "consumed-size", threshold
+            )
+        except RuntimeError as e:
+            logger.error(
+                "Failed to rearm the consumed size trigger of session %s: %s",
+                session_name,
+                e,
+            )
+            return False
+        return True
+
+    return rearm
+
+
+class SessionState:
+    __slots__ = (
+        "consumed",
+        "threshold",
+        "chunk_start",
+        "factor",
+        "last_rotation",
+        "rotations",
+        "early_rotations",
+    )
+
+    def __init__(self):
+        self.consumed = 0
+        self.threshold = None
+        self.chunk_start = 0
+        self.factor = 1.0
+        self.last_rotation = None
+        self.rotations = 0
+        self.early_rotations = 0
+
+
+class RotationController:
+    """Rotate sessions early while their buffers are under pressure.
+
+    A session is rotated once the size of its current chunk (consumed size
+    since the last completed rotation) reaches `target_size` times a factor.
+    The factor is halved on every high buffer usage notification, down to
+    `min_factor`, and grows back by `recovery` on every low buffer usage
+    notification, up to 1: this is an additive-increase, multiplicative-
+    decrease controller keeping chunks near `target_size` at rest and
+    shortening them while the buffers fill up. Rotations of a session are
+    at least `min_interval` seconds apart.
+
+    The session daemon only notifies a consumed size condition once, when
+    the consumed size crosses its threshold. `rearm`, if set, is called
+    with (session name, threshold) after each notification to move the
+    trigger of the session, initially at `threshold` (default:
+    `target_size`), to the consumed size at which the session is to be
+    evaluated next. It returns whether the trigger was moved.
+    """
+
+    condition_types = tuple(
+        record.condition_type
+        for record in (BufferUsageHigh, BufferUsageLow, ConsumedSize, RotationCompleted)
+    )
+
+    def __init__(
+        self,
+        rotate,
+        target_size,
+        min_interval=DEFAULT_MIN_INTERVAL,
+        min_factor=0.125,
+        recovery=0.25,
+        clock=time.monotonic,
+        rearm=None,
+        threshold=None,
+    ):
+        self._rotate = rotate
+        self._target_size = target_size
+        self._min_interval = min_interval
+        self._min_factor = min_factor
+        self._recovery = recovery
+        self._clock = clock
+        self._rearm = rearm
+        self._threshold = target_size if threshold is None else threshold
+        self._sessions = collections.defaultdict(SessionState)
+        self._handlers = {
+            BufferUsageHigh: self._buffer_usage_high,
+            BufferUsageLow: self._buffer_usage_low,
+            ConsumedSize: self._consumed_size,
+            RotationCompleted: self._rotation_completed,
+        }
+
+    def __call__(self, record):
+        state = self._sessions[record.session_name]
+        self._handlers[type(record)](state, record)
+        if self._rearm is not None:
+            self._rearm_trigger(record.session_name, state)
+
+    # The next evaluation is due once the chunk reaches its target size. A
+    # session which could not be rotated yet is evaluated again on the next
+    # consumed size sample.
+    def _rearm_trigger(self, session_name, state):
+        threshold = max(
+            state.chunk_start + int(self._target_size * state.factor),
+            state.consumed + 1,
+        )
+        current = self._threshold if state.threshold is None else state.threshold
+        if threshold != current and self._rearm(session_name, threshold):
+            state.threshold = threshold
+
+    def _buffer_usage_high(self, state, record):
+        state.factor = max(state.factor / 2, self._min_factor)
+        self._evaluate(record.session_name, state, early=True)
+
+    def _buffer_usage_low(self, state, record):
+        state.factor = min(state.factor + self._recovery, 1.0)
+
+    def _consumed_size(self, state, record):
+        state.consumed = max(state.consumed, record.consumed_size)
+        self._evaluate(record.session_name, state, early=state.factor < 1.0)
+
+    def _rotation_completed(self, state, record):
+        state.chunk_start = state.consumed
+
+    def _evaluate(self, session_name, state, early):
+        chunk_size = state.consumed - state.chunk_start
+        if chunk_size < self._target_size * state.factor:
+            return
+
+        now = self._clock()
+        if (
+            state.last_rotation is not None
+            and now - state.last_rotation < self._min_interval
+        ):
+            return
+
+        if self._rotate(session_name):
+            state.chunk_start = state.consumed
+            state.last_rotation = now
+            state.rotations += 1
+            if early and chunk_size < self._target_size:
+                state.early_rotations += 1
+
+    def stats(self):
+        return {
+            session_name: {
+                "rotations": state.rotations,
+                "early_rotations": state.early_rotations,
+                "factor": state.factor,
+            }
+            for session_name, state in self._sessions.items()
+        }
@@ -0,0 +1,268 @@
+import logging
+import os
+import sys
+
+from . import binding
+from .triggers import (
+    create_condition,
+    setup_conditions,
+    subscribe_condition,
+    unsubscribe_condition,
+)
+
+DEFAULT_POLL_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionSet:
+    """Subscriptions of a channel, kept in sync with a changing session set.
+
+    Only the sessions that appeared or disappeared since the last update
+    are subscribed to or unsubscribed from. Triggers are left registered
+    when a session goes away. `cache`, `jobs` and `load` are passed to
+    setup_conditions().
+    """
+
+    def __init__(
+        self, ffi, ctl, channel, make_specs, cache=None, jobs=1, load=binding.load
+    ):
+        self._ffi = ffi
+        self._ctl = ctl
+        self._channel = channel
+        self._make_specs = make_specs
+        self._cache = cache
+        self._jobs = jobs
+        self._load = load
+        self._specs = {}
+
+    def __contains__(self, session_name):
+        return session_name in self._specs
+
+    def sessions(self):
+        return set(self._specs)
+
+    # Record sessions already subscribed to, e.g. by setup_conditions().
+    def track(self, session_names):
+        for session_name in session_names:
+            self._specs.setdefault(session_name, self._make_specs(session_name))
+
+    # The conditions of all the new sessions are set up at once. A session
+    # with a condition that fails is left without any subscription and
+    # retried by the next call, without holding back the others. Returns the
+    # sessions that were added.
+    def add(self, session_names):
+        new = {
+            session_name: self._make_specs(session_name)
+            for session_name in session_names
+            if session_name not in self._specs
+        }
+        if not new:
+            return []
+
+        errors = []
+        setup_conditions(
+            self._ffi,
+            self._ctl,
+            self._channel,
+            [spec for specs in new.values() for spec in specs],
+            self._cache,
+            self._jobs,
+            self._load,
+            errors,
+        )
+        failures = {}
+        for spec, error in errors:
+            failures.setdefault(spec.session_name, error)
+
+        added = []
+        for session_name, specs in new.items():
+            if session_name in failures:
+                self._unsubscribe(specs, ignore_errors=True)
+                logger.error(
+                    "Failed to monitor session %s: %s",
+                    session_name,
+                    failures[session_name],
+                )
+                continue
+
+            self._specs[session_name] = specs
+            added.append(session_name)
+        return added
+
+    def _unsubscribe(self, specs, ignore_errors=False):
+        for spec in specs:
+            condition = create_condition(self._ffi, self._ctl, spec)
+            try:
+                self._channel.unsubscribe(condition)
+            except RuntimeError:
+                if not ignore_errors:
+                    raise
+            finally:
+                self._ctl.lttng_condition_destroy(condition)
+
+    def remove(self, session_names):
+        removed = [s for s in dict.fromkeys(session_names) if s in self._specs]
+        for session_name in removed:
+            self._unsubscribe(self._specs.pop(session_name))
+        return removed
+
+    # Move the condition of `kind` of a session to a new threshold: the new
+    # trigger is subscribed to before the previous one is unregistered, so
+    # that no notification is missed in between.
+    def set_threshold(self, session_name, kind, threshold):
+        specs = self._specs.get(session_name, [])
+        for i, spec in enumerate(specs):
+            if spec.kind == kind:
+                break
+        else:
+            raise RuntimeError(
+                "Session {} has no {} condition".format(session_name, kind)
+            )
+        if spec.threshold == threshold:
+            return
+
+        moved = spec._replace(threshold=threshold)
+        subscribe_condition(self._ffi, self._ctl, self._channel, moved)
+        specs[i] = moved
+        unsubscribe_condition(self._ffi, self._ctl, self._channel, spec)
+
+    # Returns the sessions that were added and removed.
+    def update(self, session_names):
+        session_names = set(session_names)
+        removed = self.remove(self.sessions() - session_names)
+        added = self.add(sorted(session_names - self.sessions()))
+        return added, removed
+
+
+def list_sessions(ffi, ctl):
+    sessions_p = ffi.new("struct lttng_session **")
+    count = ctl.lttng_list_sessions(sessions_p)
+    if count < 0:
+        raise RuntimeError(
+            "Failed to list sessions: {}".format(
+                ffi.string(ctl.lttng_strerror(count)).decode("utf-8")
+            )
+        )
+
+    try:
+        return {
+            ffi.string(sessions_p[0][i].name).decode("utf-8") for i in range(count)
+        }
+    finally:
+        if count:
+            ctl.free(sessions_p[0])
+
+
+# One session name per line. Blank lines and lines starting with '#' are
+# ignored.
+def read_session_file(path):
+    with open(path) as f:
+        return {
+            line.strip()
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        }
+
+
+def _update(subscriptions, session_names):
+    try:
+        added, removed = subscriptions.update(session_names)
+    except RuntimeError as e:
+        # Retried on the next poll.
+        logger.error("%s", e)
+        return
+
+    _report(added, removed)
+
+
+def _report(added, removed):
+    for session_name in added:
+        logger.info("Monitoring session %s", session_name)
+    for session_name in removed:
+        logger.info("Stopped monitoring session %s", session_name)
+
+
+# The following coroutines run in the event loop of the listener: updating
+# the subscriptions between two polls of the channel needs no locking. They
+# import asyncio themselves, so that the subscription set does not.
+async def follow_file(subscriptions, path, interval=DEFAULT_POLL_INTERVAL):
+    import asyncio
+
+    mtime = None
+    while True:
+        try:
+            current = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            current = None
+
+        if current != mtime:
+            mtime = current
+            sessions = read_session_file(path) if current is not None else set()
+            _update(subscriptions, sessions)
+
+        await asyncio.sleep(interval)
+
+
+async def follow_sessiond(subscriptions, ffi, ctl, interval=DEFAULT_POLL_INTERVAL):
+    import asyncio
+
+    while True:
+        try:
+            sessions = list_sessions(ffi, ctl)
+        except RuntimeError as e:
+            logger.error("%s", e)
+        else:
+            _update(subscriptions, sessions)
+        await asyncio.sleep(interval)
+
+
+# Commands, one per line: "add SESSION...", "remove SESSION..." or
+# "set SESSION...", which replaces the whole session set.
+def apply_command(subscriptions, line):
+    command, *session_names = line.split()
+    if command == "add":
+        _report(subscriptions.add(session_names), [])
+    elif command == "remove":
+        _report([], subscriptions.remove(session_names))
+    elif command == "set":
+        _report(*subscriptions.update(session_names))
+    else:
+        raise ValueError("Unknown command '{}'".format(command))
+
+
+# The file descriptor of `stream` is read directly: the buffer of the stream
+# could hold several commands while the descriptor is no longer readable.
+async def follow_commands(subscriptions, stream=sys.stdin):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    fd = stream.fileno()
+    chunks = asyncio.Queue()
+    loop.add_reader(fd, lambda: chunks.put_nowait(os.read(fd, 65536)))
+
+    partial = b""
+    try:
+        while True:
+            chunk = await chunks.get()
+            if chunk:
+                *lines, partial = (partial + chunk).split(b"\n")
+            else:
+                # The last line may lack its newline.
+                lines, partial = [partial], b""
+
+            for line in lines:
+                line = line.decode("utf-8", "replace")
+                if not line.strip():
+                    continue
+
+                try:
+                    apply_command(subscriptions, line)
+                except (ValueError, RuntimeError) as e:
+                    logger.error("%s", e)
+
+            if not chunk:
+                # End of input: keep the current sessions.
+                return
+    finally:
+        loop.remove_reader(fd)
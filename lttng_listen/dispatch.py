@@ -0,0 +1,29 @@
+from .notification import CONDITION_TYPES
+
+
+class Dispatcher:
+    """Route records to the handlers registered for their condition type.
+
+    The table holds a tuple of handlers per condition type and is filled in
+    before the listener starts, so routing a record costs a single lookup.
+    """
+
+    def __init__(self):
+        self._handlers = {condition_type: () for condition_type in CONDITION_TYPES}
+
+    def register(self, condition_type, handler):
+        self._handlers[condition_type] += (handler,)
+
+    def register_all(self, handler):
+        for condition_type in self._handlers:
+            self.register(condition_type, handler)
+
+    def __call__(self, record):
+        for handler in self._handlers[record.condition_type]:
+            handler(record)
+
+    def dispatch_batch(self, batch):
+        handlers = self._handlers
+        for record in batch:
+            for handler in handlers[record.condition_type]:
+                handler(record)
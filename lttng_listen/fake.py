@@ -0,0 +1,777 @@
+# Pure-Python stand-in for the (ffi, ctl) pair returned by
+# lttng_listen.binding.load(), used to test and benchmark the listener
+# without a session daemon. With LTTNG_LISTEN_FFI=fake, the listener plays
+# the notification stream described by the environment (see
+# load_from_environment()).
+
+import atexit
+import collections
+import json
+import os
+import re
+import shlex
+import statistics
+import threading
+import time
+
+from .cdef import CDEF
+from .notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+    RotationOngoing,
+)
+from .output import read_binary
+from .relay import is_relay
+from .rotations import percentile
+
+# Script or binary recording (lttng-listen.py --format binary) to play.
+SCRIPT_ENV = "LTTNG_LISTEN_FAKE_SCRIPT"
+RECORDING_ENV = "LTTNG_LISTEN_FAKE_RECORDING"
+# Notifications emitted per second, 0 meaning as fast as possible.
+RATE_ENV = "LTTNG_LISTEN_FAKE_RATE"
+# JSON file where the emission-to-destruction latencies are summarized at
+# exit.
+STATS_ENV = "LTTNG_LISTEN_FAKE_STATS"
+
+
+class Pointer:
+    __slots__ = ("value",)
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def __getitem__(self, index):
+        return self.value
+
+    def __setitem__(self, index, value):
+        self.value = value
+
+
+class FakeFFI:
+    NULL = None
+
+    def new(self, ctype, init=None):
+        if ctype == "char[]":
+            return init
+        return Pointer(init)
+
+    def string(self, cdata):
+        return cdata
+
+
+class Condition:
+    __slots__ = ("type", "session_name", "channel_name", "domain", "threshold")
+
+    def __init__(self, type, session_name=None):
+        self.type = type
+        self.session_name = session_name
+        self.channel_name = None
+        self.domain = None
+        self.threshold = None
+
+    def _key(self):
+        return tuple(getattr(self, a) for a in self.__slots__)
+
+    def __eq__(self, other):
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+
+class Location:
+    __slots__ = ("type", "path", "host", "control_port", "data_port")
+
+    def __init__(self, type, path, host=None, control_port=0, data_port=0):
+        self.type = type
+        self.path = path
+        self.host = host
+        self.control_port = control_port
+        self.data_port = data_port
+
+
+class Evaluation:
+    __slots__ = ("type", "rotation_id", "location", "value", "ratio")
+
+    def __init__(self, type, rotation_id=0, location=None, value=0, ratio=0.0):
+        self.type = type
+        self.rotation_id = rotation_id
+        self.location = location
+        self.value = value
+        self.ratio = ratio
+
+
+class Notification:
+    __slots__ = ("condition", "evaluation", "sent")
+
+    def __init__(self, condition, evaluation):
+        self.condition = condition
+        self.evaluation = evaluation
+        self.sent = None
+
+
+class Action:
+    __slots__ = ("type", "actions")
+
+    def __init__(self, type, actions=()):
+        self.type = type
+        self.actions = list(actions)
+
+
+class Trigger:
+    __slots__ = ("name", "condition", "action")
+
+    def __init__(self, name, condition, action):
+        self.name = name
+        self.condition = condition
+        self.action = action
+
+
+class Session:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Channel:
+    def __init__(self):
+        self.queue = collections.deque()
+        self.ready = threading.Condition()
+        self.subscriptions = set()
+
+
+class Status:
+    """Queued to make get_next_notification() return a status other than OK.
+
+    `name` is the enumerator of lttng_notification_channel_status without
+    its prefix.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return "Status({!r})".format(self.name)
+
+
+# DROPPED is queued in place of the notifications the fake session daemon
+# dropped. CLOSED stays at the head of the queue, as a closed channel keeps
+# reporting it.
+DROPPED = Status("NOTIFICATIONS_DROPPED")
+INTERRUPTED = Status("INTERRUPTED")
+CLOSED = Status("CLOSED")
+ERROR = Status("ERROR")
+
+STATUSES = {
+    "dropped": DROPPED,
+    "interrupted": INTERRUPTED,
+    "closed": CLOSED,
+    "error": ERROR,
+}
+
+
+# Script events changing the pace of a Player.
+class Rate:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Sleep:
+    __slots__ = ("seconds",)
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+# `latency` is the duration of a round trip to the fake session daemon and
+# `rotations` the number of rotation completed notifications queued for
+# every session when its condition is subscribed to.
+class FakeCtl:
+    def __init__(self, latency=0.0, rotations=0):
+        # Expose every enumerator of the real declarations.
+        for name, value in re.findall(r"\b(LTTNG_\w+)\s*=\s*(-?\d+)", CDEF):
+            setattr(self, name, int(value))
+
+        self.lttng_session_daemon_notification_endpoint = object()
+        self.channels = []
+        self.latency = latency
+        self.rotations = rotations
+        self.requested_rotations = []
+        self.sessions = []
+        self.triggers = []
+        # Like the session daemon, drop the notifications sent to a channel
+        # which already has `queue_limit` notifications queued.
+        self.queue_limit = None
+        # Seconds between the emission and the destruction of each
+        # notification, when set to a list.
+        self.latencies = None
+        self.last_destroyed = None
+        # Started when a channel first waits for a notification.
+        self.player = None
+
+    # Feed a notification, or a Status, to every channel.
+    def emit(self, notification):
+        if not isinstance(notification, Status):
+            notification.sent = time.perf_counter()
+        for channel in self.channels:
+            with channel.ready:
+                queue = channel.queue
+                if self.queue_limit is not None and len(queue) >= self.queue_limit:
+                    if queue[-1] is not DROPPED:
+                        queue.append(DROPPED)
+                    continue
+                queue.append(notification)
+                channel.ready.notify()
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def rotation_completed(self, session_name, rotation_id, path):
+        condition = Condition(
+            self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_COMPLETED,
+            session_name.encode("utf-8"),
+        )
+        location = Location(
+            self.LTTNG_TRACE_ARCHIVE_LOCATION_TYPE_LOCAL, path.encode("utf-8")
+        )
+        evaluation = Evaluation(condition.type, rotation_id, location)
+        return Notification(condition, evaluation)
+
+    def relay_rotation_completed(
+        self, session_name, rotation_id, host, control_port, data_port, path
+    ):
+        notification = self.rotation_completed(session_name, rotation_id, path)
+        notification.evaluation.location = Location(
+            self.LTTNG_TRACE_ARCHIVE_LOCATION_TYPE_RELAY,
+            path.encode("utf-8"),
+            host.encode("utf-8"),
+            control_port,
+            data_port,
+        )
+        return notification
+
+    def rotation_ongoing(self, session_name, rotation_id):
+        condition = Condition(
+            self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_ONGOING,
+            session_name.encode("utf-8"),
+        )
+        return Notification(condition, Evaluation(condition.type, rotation_id))
+
+    def consumed_size(self, session_name, consumed_size):
+        condition = Condition(
+            self.LTTNG_CONDITION_TYPE_SESSION_CONSUMED_SIZE,
+            session_name.encode("utf-8"),
+        )
+        evaluation = Evaluation(condition.type, value=consumed_size)
+        return Notification(condition, evaluation)
+
+    def buffer_usage(self, session_name, channel_name, usage, ratio, high=True):
+        condition = Condition(
+            self.LTTNG_CONDITION_TYPE_BUFFER_USAGE_HIGH
+            if high
+            else self.LTTNG_CONDITION_TYPE_BUFFER_USAGE_LOW,
+            session_name.encode("utf-8"),
+        )
+        condition.channel_name = channel_name.encode("utf-8")
+        evaluation = Evaluation(condition.type, value=usage, ratio=ratio)
+        return Notification(condition, evaluation)
+
+    # notification/channel.h
+    def lttng_notification_channel_create(self, endpoint):
+        channel = Channel()
+        self.channels.append(channel)
+        return channel
+
+    def _start_player(self):
+        if self.player is not None and not self.player.started:
+            self.player.start()
+
+    def lttng_notification_channel_get_next_notification(self, channel, out):
+        self._start_player()
+        with channel.ready:
+            while not channel.queue:
+                channel.ready.wait()
+            if channel.queue[0] is CLOSED:
+                notification = CLOSED
+            else:
+                notification = channel.queue.popleft()
+        if isinstance(notification, Status):
+            return getattr(
+                self, "LTTNG_NOTIFICATION_CHANNEL_STATUS_" + notification.name
+            )
+        out[0] = notification
+        return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK
+
+    def lttng_notification_channel_has_pending_notification(self, channel, out):
+        self._start_player()
+        out[0] = bool(channel.queue)
+        return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK
+
+    def lttng_notification_channel_subscribe(self, channel, condition):
+        self._round_trip()
+        if condition in channel.subscriptions:
+            return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_ALREADY_SUBSCRIBED
+        channel.subscriptions.add(condition)
+        if condition.type == self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_COMPLETED:
+            session_name = condition.session_name.decode("utf-8")
+            for i in range(self.rotations):
+                path = "/tmp/{}/archives/{}".format(session_name, i)
+                notification = self.rotation_completed(session_name, i, path)
+                notification.sent = time.perf_counter()
+                channel.queue.append(notification)
+        return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK
+
+    def lttng_notification_channel_unsubscribe(self, channel, condition):
+        self._round_trip()
+        if condition not in channel.subscriptions:
+            return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_UNKNOWN_CONDITION
+        channel.subscriptions.remove(condition)
+        return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_OK
+
+    def lttng_notification_channel_destroy(self, channel):
+        self.channels.remove(channel)
+
+    # notification/notification.h
+    def lttng_notification_get_condition(self, notification):
+        return notification.condition
+
+    def lttng_notification_get_evaluation(self, notification):
+        return notification.evaluation
+
+    def lttng_notification_destroy(self, notification):
+        if self.latencies is not None:
+            self.last_destroyed = time.perf_counter()
+            self.latencies.append(self.last_destroyed - notification.sent)
+
+    # condition/condition.h, evaluation.h
+    def lttng_condition_get_type(self, condition):
+        return condition.type
+
+    def lttng_condition_destroy(self, condition):
+        pass
+
+    def lttng_evaluation_get_type(self, evaluation):
+        return evaluation.type
+
+    # condition/session-rotation.h
+    def lttng_condition_session_rotation_ongoing_create(self):
+        return Condition(self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_ONGOING)
+
+    def lttng_condition_session_rotation_completed_create(self):
+        return Condition(self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_COMPLETED)
+
+    def lttng_condition_session_rotation_get_session_name(self, condition, out):
+        if condition.session_name is None:
+            return self.LTTNG_CONDITION_STATUS_UNSET
+        out[0] = condition.session_name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_session_rotation_set_session_name(self, condition, name):
+        condition.session_name = name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    # condition/session-consumed-size.h
+    def lttng_condition_session_consumed_size_create(self):
+        return Condition(self.LTTNG_CONDITION_TYPE_SESSION_CONSUMED_SIZE)
+
+    def lttng_condition_session_consumed_size_set_session_name(self, condition, name):
+        condition.session_name = name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_session_consumed_size_get_session_name(self, condition, out):
+        out[0] = condition.session_name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_session_consumed_size_set_threshold(self, condition, value):
+        condition.threshold = value
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_evaluation_session_consumed_size_get_consumed_size(
+        self, evaluation, out
+    ):
+        out[0] = evaluation.value
+        return self.LTTNG_EVALUATION_STATUS_OK
+
+    # condition/buffer-usage.h
+    def lttng_condition_buffer_usage_high_create(self):
+        return Condition(self.LTTNG_CONDITION_TYPE_BUFFER_USAGE_HIGH)
+
+    def lttng_condition_buffer_usage_low_create(self):
+        return Condition(self.LTTNG_CONDITION_TYPE_BUFFER_USAGE_LOW)
+
+    def lttng_condition_buffer_usage_set_session_name(self, condition, name):
+        condition.session_name = name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_buffer_usage_get_session_name(self, condition, out):
+        out[0] = condition.session_name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_buffer_usage_set_channel_name(self, condition, name):
+        condition.channel_name = name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_buffer_usage_get_channel_name(self, condition, out):
+        out[0] = condition.channel_name
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_buffer_usage_set_domain_type(self, condition, domain):
+        condition.domain = domain
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_condition_buffer_usage_set_threshold_ratio(self, condition, ratio):
+        condition.threshold = ratio
+        return self.LTTNG_CONDITION_STATUS_OK
+
+    def lttng_evaluation_buffer_usage_get_usage(self, evaluation, out):
+        out[0] = evaluation.value
+        return self.LTTNG_EVALUATION_STATUS_OK
+
+    def lttng_evaluation_buffer_usage_get_usage_ratio(self, evaluation, out):
+        out[0] = evaluation.ratio
+        return self.LTTNG_EVALUATION_STATUS_OK
+
+    def lttng_evaluation_session_rotation_get_id(self, evaluation, out):
+        out[0] = evaluation.rotation_id
+        return self.LTTNG_EVALUATION_STATUS_OK
+
+    def lttng_evaluation_session_rotation_completed_get_location(
+        self, evaluation, out
+    ):
+        out[0] = evaluation.location
+        return self.LTTNG_EVALUATION_STATUS_OK
+
+    # location.h
+    def lttng_trace_archive_location_get_type(self, location):
+        return location.type
+
+    def lttng_trace_archive_location_local_get_absolute_path(self, location, out):
+        out[0] = location.path
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    def lttng_trace_archive_location_relay_get_host(self, location, out):
+        out[0] = location.host
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    def lttng_trace_archive_location_relay_get_control_port(self, location, out):
+        out[0] = location.control_port
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    def lttng_trace_archive_location_relay_get_data_port(self, location, out):
+        out[0] = location.data_port
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    def lttng_trace_archive_location_relay_get_protocol_type(self, location, out):
+        out[0] = self.LTTNG_TRACE_ARCHIVE_LOCATION_RELAY_PROTOCOL_TYPE_TCP
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    def lttng_trace_archive_location_relay_get_relative_path(self, location, out):
+        out[0] = location.path
+        return self.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK
+
+    # rotation.h
+    def lttng_rotate_session(self, session_name, descriptor, out):
+        self._round_trip()
+        self.requested_rotations.append(session_name)
+        out[0] = object()
+        return 0
+
+    def lttng_rotation_handle_destroy(self, handle):
+        pass
+
+    # session.h
+    def lttng_list_sessions(self, out):
+        self._round_trip()
+        out[0] = [Session(name.encode("utf-8")) for name in self.sessions]
+        return len(self.sessions)
+
+    def free(self, pointer):
+        pass
+
+    def lttng_strerror(self, code):
+        return "Error {}".format(code).encode("utf-8")
+
+    # trigger/trigger.h, action/*.h
+    def lttng_action_notify_create(self):
+        return Action(self.LTTNG_ACTION_TYPE_NOTIFY)
+
+    def lttng_action_destroy(self, action):
+        pass
+
+    def lttng_action_get_type(self, action):
+        return action.type
+
+    def lttng_action_group_get_count(self, action, out):
+        out[0] = len(action.actions)
+        return self.LTTNG_ACTION_STATUS_OK
+
+    def lttng_action_group_get_at_index_const(self, action, index):
+        return action.actions[index]
+
+    def lttng_trigger_create(self, condition, action):
+        return Trigger(None, condition, action)
+
+    def lttng_trigger_destroy(self, trigger):
+        pass
+
+    def lttng_trigger_get_const_condition(self, trigger):
+        return trigger.condition
+
+    def lttng_trigger_get_const_action(self, trigger):
+        return trigger.action
+
+    def lttng_trigger_get_name(self, trigger, out):
+        if trigger.name is None:
+            return self.LTTNG_TRIGGER_STATUS_UNSET
+        out[0] = trigger.name
+        return self.LTTNG_TRIGGER_STATUS_OK
+
+    def lttng_register_trigger(self, trigger):
+        self._round_trip()
+        if trigger.name is None:
+            trigger.name = "trigger{}".format(len(self.triggers)).encode("utf-8")
+        self.triggers.append(trigger)
+        return 0
+
+    def lttng_list_triggers(self, out):
+        self._round_trip()
+        out[0] = list(self.triggers)
+        return 0
+
+    def lttng_triggers_get_count(self, triggers, out):
+        out[0] = len(triggers)
+        return self.LTTNG_TRIGGER_STATUS_OK
+
+    def lttng_triggers_get_at_index(self, triggers, index):
+        return triggers[index]
+
+    def lttng_triggers_destroy(self, triggers):
+        pass
+
+    def lttng_unregister_trigger(self, trigger):
+        return 0
+
+
+class Player:
+    """Thread emitting a stream of notifications on a fake session daemon.
+
+    `events` holds notifications, Status markers and Rate and Sleep events.
+    Emission times are computed from the start of the stream at the current
+    rate (0 meaning as fast as possible), so a slow emission is caught up
+    on rather than delaying every following one.
+    """
+
+    def __init__(self, ctl, events, rate=0.0):
+        self._ctl = ctl
+        self._events = events
+        self._rate = rate
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.started = False
+        self.emitted = 0
+        self.start_time = None
+
+    def start(self):
+        self.started = True
+        self._thread.start()
+
+    def _run(self):
+        clock = time.perf_counter
+        rate = self._rate
+        self.start_time = due = clock()
+        for event in self._events:
+            if isinstance(event, Rate):
+                rate = event.value
+                due = max(due, clock())
+                continue
+            if isinstance(event, Sleep):
+                due = max(due, clock()) + event.seconds
+                time.sleep(max(0.0, due - clock()))
+                continue
+
+            if rate:
+                delay = due - clock()
+                if delay > 0:
+                    time.sleep(delay)
+                due += 1 / rate
+            self._ctl.emit(event)
+            self.emitted += 1
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+
+def _int(value):
+    return int(value, 0)
+
+
+# Notification constructors of the script commands and the converters of
+# their arguments.
+_SCRIPT_NOTIFICATIONS = {
+    "rotation-completed": ("rotation_completed", (str, _int, str)),
+    "relay-rotation-completed": (
+        "relay_rotation_completed",
+        (str, _int, str, _int, _int, str),
+    ),
+    "rotation-ongoing": ("rotation_ongoing", (str, _int)),
+    "consumed-size": ("consumed_size", (str, _int)),
+    "buffer-usage-high": ("buffer_usage", (str, str, _int, float)),
+    "buffer-usage-low": ("buffer_usage", (str, str, _int, float)),
+}
+
+
+def _script_notification(ctl, command, args):
+    method, types = _SCRIPT_NOTIFICATIONS[command]
+    if len(args) != len(types):
+        raise ValueError("'{}' takes {} arguments".format(command, len(types)))
+
+    args = [convert(arg) for convert, arg in zip(types, args)]
+    if command == "buffer-usage-low":
+        args.append(False)
+    return getattr(ctl, method)(*args)
+
+
+def read_script(ctl, lines):
+    """Yield the events of a script, one command per line.
+
+        rate N                                  emit N notifications/s (0: no limit)
+        sleep SECONDS
+        rotation-completed SESSION ID PATH
+        relay-rotation-completed SESSION ID HOST CONTROL_PORT DATA_PORT PATH
+        rotation-ongoing SESSION ID
+        consumed-size SESSION BYTES
+        buffer-usage-high|low SESSION CHANNEL BYTES RATIO
+        generate COUNT COMMAND ARGS...          {i} in ARGS is replaced by 0..COUNT-1
+        dropped | interrupted | closed | error  status of the next get_next()
+
+    Empty lines and lines starting with '#' are ignored.
+    """
+    for number, line in enumerate(lines, 1):
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+
+        command, args = words[0], words[1:]
+        try:
+            if command == "rate":
+                yield Rate(float(args[0]))
+            elif command == "sleep":
+                yield Sleep(float(args[0]))
+            elif command in STATUSES and not args:
+                yield STATUSES[command]
+            elif command == "generate":
+                count, command, args = int(args[0]), args[1], args[2:]
+                for i in range(count):
+                    yield _script_notification(
+                        ctl, command, [arg.replace("{i}", str(i)) for arg in args]
+                    )
+            elif command in _SCRIPT_NOTIFICATIONS:
+                yield _script_notification(ctl, command, args)
+            else:
+                raise ValueError("unknown command '{}'".format(command))
+        except (IndexError, KeyError, ValueError) as e:
+            raise RuntimeError(
+                "Invalid fake script line {}: {}".format(number, e)
+            ) from None
+
+
+def read_recording(ctl, stream, paced=True):
+    """Yield the events replaying a stream of binary records.
+
+    When `paced`, the notifications are spaced like they were received.
+    """
+    previous = None
+    for record in read_binary(stream):
+        if paced and previous is not None and record.timestamp > previous:
+            yield Sleep((record.timestamp - previous) / 1e9)
+        previous = record.timestamp
+
+        if isinstance(record, RotationCompleted) and is_relay(record.archive_path):
+            relay = record.archive_path
+            yield ctl.relay_rotation_completed(
+                record.session_name,
+                record.rotation_id,
+                relay.host,
+                relay.control_port,
+                relay.data_port,
+                relay.path,
+            )
+        elif isinstance(record, RotationCompleted):
+            yield ctl.rotation_completed(
+                record.session_name, record.rotation_id, record.archive_path
+            )
+        elif isinstance(record, RotationOngoing):
+            yield ctl.rotation_ongoing(record.session_name, record.rotation_id)
+        elif isinstance(record, ConsumedSize):
+            yield ctl.consumed_size(record.session_name, record.consumed_size)
+        elif isinstance(record, (BufferUsageHigh, BufferUsageLow)):
+            yield ctl.buffer_usage(
+                record.session_name,
+                record.channel_name,
+                record.usage,
+                record.usage_ratio,
+                isinstance(record, BufferUsageHigh),
+            )
+
+
+# `duration` spans from the start of the stream to the destruction of the
+# last notification.
+def write_stats(ctl, path):
+    latencies = sorted(ctl.latencies or ())
+    player = ctl.player
+    stats = {
+        "emitted": player.emitted if player else 0,
+        "received": len(latencies),
+        "duration": (
+            ctl.last_destroyed - player.start_time
+            if player and player.start_time is not None and latencies
+            else None
+        ),
+    }
+    if latencies:
+        stats.update(
+            latency_p50=statistics.median(latencies),
+            latency_p99=percentile(latencies, 0.99),
+            latency_max=latencies[-1],
+        )
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=2)
+
+
+def load(latency=0.0, rotations=0):
+    return FakeFFI(), FakeCtl(latency, rotations)
+
+
+def load_from_environment():
+    """Return a fake (ffi, ctl) pair playing the stream set by the environment.
+
+    The stream starts when the listener first waits for a notification.
+    The listener keeps waiting once the stream ends: end scripts with
+    "closed" to stop it.
+    """
+    ffi, ctl = load()
+    rate = float(os.environ.get(RATE_ENV, 0))
+    script = os.environ.get(SCRIPT_ENV)
+    recording = os.environ.get(RECORDING_ENV)
+    if script:
+        with open(script) as f:
+            events = list(read_script(ctl, f))
+    elif recording:
+        with open(recording, "rb") as f:
+            events = list(read_recording(ctl, f, paced=not rate))
+    else:
+        events = []
+    ctl.player = Player(ctl, events, rate)
+
+    stats = os.environ.get(STATS_ENV)
+    if stats:
+        ctl.latencies = []
+        atexit.register(write_stats, ctl, stats)
+    return ffi, ctl
@@ -0,0 +1,159 @@
+import collections
+import fnmatch
+
+from .notification import CONDITION_TYPES, RECORDS, session_name_getters
+
+# Action types, by name, as used on the command line.
+ACTION_TYPES = {
+    "notify": "LTTNG_ACTION_TYPE_NOTIFY",
+    "start-session": "LTTNG_ACTION_TYPE_START_SESSION",
+    "stop-session": "LTTNG_ACTION_TYPE_STOP_SESSION",
+    "rotate-session": "LTTNG_ACTION_TYPE_ROTATE_SESSION",
+    "snapshot-session": "LTTNG_ACTION_TYPE_SNAPSHOT_SESSION",
+}
+
+# Condition types, by record kind.
+CONDITION_KINDS = {
+    record.kind: condition_type for condition_type, record in RECORDS.items()
+}
+
+# A trigger of the session daemon. `actions` is the set of the action types
+# of the trigger, including the ones of the members of an action group, and
+# `session_name` is None when the condition does not target a session.
+TriggerInfo = collections.namedtuple(
+    "TriggerInfo", ["name", "condition_type", "session_name", "actions", "condition"]
+)
+
+
+class TriggerInventory:
+    """Snapshot of the triggers registered to the session daemon.
+
+    The triggers are listed with a single call and their name, condition
+    type, session and actions are extracted once. Selecting the triggers to
+    subscribe to then only filters the inventory. `condition` of the
+    entries remains valid until the inventory is refreshed or closed.
+    """
+
+    def __init__(self, ffi, ctl):
+        self._ffi = ffi
+        self._ctl = ctl
+        self._triggers = None
+        self._string_p = ffi.new("char **")
+        self._count_p = ffi.new("unsigned int *")
+        self._session_name_getters = session_name_getters(ctl)
+        self.entries = []
+        self.refresh()
+
+    def refresh(self):
+        ffi = self._ffi
+        ctl = self._ctl
+
+        triggers_p = ffi.new("struct lttng_triggers **")
+        if ctl.lttng_list_triggers(triggers_p) != 0:
+            raise RuntimeError("Failed to list triggers")
+
+        triggers = triggers_p[0]
+        try:
+            status = ctl.lttng_triggers_get_count(triggers, self._count_p)
+            if status != ctl.LTTNG_TRIGGER_STATUS_OK:
+                raise RuntimeError("Failed to get trigger count")
+
+            entries = [
+                self._entry(ctl.lttng_triggers_get_at_index(triggers, i))
+                for i in range(self._count_p[0])
+            ]
+        except BaseException:
+            ctl.lttng_triggers_destroy(triggers)
+            raise
+
+        self.close()
+        self._triggers = triggers
+        self.entries = entries
+
+    def _string(self, getter, obj):
+        if getter(obj, self._string_p) != 0:
+            return None
+        return self._ffi.string(self._string_p[0]).decode("utf-8")
+
+    def _actions(self, action):
+        ctl = self._ctl
+        action_type = ctl.lttng_action_get_type(action)
+        if action_type != ctl.LTTNG_ACTION_TYPE_GROUP:
+            return frozenset((action_type,))
+
+        status = ctl.lttng_action_group_get_count(action, self._count_p)
+        if status != ctl.LTTNG_ACTION_STATUS_OK:
+            raise RuntimeError("Failed to get action count from action group")
+
+        return frozenset(
+            ctl.lttng_action_get_type(
+                ctl.lttng_action_group_get_at_index_const(action, i)
+            )
+            for i in range(self._count_p[0])
+        )
+
+    def _entry(self, trigger):
+        ctl = self._ctl
+        condition = ctl.lttng_trigger_get_const_condition(trigger)
+        condition_type = ctl.lttng_condition_get_type(condition)
+
+        getter = self._session_name_getters.get(condition_type)
+        return TriggerInfo(
+            self._string(ctl.lttng_trigger_get_name, trigger),
+            condition_type,
+            None if getter is None else self._string(getter, condition),
+            self._actions(ctl.lttng_trigger_get_const_action(trigger)),
+            condition,
+        )
+
+    def select(self, action_types=None, condition_types=None, session_glob=None):
+        """Return the triggers with a notify action matching the filters.
+
+        A trigger matches `action_types` if any of its actions is of one of
+        these types. Only the condition types which can be decoded are
+        selected by default.
+        """
+        notify = self._ctl.LTTNG_ACTION_TYPE_NOTIFY
+        if condition_types is None:
+            condition_types = CONDITION_TYPES
+        condition_types = frozenset(condition_types)
+        if action_types is not None:
+            action_types = frozenset(action_types)
+
+        return [
+            entry
+            for entry in self.entries
+            if notify in entry.actions
+            and entry.condition_type in condition_types
+            and (action_types is None or not action_types.isdisjoint(entry.actions))
+            and (
+                session_glob is None
+                or (
+                    entry.session_name is not None
+                    and fnmatch.fnmatchcase(entry.session_name, session_glob)
+                )
+            )
+        ]
+
+    def close(self):
+        if self._triggers is not None:
+            self._ctl.lttng_triggers_destroy(self._triggers)
+            self._triggers = None
+            self.entries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Subscribe to the conditions of triggers selected from an inventory. Triggers
+# sharing a condition only need one subscription.
+def subscribe_triggers(channel, entries):
+    subscribed = []
+    for entry in entries:
+        if channel.subscribe(entry.condition, allow_existing=True):
+            subscribed.append(entry)
+
+    return subscribed
@@ -0,0 +1,481 @@
+import collections
+import itertools
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from .notification import RotationCompleted
+from .relay import is_relay, parse_archive_path
+
+# Journal entries: a header holding the CRC-32 of the rest of the entry, the
+# size of the entry (header included), the rotation id and the sizes of the
+# session name and archive path that follow it, all little-endian. Strings
+# are UTF-8 encoded and not null-terminated. An entry with a bad CRC or
+# size, left by a crash in the middle of a write, ends the journal.
+#
+# Offsets in the journal count every byte ever appended to it. Once
+# compacted, the journal starts with a header entry with an empty session
+# name, whose rotation id is the offset of the start of the file and whose
+# archive path holds the number of entries following it which hold the last
+# chunk removed from the journal for each session, then the number of
+# entries which were not acknowledged yet when they were removed. Each of
+# those follows a marker entry with an empty session name, whose rotation
+# id is the offset the entry had in the journal.
+JOURNAL_ENTRY = struct.Struct("<IIQHH")
+
+JOURNAL_NAME = "journal"
+CURSOR_NAME = "cursor"
+# Entries whose processing failed `max_attempts` times, in the journal
+# format.
+DEAD_LETTERS_NAME = "dead-letters"
+
+# Longest time an acknowledged entry waits before the cursor is saved.
+DEFAULT_COMMIT_INTERVAL = 0.1
+# Acknowledged bytes at the start of the journal from which the journal is
+# rewritten without them.
+DEFAULT_COMPACT_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+
+def encode_entry(record):
+    session_name = record.session_name.encode("utf-8")
+    archive_path = str(record.archive_path).encode("utf-8")
+    size = JOURNAL_ENTRY.size + len(session_name) + len(archive_path)
+    body = (
+        JOURNAL_ENTRY.pack(
+            0, size, record.rotation_id, len(session_name), len(archive_path)
+        )[4:]
+        + session_name
+        + archive_path
+    )
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+# Yield the (end offset, record) of the valid entries of `data`, from
+# `offset`.
+def read_entries(data, offset=0):
+    while offset + JOURNAL_ENTRY.size <= len(data):
+        crc, size, rotation_id, name_len, path_len = JOURNAL_ENTRY.unpack_from(
+            data, offset
+        )
+        end = offset + size
+        if (
+            size != JOURNAL_ENTRY.size + name_len + path_len
+            or end > len(data)
+            or zlib.crc32(data[offset + 4 : end]) != crc
+        ):
+            return
+
+        strings = offset + JOURNAL_ENTRY.size
+        session_name = data[strings : strings + name_len].decode("utf-8")
+        archive_path = parse_archive_path(
+            data[strings + name_len : end].decode("utf-8")
+        )
+        yield end, RotationCompleted(
+            session_name, rotation_id, archive_path, time.monotonic_ns()
+        )
+        offset = end
+
+
+# Return the offset of the start of `data` in the journal, the chunks of its
+# compaction header, the (offset, record) of the unacknowledged entries it
+# carries and the offset of the first entry following the header.
+def read_header(data):
+    entries = read_entries(data)
+    first = next(entries, None)
+    if first is None or first[1].session_name:
+        return 0, [], [], 0
+
+    end, header = first
+    count, _, carried = str(header.archive_path).partition(" ")
+    compacted = list(itertools.islice(entries, int(count)))
+    pairs = list(itertools.islice(entries, 2 * int(carried or 0)))
+    if pairs:
+        end = pairs[-1][0]
+    elif compacted:
+        end = compacted[-1][0]
+    carried = [
+        (marker.rotation_id, record)
+        for (_, marker), (_, record) in zip(pairs[::2], pairs[1::2])
+    ]
+    return header.rotation_id, [record for _, record in compacted], carried, end
+
+
+def _fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Trace chunk directories are named after their time span and rotation id
+# (e.g. "20200101T000000+0000-20200101T000100+0000-1").
+def _chunk_rotation_id(name):
+    _, _, suffix = name.rpartition("-")
+    return int(suffix) if suffix.isdigit() else None
+
+
+class Journal:
+    """Write-ahead journal of the completed trace chunks.
+
+    append() only queues the record: a writer thread appends every queued
+    record to the journal with a single write and fsync (group commit), and
+    then hands them to `deliver`. The cursor is the offset of the first
+    entry which was not acknowledged with ack() yet. It is saved along with
+    the end offsets of the entries after it which were acknowledged, so a
+    listener that is restarted delivers the entries which were in flight
+    when it stopped, and only those. Entries which are never acknowledged,
+    like the chunks which failed to be processed, are delivered again by
+    the next listener.
+
+    Entries reported with fail() are delivered again, up to `max_attempts`
+    times in all, and are then appended to the dead letters and
+    acknowledged.
+
+    Once the last acknowledged entry is `compact_size` bytes past the start
+    of the journal, the writer thread rewrites the journal without the
+    acknowledged entries before it. The entries which were not acknowledged
+    yet are kept, in the compaction header.
+    """
+
+    def __init__(
+        self,
+        directory,
+        commit_interval=DEFAULT_COMMIT_INTERVAL,
+        compact_size=DEFAULT_COMPACT_SIZE,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._path = os.path.join(directory, JOURNAL_NAME)
+        self._cursor_path = os.path.join(directory, CURSOR_NAME)
+        self._dead_letters_path = os.path.join(directory, DEAD_LETTERS_NAME)
+        self._commit_interval = commit_interval
+        self._compact_size = compact_size
+        self._max_attempts = max_attempts
+        self._queue = queue.SimpleQueue()
+        self._failed = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._deliver = None
+
+        # Whether the entries after the cursor were acknowledged, by end
+        # offset, in journal order, and the end offset of the records in
+        # flight.
+        self._inflight = collections.OrderedDict()
+        self._offsets = {}
+        # Deliveries of the entries which failed, by end offset.
+        self._attempts = {}
+
+        # Chunks already journaled, the archive directory of each session
+        # and the last rotation id removed from the journal by the
+        # compaction for each session, for reconcile().
+        self._known = set()
+        self._archive_dirs = {}
+        self._compacted = {}
+
+        self.commits = 0
+        self.entries = 0
+        self.compactions = 0
+        self.dead_letters = 0
+
+        try:
+            with open(self._cursor_path) as f:
+                self.cursor, *acknowledged = [int(line) for line in f]
+        except (FileNotFoundError, ValueError):
+            self.cursor, acknowledged = 0, []
+        acknowledged = set(acknowledged)
+        self._saved = self._cursor_state()
+
+        self._file = open(self._path, "a+b")
+        self._file.seek(0)
+        data = self._file.read()
+        # Journal offset of the start of the file.
+        self._start, compacted, carried, position = read_header(data)
+        for record in compacted:
+            self._remember(record)
+            self._compacted[record.session_name] = record.rotation_id
+
+        entries = list(carried)
+        for position, record in read_entries(data, position):
+            entries.append((self._start + position, record))
+
+        self._unacknowledged = []
+        for end, record in entries:
+            self._remember(record)
+            if end <= self.cursor:
+                continue
+            if end in acknowledged:
+                self._inflight[end] = True
+            else:
+                self._track(end, record)
+                self._unacknowledged.append(record)
+
+        # Drop the partial entry a crash may have left.
+        if position < len(data):
+            self._file.truncate(position)
+        self._size = self._start + position
+
+    def _remember(self, record):
+        self._known.add(record.archive_path)
+        if is_relay(record.archive_path):
+            return
+        self._archive_dirs[record.session_name] = os.path.dirname(
+            record.archive_path
+        )
+
+    def start(self, deliver):
+        """Deliver the unacknowledged entries again, then start journaling."""
+        self._deliver = deliver
+        for record in self._unacknowledged:
+            deliver(record)
+        self._unacknowledged = []
+        self._thread.start()
+
+    def append(self, record):
+        self._queue.put(record)
+
+    def _track(self, end, record):
+        with self._lock:
+            self._inflight[end] = False
+            self._offsets[id(record)] = end
+
+    def ack(self, record):
+        with self._lock:
+            self._inflight[self._offsets.pop(id(record))] = True
+            while self._inflight:
+                end, done = next(iter(self._inflight.items()))
+                if not done:
+                    break
+                self._inflight.popitem(last=False)
+                self.cursor = end
+
+    def fail(self, record):
+        """Report that the processing of a delivered record failed."""
+        self._failed.put(record)
+
+    # Deliver the failed records again, or move them to the dead letters.
+    def _retry(self):
+        dead = []
+        while True:
+            try:
+                record = self._failed.get_nowait()
+            except queue.Empty:
+                break
+
+            with self._lock:
+                end = self._offsets[id(record)]
+            attempts = self._attempts.pop(end, 1)
+            if attempts < self._max_attempts:
+                self._attempts[end] = attempts + 1
+                self._deliver(record)
+            else:
+                dead.append((record, attempts))
+
+        if not dead:
+            return
+        with open(self._dead_letters_path, "ab") as f:
+            f.write(b"".join(encode_entry(record) for record, _ in dead))
+            f.flush()
+            os.fsync(f.fileno())
+        for record, attempts in dead:
+            logger.error(
+                "Chunk %s failed %d time(s), moved to %s",
+                record.archive_path,
+                attempts,
+                self._dead_letters_path,
+            )
+            self.ack(record)
+        self.dead_letters += len(dead)
+
+    def _cursor_state(self):
+        with self._lock:
+            return [self.cursor] + [end for end, done in self._inflight.items() if done]
+
+    # One offset per line: the cursor, then the acknowledged entries after it.
+    def _save_cursor(self):
+        state = self._cursor_state()
+        if state == self._saved:
+            return
+
+        tmp_path = self._cursor_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("".join("{}\n".format(offset) for offset in state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._cursor_path)
+        self._saved = state
+
+    def _commit(self, records):
+        data = [encode_entry(record) for record in records]
+        self._file.write(b"".join(data))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.commits += 1
+        self.entries += len(records)
+
+        for record, entry in zip(records, data):
+            self._size += len(entry)
+            self._remember(record)
+            self._track(self._size, record)
+            self._deliver(record)
+
+    def _write(self):
+        stop = False
+        while not stop:
+            try:
+                records = [self._queue.get(timeout=self._commit_interval)]
+            except queue.Empty:
+                records = []
+
+            # Everything queued during the previous commit goes in this one.
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if records and records[-1] is None:
+                records.pop()
+                stop = True
+
+            if records:
+                self._commit(records)
+            self._retry()
+            self._save_cursor()
+            self._compact()
+
+    # Rewrite the journal without the acknowledged entries up to the last
+    # one of the saved cursor. The last of them for each session is kept in
+    # the header, along with the entries which were not acknowledged, at
+    # their offset.
+    def _compact(self):
+        cursor, *acknowledged = self._saved
+        last = max(acknowledged, default=cursor)
+        position = last - self._start
+        if position < self._compact_size:
+            return
+
+        acknowledged = set(acknowledged)
+        self._file.seek(0)
+        data = self._file.read()
+        _, compacted, carried, offset = read_header(data)
+        entries = list(carried)
+        for end, record in read_entries(data, offset):
+            if end > position:
+                break
+            entries.append((self._start + end, record))
+
+        latest = {record.session_name: record for record in compacted}
+        kept = []
+        removed = []
+        for end, record in entries:
+            if end > cursor and end not in acknowledged:
+                kept.append((end, record))
+                continue
+            latest[record.session_name] = record
+            removed.append(record.archive_path)
+
+        entries = b"".join(encode_entry(latest[name]) for name in sorted(latest))
+        entries += b"".join(
+            encode_entry(RotationCompleted("", end, "", 0)) + encode_entry(record)
+            for end, record in kept
+        )
+        count = "{} {}".format(len(latest), len(kept))
+        header_size = JOURNAL_ENTRY.size + len(count) + len(entries)
+        if header_size >= position:
+            return
+        start = last - header_size
+        header = encode_entry(RotationCompleted("", start, count, 0))
+
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header + entries + data[position:])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        _fsync_directory(self._directory)
+
+        self._file.close()
+        self._file = open(self._path, "a+b")
+        self._start = start
+        self._compacted = {
+            name: record.rotation_id for name, record in latest.items()
+        }
+        self._known.difference_update(removed)
+        self._known.update(record.archive_path for record in latest.values())
+        # The removed entries no longer need to be saved with the cursor.
+        with self._lock:
+            for end in acknowledged:
+                if end <= last:
+                    self._inflight.pop(end, None)
+        self.compactions += 1
+
+    def reconcile(self, archive_dirs=None):
+        """Journal the chunks of the archive directories which have no entry.
+
+        Such chunks completed while the listener was not running. The
+        chunks of a session up to the last one removed from the journal by
+        the compaction are considered journaled.
+
+        `archive_dirs` maps session names to their archive directory and
+        defaults to the directories of the chunks already journaled.
+        Returns the records that were appended.
+        """
+        if archive_dirs is None:
+            archive_dirs = dict(self._archive_dirs)
+
+        records = []
+        for session_name, directory in sorted(archive_dirs.items()):
+            try:
+                names = sorted(os.listdir(directory))
+            except FileNotFoundError:
+                continue
+
+            for name in names:
+                path = os.path.join(directory, name)
+                rotation_id = _chunk_rotation_id(name)
+                if (
+                    rotation_id is None
+                    or path in self._known
+                    or rotation_id <= self._compacted.get(session_name, -1)
+                    or not os.path.isdir(path)
+                ):
+                    continue
+
+                record = RotationCompleted(
+                    session_name, rotation_id, path, time.monotonic_ns()
+                )
+                self._known.add(path)
+                records.append(record)
+                self.append(record)
+
+        if records:
+            logger.warning(
+                "Recovered %d chunk(s) missing from the journal", len(records)
+            )
+        return records
+
+    # Commit the queued records and stop the writer thread. Entries may
+    # still be acknowledged until close() is called.
+    def stop(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        self._save_cursor()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,453 @@
+import logging
+import threading
+import time
+
+from . import binding
+from .channel import MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, NotificationChannel
+from .coalesce import DEFAULT_MAX_SIZE, Coalescer, expand
+from .dispatch import Dispatcher
+from .ring import RingBuffer
+from .triggers import ConditionSpec, setup_conditions
+
+# asyncio, inspect, multiprocessing and the modules using them are only
+# imported when needed, to keep the import of the listener fast.
+
+logger = logging.getLogger(__name__)
+
+
+def rotation_completed_specs(session_name):
+    return [ConditionSpec("rotation-completed", session_name)]
+
+
+class Listener:
+    """Session daemon notification listener, embeddable in a program.
+
+    The listener owns its notification channel: open() creates it and
+    subscribes to the conditions returned by `condition_specs` for each
+    session, creating their triggers, and close() releases it. Handlers
+    registered with add_handler() are called with the decoded records.
+
+    The notifications are handled by one of:
+      - run(), blocking until stop() is called or the channel is closed;
+      - run_async(), the same from an asyncio event loop;
+      - start(), from a background thread, until close().
+
+    `batch`, `ring_size` and `coalesce` select how the notifications are
+    handed to the handlers: by batch, through a ring buffer and its
+    consumer thread, and grouped by the coalescer thread. With
+    `workers` > 1, the sessions are spread over worker processes.
+
+    When `lazy` is set, run() and start() call the handlers with a
+    NotificationView of each notification instead of a record: its fields
+    are only fetched from the session daemon when a handler reads them, and
+    it is only valid during the call. Handlers keeping a notification must
+    keep view.record(). Views cannot be handed over in batches.
+
+    `channel_factory`, called with (ffi, ctl), creates the channel (default:
+    NotificationChannel). It cannot be combined with `workers`, which create
+    their own channels.
+    """
+
+    def __init__(
+        self,
+        sessions=(),
+        condition_specs=rotation_completed_specs,
+        ffi=None,
+        ctl=None,
+        channel_factory=None,
+        cache=None,
+        jobs=1,
+        batch=False,
+        ring_size=0,
+        coalesce=None,
+        coalesce_size=DEFAULT_MAX_SIZE,
+        workers=1,
+        lazy=False,
+    ):
+        if workers > 1 and channel_factory is not None:
+            raise RuntimeError("A channel factory cannot be combined with workers")
+        if lazy and (batch or ring_size or coalesce is not None or workers > 1):
+            raise RuntimeError("Notification views cannot be handled in batches")
+
+        self.sessions = list(sessions)
+        self._condition_specs = condition_specs
+        self._ffi = ffi
+        self._ctl = ctl
+        self._channel_factory = channel_factory or NotificationChannel
+        self._cache = cache
+        self._jobs = jobs
+        self._batch = batch
+        self._ring_size = ring_size
+        self._coalesce = coalesce
+        self._coalesce_size = coalesce_size
+        self._workers = workers
+        self._lazy = lazy
+
+        self._dispatch = Dispatcher()
+        self._flushes = []
+        self._coroutine_handlers = 0
+        self._loop = None
+        self._async_stop = None
+        self._futures = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._consumer = None
+        self._receive = self._handle_batch
+        # Drops reported on the channels already closed.
+        self._dropped = 0
+
+        self.channel = None
+        self.subscriptions = None
+        self.inventory = None
+        self.ring = None
+        self.coalescer = None
+        # Setup cost of the conditions subscribed to by open().
+        self.setup_timings = []
+        self.setup_time = 0.0
+
+    @property
+    def ffi(self):
+        return self._ffi
+
+    @property
+    def ctl(self):
+        return self._ctl
+
+    def load(self):
+        """Return the (ffi, ctl) pair, loading the bindings if needed."""
+        if self._ctl is None:
+            self._ffi, self._ctl = binding.load()
+        return self._ffi, self._ctl
+
+    def add_handler(self, handler, condition_types=None, flush=None, coalesced=False):
+        """Call `handler` with the records of `condition_types` (default: all).
+
+        Coroutine functions are scheduled on the event loop of run_async().
+        `flush`, if set, is called whenever the listener is about to wait
+        for notifications. When `coalesced` is set, the handler is called
+        once with the Coalesced record of each group of the coalescer,
+        instead of once per record.
+        """
+        import inspect
+
+        if inspect.iscoroutinefunction(handler):
+            self._coroutine_handlers += 1
+            handler = self._scheduler(handler)
+        if self._coalesce is not None and not coalesced:
+            handler = expand(handler)
+
+        if condition_types is None:
+            self._dispatch.register_all(handler)
+        else:
+            for condition_type in condition_types:
+                self._dispatch.register(condition_type, handler)
+        if flush is not None:
+            self._flushes.append(flush)
+
+    # Handlers may be called from the consumer or coalescer threads.
+    def _scheduler(self, coroutine_function):
+        import asyncio
+
+        def schedule(record):
+            future = asyncio.run_coroutine_threadsafe(
+                coroutine_function(record), self._loop
+            )
+            self._futures.add(future)
+            future.add_done_callback(self._handler_done)
+
+        return schedule
+
+    def _handler_done(self, future):
+        self._futures.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Handler failed: %s", future.exception())
+
+    def _flush(self):
+        for flush in self._flushes:
+            flush()
+
+    def _handle_batch(self, batch):
+        self._dispatch.dispatch_batch(batch)
+        self._flush()
+
+    def _specs(self, session_names):
+        return [
+            spec
+            for session_name in session_names
+            for spec in self._condition_specs(session_name)
+        ]
+
+    def open(self):
+        """Create the channel and subscribe to the conditions of the sessions."""
+        if self.channel is not None:
+            return self
+
+        if self._workers > 1:
+            from .workers import ShardedListener
+
+            self.channel = ShardedListener(self._specs(self.sessions), self._workers)
+            self.channel.start()
+        else:
+            ffi, ctl = self.load()
+            channel = self._channel_factory(ffi, ctl)
+
+            from .discovery import SubscriptionSet
+
+            # Registration processes load the same bindings.
+            load = binding.loader(ctl)
+            start = time.perf_counter()
+            try:
+                self.setup_timings = setup_conditions(
+                    ffi,
+                    ctl,
+                    channel,
+                    self._specs(self.sessions),
+                    self._cache,
+                    self._jobs,
+                    load,
+                )
+            except BaseException:
+                # Also drops the subscriptions made before the failure.
+                channel.close()
+                raise
+            self.setup_time = time.perf_counter() - start
+            self.channel = channel
+            self.subscriptions = SubscriptionSet(
+                ffi,
+                ctl,
+                channel,
+                self._condition_specs,
+                self._cache,
+                self._jobs,
+                load,
+            )
+            self.subscriptions.track(self.sessions)
+
+        if self._coalesce is not None:
+            self.coalescer = Coalescer(
+                self._handle_batch, self._coalesce, self._coalesce_size
+            )
+            self.coalescer.start()
+            self._receive = self.coalescer.extend
+        if self._ring_size:
+            self.ring = RingBuffer(self._ring_size)
+            # Joined by close(), but must not keep a failing program alive.
+            self._consumer = threading.Thread(
+                target=self._consume, args=(self.ring.reader(),), daemon=True
+            )
+            self._consumer.start()
+        return self
+
+    def subscribe_triggers(
+        self, action_types=None, condition_types=None, session_glob=None
+    ):
+        """Subscribe to the conditions of the registered notify triggers.
+
+        See TriggerInventory.select() for the filters. Returns the
+        TriggerInfo of the triggers subscribed to.
+        """
+        from .inventory import TriggerInventory, subscribe_triggers
+
+        if self._workers > 1:
+            raise RuntimeError("Triggers cannot be subscribed to by workers")
+        self.open()
+        if self.inventory is None:
+            self.inventory = TriggerInventory(*self.load())
+        selected = self.inventory.select(action_types, condition_types, session_glob)
+        return subscribe_triggers(self.channel, selected)
+
+    @property
+    def dropped(self):
+        """Times the session daemon reported dropping notifications."""
+        return self._dropped + getattr(self.channel, "dropped", 0)
+
+    def _batched(self):
+        return (
+            self._batch
+            or self._workers > 1
+            or self.ring is not None
+            or self.coalescer is not None
+        )
+
+    # Hand a batch to the consumers. With a ring buffer, the receive loop
+    # never waits for them.
+    def _deliver(self, batch):
+        if self.ring is None:
+            self._receive(batch)
+        else:
+            self.ring.extend(batch)
+
+    def _consume(self, reader):
+        for batch in reader:
+            self._receive(batch)
+
+    def _check_sync(self):
+        if self._coroutine_handlers:
+            raise RuntimeError("Coroutine handlers require run_async()")
+
+    def run(self):
+        """Handle the notifications until stop() is called or the channel closes.
+
+        The notifications are waited for in a blocking call: stop() takes
+        effect once the next notification is received, or once a signal
+        interrupts the wait. Other interruptions, like signals handled by
+        the program, do not stop the listener.
+        """
+        self._check_sync()
+        self.open()
+        channel = self.channel
+        # The channel iterators end when the wait is interrupted.
+        while not self._stop.is_set() and not getattr(channel, "closed", False):
+            if self._batched():
+                for batch in channel.batches():
+                    self._deliver(batch)
+                    if self._stop.is_set():
+                        break
+            else:
+                dispatch = self._dispatch
+                for notification in channel.views() if self._lazy else channel:
+                    dispatch(notification)
+                    # Flush whenever the listener is about to wait.
+                    if not channel.has_pending():
+                        self._flush()
+                    if self._stop.is_set():
+                        break
+
+    async def run_async(self, *coroutines):
+        """Handle the notifications until stop() is called or the channel closes.
+
+        The channel is polled from the running event loop. `coroutines`
+        (e.g. the followers of lttng_listen.discovery) run alongside and are
+        cancelled at the end.
+        """
+        import asyncio
+
+        from . import aio
+
+        if self._workers > 1:
+            raise RuntimeError("Workers cannot be run from an event loop")
+        if self._lazy:
+            raise RuntimeError("Notification views cannot be run from an event loop")
+        self.open()
+        loop = asyncio.get_running_loop()
+        self._async_stop = asyncio.Event()
+        self._loop = loop
+        if self._stop.is_set():
+            self._async_stop.set()
+
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        channel = self.channel
+        try:
+            if self._batched():
+                async for batch in aio.batches(channel, self._async_stop):
+                    self._deliver(batch)
+            else:
+                dispatch = self._dispatch
+                async for notification in aio.notifications(
+                    channel, self._async_stop
+                ):
+                    dispatch(notification)
+                    if not channel.has_pending():
+                        self._flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # The consumer threads may still schedule coroutine handlers.
+            await loop.run_in_executor(None, self._stop_consumers)
+            if self._futures:
+                await asyncio.gather(
+                    *[asyncio.wrap_future(future) for future in list(self._futures)],
+                    return_exceptions=True,
+                )
+            self._loop = None
+
+    def start(self):
+        """Handle the notifications from a background thread, until close()."""
+        self._check_sync()
+        self.open()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    # Unlike run(), the thread polls the channel so that close() does not
+    # wait for the next notification.
+    def _poll(self):
+        channel = self.channel
+        if self._workers > 1:
+            for batch in channel.batches():
+                self._deliver(batch)
+            return
+
+        interval = MIN_POLL_INTERVAL
+        while not self._stop.is_set() and not channel.closed:
+            if self._lazy:
+                received = self._dispatch_views(channel.views(block=False))
+            else:
+                received = channel.drain()
+                if received:
+                    self._deliver(received)
+            if received:
+                interval = MIN_POLL_INTERVAL
+                continue
+
+            self._stop.wait(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    # Returns the number of views dispatched.
+    def _dispatch_views(self, views):
+        dispatch = self._dispatch
+        count = 0
+        for view in views:
+            dispatch(view)
+            count += 1
+        if count:
+            self._flush()
+        return count
+
+    def stop(self):
+        """Ask the listener to stop.
+
+        Safe to call from any thread and from a signal handler.
+        """
+        self._stop.set()
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._async_stop.set)
+        if self._workers > 1 and self.channel is not None:
+            self.channel.stop()
+
+    # Handle the notifications still held by the ring buffer and the
+    # coalescer.
+    def _stop_consumers(self):
+        if self.ring is not None:
+            self.ring.close()
+            self._consumer.join()
+        if self.coalescer is not None:
+            self.coalescer.close()
+
+    def close(self):
+        """Stop the listener and release the channel.
+
+        The notifications held by the ring buffer and the coalescer are
+        handled first. The listener may then be opened again.
+        """
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stop_consumers()
+        if self.channel is not None:
+            self.channel.close()
+            self._dropped += self.channel.dropped
+            self.channel = None
+            self.subscriptions = None
+        if self.inventory is not None:
+            self.inventory.close()
+            self.inventory = None
+        self._stop.clear()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
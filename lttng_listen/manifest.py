@@ -0,0 +1,121 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from .relay import is_relay
+
+# CTF packets produced by LTTng start with a packet header (magic, trace
+# UUID, stream id, stream instance id) followed by a packet context whose
+# `timestamp_begin` and `timestamp_end` fields, in clock cycles, and
+# `content_size` and `packet_size` fields, in bits, are at fixed offsets.
+CTF_MAGIC = 0xC1FC1FC1
+TIMESTAMP_BEGIN_OFFSET = 32
+TIMESTAMP_END_OFFSET = 40
+CONTENT_SIZE_OFFSET = 48
+PACKET_SIZE_OFFSET = 56
+PACKET_HEADER_SIZE = 64
+
+# Amount of the mapping handed to the hash at once. Slicing a memoryview of
+# the mapping does not copy it.
+WINDOW_SIZE = 16 * 1024 * 1024
+
+
+def _byte_order(view):
+    if len(view) < PACKET_HEADER_SIZE:
+        return None
+
+    for order in ("<", ">"):
+        if struct.unpack_from(order + "I", view, 0)[0] == CTF_MAGIC:
+            return order
+    return None
+
+
+# Returns the (offset, size, timestamp_begin, timestamp_end) of the packets
+# of a stream file, offsets and sizes in bytes, and whether the whole file
+# was indexed.
+def index_packets(view):
+    order = _byte_order(view)
+    if order is None:
+        return [], False
+
+    magic = struct.Struct(order + "I")
+    packet_size = struct.Struct(order + "Q")
+    timestamps = struct.Struct(order + "QQ")
+    packets = []
+    offset = 0
+    while offset + PACKET_HEADER_SIZE <= len(view):
+        if magic.unpack_from(view, offset)[0] != CTF_MAGIC:
+            return packets, False
+
+        size = packet_size.unpack_from(view, offset + PACKET_SIZE_OFFSET)[0] // 8
+        if size < PACKET_HEADER_SIZE or offset + size > len(view):
+            return packets, False
+
+        begin, end = timestamps.unpack_from(view, offset + TIMESTAMP_BEGIN_OFFSET)
+        packets.append((offset, size, begin, end))
+        offset += size
+
+    return packets, offset == len(view)
+
+
+def scan_file(path, algorithm="sha256"):
+    h = hashlib.new(algorithm)
+    size = os.path.getsize(path)
+    entry = {"size": size}
+
+    if size:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapping:
+            if hasattr(mapping, "madvise"):
+                mapping.madvise(mmap.MADV_SEQUENTIAL)
+
+            with memoryview(mapping) as view:
+                for offset in range(0, size, WINDOW_SIZE):
+                    h.update(view[offset : offset + WINDOW_SIZE])
+
+                if _byte_order(view) is not None:
+                    packets, complete = index_packets(view)
+                    entry["packets"] = packets
+                    entry["complete"] = complete
+
+    entry["digest"] = h.hexdigest()
+    return entry
+
+
+def build_manifest(path, algorithm="sha256"):
+    if not os.path.isdir(path):
+        raise RuntimeError("Chunk {} does not exist".format(path))
+
+    files = {}
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        for name in sorted(names):
+            file_path = os.path.join(root, name)
+            files[os.path.relpath(file_path, path)] = scan_file(file_path, algorithm)
+
+    return {"algorithm": algorithm, "files": files}
+
+
+class ManifestStage:
+    """Write a checksum and packet index manifest next to the chunk."""
+
+    name = "manifest"
+
+    def __init__(self, algorithm="sha256"):
+        self._algorithm = algorithm
+
+    def __call__(self, chunk):
+        if is_relay(chunk.path):
+            raise RuntimeError("Chunk is stored by a relay daemon")
+
+        manifest = build_manifest(chunk.path, self._algorithm)
+        sidecar = chunk.path.rstrip(os.sep) + ".manifest.json"
+        tmp_path = sidecar + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, sidecar)
+
+        chunk.results[self.name] = sidecar
@@ -0,0 +1,277 @@
+import bisect
+import os
+import threading
+import time
+
+from .channel import NotificationChannel
+
+# Upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    1e-2,
+    1e-1,
+    1.0,
+)
+
+DEFAULT_INTERVAL = 10.0
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{%s}" % ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+class Counter:
+    """Monotonic counter, with one value per tuple of label values."""
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, key=(), amount=1):
+        values = self.values
+        values[key] = values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, _labels(self.labels, key), value
+
+
+class Gauge:
+    """Value read from a function when the metrics are collected.
+
+    `type` is "counter" when the function returns a count maintained
+    elsewhere, e.g. by the channel.
+    """
+
+    def __init__(self, name, help, function, type="gauge"):
+        self.name = name
+        self.help = help
+        self.function = function
+        self.type = type
+
+    def samples(self):
+        yield self.name, "", self.function()
+
+
+class Histogram:
+    """Distribution of observations in fixed buckets.
+
+    observe() costs a bisection and two additions. The bucket counts are
+    only made cumulative when the metrics are collected.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), list(self.counts)):
+            cumulative += count
+            yield self.name + "_bucket", '{le="%s"}' % bound, cumulative
+        yield self.name + "_sum", "", self.sum
+        yield self.name + "_count", "", cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.add(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.add(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.add(Histogram(*args, **kwargs))
+
+    # Prometheus text exposition format.
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append("# HELP {} {}".format(metric.name, metric.help))
+            lines.append("# TYPE {} {}".format(metric.name, metric.type))
+            for name, labels, value in metric.samples():
+                lines.append("{}{} {}".format(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+# Wrap `function` to observe its duration in `histogram`.
+def timed(histogram, function):
+    observe = histogram.observe
+    clock = time.perf_counter
+
+    def timed_function(*args):
+        start = clock()
+        result = function(*args)
+        observe(clock() - start)
+        return result
+
+    return timed_function
+
+
+class ListenerMetrics:
+    """Metrics of a listener.
+
+    The handler returned by output() counts the records, by session and
+    condition type, and times their output.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = Registry() if registry is None else registry
+        self.notifications = self.registry.counter(
+            "lttng_listen_notifications_total",
+            "Notifications received",
+            ("session", "condition"),
+        )
+        self.get_next_time = self.registry.histogram(
+            "lttng_listen_get_next_seconds",
+            "Time spent in lttng_notification_channel_get_next_notification()",
+        )
+        self.decode_time = self.registry.histogram(
+            "lttng_listen_decode_seconds", "Time spent decoding a notification"
+        )
+        self.output_time = self.registry.histogram(
+            "lttng_listen_output_seconds", "Time spent writing a notification"
+        )
+        self.flush_time = self.registry.histogram(
+            "lttng_listen_flush_seconds", "Time spent flushing the output"
+        )
+
+    def output(self, write):
+        values = self.notifications.values
+        histogram = self.output_time
+        buckets = histogram.buckets
+        counts = histogram.counts
+        clock = time.perf_counter
+
+        def counted_write(record):
+            key = (record.session_name, record.kind)
+            values[key] = values.get(key, 0) + 1
+            start = clock()
+            write(record)
+            elapsed = clock() - start
+            counts[bisect.bisect_left(buckets, elapsed)] += 1
+            histogram.sum += elapsed
+
+        return counted_write
+
+    def watch(self, name, help, function, type="gauge"):
+        self.registry.gauge(name, help, function, type)
+
+
+class InstrumentedChannel(NotificationChannel):
+    """Notification channel timing the reception and decoding of notifications.
+
+    In blocking mode, the get_next histogram includes the time spent waiting
+    for a notification.
+    """
+
+    def __init__(self, ffi=None, ctl=None, metrics=None):
+        super().__init__(ffi, ctl)
+        self.metrics = ListenerMetrics() if metrics is None else metrics
+        self._get_next_notification = timed(
+            self.metrics.get_next_time, self._get_next_notification
+        )
+        self._decode = timed(self.metrics.decode_time, self._decode)
+        self.metrics.watch(
+            "lttng_listen_sessiond_drops_total",
+            "Times the session daemon reported dropped notifications",
+            lambda: self.dropped,
+            "counter",
+        )
+        self.metrics.watch(
+            "lttng_listen_subscriptions",
+            "Conditions the channel is subscribed to",
+            lambda: self.subscriptions,
+        )
+
+
+# Serve the metrics on http://ADDRESS:PORT/metrics from a daemon thread.
+def serve(registry, port, address="127.0.0.1"):
+    # Only imported when serving, being slow to import.
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((address, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_stats(registry, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class StatsFile:
+    """Rewrite a stats file every `interval` seconds from a daemon thread."""
+
+    def __init__(self, registry, path, interval=DEFAULT_INTERVAL):
+        self._registry = registry
+        self._path = path
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            write_stats(self._registry, self._path)
+
+    # Write the final values.
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        write_stats(self._registry, self._path)
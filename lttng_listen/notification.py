@@ -0,0 +1,444 @@
+import collections
+import time
+
+from .relay import RelayLocation
+
+# enum lttng_condition_type, which is part of liblttng-ctl's ABI.
+SESSION_CONSUMED_SIZE = 100
+BUFFER_USAGE_HIGH = 101
+BUFFER_USAGE_LOW = 102
+SESSION_ROTATION_ONGOING = 103
+SESSION_ROTATION_COMPLETED = 104
+
+CONDITION_TYPES = (
+    SESSION_CONSUMED_SIZE,
+    BUFFER_USAGE_HIGH,
+    BUFFER_USAGE_LOW,
+    SESSION_ROTATION_ONGOING,
+    SESSION_ROTATION_COMPLETED,
+)
+
+
+# Decoded notifications. Every record has a `session_name` and a `timestamp`,
+# the time.monotonic_ns() at which the notification was received. Its class
+# has the `condition_type` of the notification and a `kind`, the name of the
+# condition type used on the command line and in the outputs.
+def _record(name, condition_type, kind, fields):
+    base = collections.namedtuple(name, fields)
+    return type(
+        name,
+        (base,),
+        {"__slots__": (), "condition_type": condition_type, "kind": kind},
+    )
+
+
+RotationCompleted = _record(
+    "RotationCompleted",
+    SESSION_ROTATION_COMPLETED,
+    "rotation-completed",
+    ["session_name", "rotation_id", "archive_path", "timestamp"],
+)
+RotationOngoing = _record(
+    "RotationOngoing",
+    SESSION_ROTATION_ONGOING,
+    "rotation-ongoing",
+    ["session_name", "rotation_id", "timestamp"],
+)
+ConsumedSize = _record(
+    "ConsumedSize",
+    SESSION_CONSUMED_SIZE,
+    "consumed-size",
+    ["session_name", "consumed_size", "timestamp"],
+)
+BufferUsageHigh = _record(
+    "BufferUsageHigh",
+    BUFFER_USAGE_HIGH,
+    "buffer-usage-high",
+    ["session_name", "channel_name", "usage", "usage_ratio", "timestamp"],
+)
+BufferUsageLow = _record(
+    "BufferUsageLow",
+    BUFFER_USAGE_LOW,
+    "buffer-usage-low",
+    ["session_name", "channel_name", "usage", "usage_ratio", "timestamp"],
+)
+
+RECORDS = {
+    record.condition_type: record
+    for record in (
+        RotationCompleted,
+        RotationOngoing,
+        ConsumedSize,
+        BufferUsageHigh,
+        BufferUsageLow,
+    )
+}
+
+
+def session_name_getters(ctl):
+    """Return the session name getter of the conditions, by condition type."""
+    return {
+        ctl.LTTNG_CONDITION_TYPE_SESSION_ROTATION_COMPLETED: (
+            ctl.lttng_condition_session_rotation_get_session_name
+        ),
+        ctl.LTTNG_CONDITION_TYPE_SESSION_ROTATION_ONGOING: (
+            ctl.lttng_condition_session_rotation_get_session_name
+        ),
+        ctl.LTTNG_CONDITION_TYPE_SESSION_CONSUMED_SIZE: (
+            ctl.lttng_condition_session_consumed_size_get_session_name
+        ),
+        ctl.LTTNG_CONDITION_TYPE_BUFFER_USAGE_HIGH: (
+            ctl.lttng_condition_buffer_usage_get_session_name
+        ),
+        ctl.LTTNG_CONDITION_TYPE_BUFFER_USAGE_LOW: (
+            ctl.lttng_condition_buffer_usage_get_session_name
+        ),
+    }
+
+
+# Most distinct session and channel names kept by a decoder.
+NAME_CACHE_SIZE = 4096
+
+
+class Decoder:
+    """Decode notifications, reusing one set of out-parameter buffers.
+
+    The decoding function of each condition type is looked up in a table
+    built once, when the decoder is created. Session and channel names are
+    interned: the names already seen are looked up by the contents of their
+    C string instead of being decoded again.
+    """
+
+    def __init__(self, ffi, ctl):
+        self._ffi = ffi
+        self._ctl = ctl
+        self._string_p = ffi.new("char **")
+        self._location_p = ffi.new("struct lttng_trace_archive_location **")
+        self._path_p = ffi.new("char **")
+        self._uint64_p = ffi.new("uint64_t *")
+        self._uint16_p = ffi.new("uint16_t *")
+        self._double_p = ffi.new("double *")
+        self._protocol_p = ffi.new(
+            "enum lttng_trace_archive_location_relay_protocol_type *"
+        )
+        self._names = {}
+        self._relay_protocols = {
+            ctl.LTTNG_TRACE_ARCHIVE_LOCATION_RELAY_PROTOCOL_TYPE_TCP: "tcp"
+        }
+
+        self._session_name_getters = session_name_getters(ctl)
+        self._decoders = {
+            ctl.LTTNG_CONDITION_TYPE_SESSION_ROTATION_COMPLETED: (
+                self._rotation_completed
+            ),
+            ctl.LTTNG_CONDITION_TYPE_SESSION_ROTATION_ONGOING: self._rotation_ongoing,
+            ctl.LTTNG_CONDITION_TYPE_SESSION_CONSUMED_SIZE: self._consumed_size,
+            ctl.LTTNG_CONDITION_TYPE_BUFFER_USAGE_HIGH: self._buffer_usage_high,
+            ctl.LTTNG_CONDITION_TYPE_BUFFER_USAGE_LOW: self._buffer_usage_low,
+        }
+
+    def __call__(self, notification):
+        ctl = self._ctl
+        condition = ctl.lttng_notification_get_condition(notification)
+        evaluation = ctl.lttng_notification_get_evaluation(notification)
+
+        condition_type = ctl.lttng_condition_get_type(condition)
+        try:
+            decode = self._decoders[condition_type]
+        except KeyError:
+            raise RuntimeError("Unexpected condition type") from None
+
+        session_name = self._string(
+            self._session_name_getters[condition_type], condition, "session name"
+        )
+        return decode(session_name, condition, evaluation)
+
+    def _string(self, getter, condition, what):
+        status = getter(condition, self._string_p)
+        if status != self._ctl.LTTNG_CONDITION_STATUS_OK:
+            raise RuntimeError("Failed to get {}".format(what))
+
+        raw = self._ffi.string(self._string_p[0])
+        name = self._names.get(raw)
+        if name is None:
+            if len(self._names) >= NAME_CACHE_SIZE:
+                self._names.clear()
+            name = self._names[raw] = raw.decode("utf-8")
+        return name
+
+    def session_name(self, condition_type, condition):
+        return self._string(
+            self._session_name_getters[condition_type], condition, "session name"
+        )
+
+    def _evaluation_value(self, getter, value_p, evaluation, what):
+        status = getter(evaluation, value_p)
+        if status != self._ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get {}".format(what))
+
+        return value_p[0]
+
+    def _location_string(self, getter, location_c, what):
+        status = getter(location_c, self._path_p)
+        if status != self._ctl.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK:
+            raise RuntimeError("Failed to get {}".format(what))
+
+        return self._ffi.string(self._path_p[0]).decode("utf-8")
+
+    def _location_port(self, getter, location_c, what):
+        status = getter(location_c, self._uint16_p)
+        if status != self._ctl.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK:
+            raise RuntimeError("Failed to get {}".format(what))
+
+        return self._uint16_p[0]
+
+    # Archive path of a local location, or RelayLocation of a relay location.
+    def archive_location(self, evaluation):
+        ctl = self._ctl
+        status = ctl.lttng_evaluation_session_rotation_completed_get_location(
+            evaluation, self._location_p
+        )
+        if status != ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get trace archive location")
+
+        location_c = self._location_p[0]
+        location_type = ctl.lttng_trace_archive_location_get_type(location_c)
+        if location_type == ctl.LTTNG_TRACE_ARCHIVE_LOCATION_TYPE_LOCAL:
+            status = ctl.lttng_trace_archive_location_local_get_absolute_path(
+                location_c, self._path_p
+            )
+            if status != ctl.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK:
+                raise RuntimeError("Failed to get local location absolute path")
+            return self._ffi.string(self._path_p[0]).decode("utf-8")
+        if location_type == ctl.LTTNG_TRACE_ARCHIVE_LOCATION_TYPE_RELAY:
+            protocol_p = self._protocol_p
+            status = ctl.lttng_trace_archive_location_relay_get_protocol_type(
+                location_c, protocol_p
+            )
+            if status != ctl.LTTNG_TRACE_ARCHIVE_LOCATION_STATUS_OK:
+                raise RuntimeError("Failed to get relay location protocol")
+            protocol = self._relay_protocols.get(protocol_p[0])
+            if protocol is None:
+                raise RuntimeError("Unsupported relay location protocol")
+
+            return RelayLocation(
+                self._location_string(
+                    ctl.lttng_trace_archive_location_relay_get_host,
+                    location_c,
+                    "relay location host",
+                ),
+                protocol,
+                self._location_port(
+                    ctl.lttng_trace_archive_location_relay_get_control_port,
+                    location_c,
+                    "relay location control port",
+                ),
+                self._location_port(
+                    ctl.lttng_trace_archive_location_relay_get_data_port,
+                    location_c,
+                    "relay location data port",
+                ),
+                self._location_string(
+                    ctl.lttng_trace_archive_location_relay_get_relative_path,
+                    location_c,
+                    "relay location relative path",
+                ),
+            )
+        raise RuntimeError("Unsupported trace achive location type")
+
+    def _rotation_id(self, evaluation):
+        ctl = self._ctl
+        status = ctl.lttng_evaluation_session_rotation_get_id(
+            evaluation, self._uint64_p
+        )
+        if status != ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get rotation id")
+
+        return self._uint64_p[0]
+
+    def _rotation_completed(self, session_name, condition, evaluation):
+        rotation_id = self._rotation_id(evaluation)
+        archive_path = self.archive_location(evaluation)
+        return RotationCompleted(
+            session_name, rotation_id, archive_path, time.monotonic_ns()
+        )
+
+    def _rotation_ongoing(self, session_name, condition, evaluation):
+        rotation_id = self._rotation_id(evaluation)
+        return RotationOngoing(session_name, rotation_id, time.monotonic_ns())
+
+    def _consumed_size(self, session_name, condition, evaluation):
+        ctl = self._ctl
+        status = ctl.lttng_evaluation_session_consumed_size_get_consumed_size(
+            evaluation, self._uint64_p
+        )
+        if status != ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get session consumed size")
+
+        return ConsumedSize(session_name, self._uint64_p[0], time.monotonic_ns())
+
+    def _buffer_usage(self, record, session_name, condition, evaluation):
+        ctl = self._ctl
+        channel_name = self._string(
+            ctl.lttng_condition_buffer_usage_get_channel_name,
+            condition,
+            "channel name",
+        )
+
+        status = ctl.lttng_evaluation_buffer_usage_get_usage(
+            evaluation, self._uint64_p
+        )
+        if status != ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get buffer usage")
+        status = ctl.lttng_evaluation_buffer_usage_get_usage_ratio(
+            evaluation, self._double_p
+        )
+        if status != ctl.LTTNG_EVALUATION_STATUS_OK:
+            raise RuntimeError("Failed to get buffer usage ratio")
+
+        return record(
+            session_name,
+            channel_name,
+            self._uint64_p[0],
+            self._double_p[0],
+            time.monotonic_ns(),
+        )
+
+    def _buffer_usage_high(self, session_name, condition, evaluation):
+        return self._buffer_usage(BufferUsageHigh, session_name, condition, evaluation)
+
+    def _buffer_usage_low(self, session_name, condition, evaluation):
+        return self._buffer_usage(BufferUsageLow, session_name, condition, evaluation)
+
+
+class NotificationView:
+    """Notification whose fields are only decoded when they are accessed.
+
+    Views have the fields of the record of their condition type. A view is
+    only valid until the notification it wraps is destroyed, e.g. until the
+    next iteration of NotificationChannel.views(): call record() to keep
+    the whole notification. Each field is fetched from liblttng-ctl once,
+    so a handler which only reads the session name never fetches the
+    archive location.
+    """
+
+    __slots__ = (
+        "_decoder",
+        "_notification",
+        "_condition",
+        "_evaluation",
+        "_fields",
+        "condition_type",
+        "timestamp",
+    )
+
+    def __init__(self, decoder, notification):
+        ctl = decoder._ctl
+        self._decoder = decoder
+        self._notification = notification
+        self._condition = ctl.lttng_notification_get_condition(notification)
+        self._evaluation = ctl.lttng_notification_get_evaluation(notification)
+        self.condition_type = ctl.lttng_condition_get_type(self._condition)
+        if self.condition_type not in RECORDS:
+            raise RuntimeError("Unexpected condition type")
+        self._fields = {}
+        self.timestamp = time.monotonic_ns()
+
+    def _check(self):
+        if self._notification is None:
+            raise RuntimeError("Notification view used after its release")
+
+    @property
+    def kind(self):
+        return RECORDS[self.condition_type].kind
+
+    # Fetch a field with `fetch`, unless it was already.
+    def _field(self, name, fetch, *args):
+        fields = self._fields
+        if name in fields:
+            return fields[name]
+        if name not in RECORDS[self.condition_type]._fields:
+            raise AttributeError(
+                "{} notifications have no {}".format(self.kind, name)
+            )
+        self._check()
+        value = fields[name] = fetch(*args)
+        return value
+
+    @property
+    def session_name(self):
+        return self._field(
+            "session_name",
+            self._decoder.session_name,
+            self.condition_type,
+            self._condition,
+        )
+
+    @property
+    def rotation_id(self):
+        return self._field("rotation_id", self._decoder._rotation_id, self._evaluation)
+
+    @property
+    def archive_path(self):
+        return self._field(
+            "archive_path", self._decoder.archive_location, self._evaluation
+        )
+
+    @property
+    def consumed_size(self):
+        decoder = self._decoder
+        return self._field(
+            "consumed_size",
+            decoder._evaluation_value,
+            decoder._ctl.lttng_evaluation_session_consumed_size_get_consumed_size,
+            decoder._uint64_p,
+            self._evaluation,
+            "session consumed size",
+        )
+
+    @property
+    def channel_name(self):
+        decoder = self._decoder
+        return self._field(
+            "channel_name",
+            decoder._string,
+            decoder._ctl.lttng_condition_buffer_usage_get_channel_name,
+            self._condition,
+            "channel name",
+        )
+
+    @property
+    def usage(self):
+        decoder = self._decoder
+        return self._field(
+            "usage",
+            decoder._evaluation_value,
+            decoder._ctl.lttng_evaluation_buffer_usage_get_usage,
+            decoder._uint64_p,
+            self._evaluation,
+            "buffer usage",
+        )
+
+    @property
+    def usage_ratio(self):
+        decoder = self._decoder
+        return self._field(
+            "usage_ratio",
+            decoder._evaluation_value,
+            decoder._ctl.lttng_evaluation_buffer_usage_get_usage_ratio,
+            decoder._double_p,
+            self._evaluation,
+            "buffer usage ratio",
+        )
+
+    def record(self):
+        """Decode the whole notification."""
+        self._check()
+        decode = self._decoder._decoders[self.condition_type]
+        record = decode(self.session_name, self._condition, self._evaluation)
+        return record._replace(timestamp=self.timestamp)
+
+    def release(self):
+        self._notification = None
+        self._condition = None
+        self._evaluation = None
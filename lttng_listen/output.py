@@ -0,0 +1,269 @@
+import json
+import struct
+import time
+
+from .coalesce import Coalesced
+from .notification import (
+    RECORDS,
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+    RotationOngoing,
+)
+from .relay import parse_archive_path
+
+# Binary records: a header holding the size of the record (header
+# included), the condition type, the reception timestamp (ns, monotonic), an
+# integer value, a ratio and the sizes of the two strings that follow it,
+# all little-endian. Strings are UTF-8 encoded and not null-terminated.
+#
+#   condition type       value          ratio        strings
+#   rotation completed   rotation id    0            session, archive path
+#   rotation ongoing     rotation id    0            session, ""
+#   consumed size        consumed size  0            session, ""
+#   buffer usage         usage (bytes)  usage ratio  session, channel
+BINARY_HEADER = struct.Struct("<IhQQdHH")
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class Sink:
+    """Buffered output of notification records to a binary stream.
+
+    Subclasses define encode(), returning the bytes of a record. Encoded
+    records are buffered until `buffer_size` bytes are pending or
+    `flush_interval` seconds have elapsed since the last flush, or until
+    flush() is called.
+    """
+
+    def __init__(
+        self,
+        stream,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+    ):
+        self._stream = stream
+        self._buffer = []
+        self._buffered = 0
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def write(self, record):
+        data = self.encode(record)
+        self._buffer.append(data)
+        self._buffered += len(data)
+
+        if (
+            self._buffered >= self._buffer_size
+            or time.monotonic() - self._last_flush >= self._flush_interval
+        ):
+            self.flush()
+
+    # Handler of the Coalesced records of a listener, which writes all their
+    # records at once.
+    def write_coalesced(self, record):
+        if type(record) is not Coalesced:
+            self.write(record)
+            return
+
+        data = b"".join(map(self.encode, record.records))
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if (
+            self._buffered >= self._buffer_size
+            or time.monotonic() - self._last_flush >= self._flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._stream.write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        self._stream.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TextSink(Sink):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formats = {
+            RotationCompleted: self._rotation_completed,
+            RotationOngoing: self._rotation_ongoing,
+            ConsumedSize: self._consumed_size,
+            BufferUsageHigh: self._buffer_usage,
+            BufferUsageLow: self._buffer_usage,
+        }
+
+    def encode(self, record):
+        return self._formats[type(record)](record).encode("utf-8")
+
+    def _rotation_completed(self, record):
+        return "Completed trace archive chunk for session {} available at: {}\n".format(
+            record.session_name, record.archive_path
+        )
+
+    def _rotation_ongoing(self, record):
+        return "Rotation {} of session {} ongoing\n".format(
+            record.rotation_id, record.session_name
+        )
+
+    def _consumed_size(self, record):
+        return "Session {} consumed {} bytes\n".format(
+            record.session_name, record.consumed_size
+        )
+
+    def _buffer_usage(self, record):
+        level = "high" if isinstance(record, BufferUsageHigh) else "low"
+        return (
+            "Buffer usage of channel {} of session {} is {}: {:.1%} ({} bytes)\n"
+        ).format(
+            record.channel_name,
+            record.session_name,
+            level,
+            record.usage_ratio,
+            record.usage,
+        )
+
+
+class NDJSONSink(Sink):
+    # Only the strings need escaping: formatting the objects by hand is much
+    # cheaper than a json.dumps() of a dict.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formats = {
+            RotationCompleted: self._rotation_completed,
+            RotationOngoing: self._rotation_ongoing,
+            ConsumedSize: self._consumed_size,
+            BufferUsageHigh: self._buffer_usage,
+            BufferUsageLow: self._buffer_usage,
+        }
+
+    def encode(self, record):
+        return self._formats[type(record)](record).encode("utf-8")
+
+    def _rotation_completed(self, record):
+        return (
+            '{"type":"rotation-completed","session":%s,"rotation_id":%d,'
+            '"archive_path":%s,"timestamp":%d}\n'
+            % (
+                json.dumps(record.session_name),
+                record.rotation_id,
+                json.dumps(str(record.archive_path)),
+                record.timestamp,
+            )
+        )
+
+    def _rotation_ongoing(self, record):
+        return (
+            '{"type":"rotation-ongoing","session":%s,"rotation_id":%d,'
+            '"timestamp":%d}\n'
+            % (json.dumps(record.session_name), record.rotation_id, record.timestamp)
+        )
+
+    def _consumed_size(self, record):
+        return (
+            '{"type":"consumed-size","session":%s,"consumed_size":%d,'
+            '"timestamp":%d}\n'
+            % (
+                json.dumps(record.session_name),
+                record.consumed_size,
+                record.timestamp,
+            )
+        )
+
+    def _buffer_usage(self, record):
+        return (
+            '{"type":"%s","session":%s,"channel":%s,"usage":%d,'
+            '"usage_ratio":%r,"timestamp":%d}\n'
+            % (
+                record.kind,
+                json.dumps(record.session_name),
+                json.dumps(record.channel_name),
+                record.usage,
+                record.usage_ratio,
+                record.timestamp,
+            )
+        )
+
+
+class BinarySink(Sink):
+    def encode(self, record):
+        session_name = record.session_name.encode("utf-8")
+        ratio = 0.0
+        if isinstance(record, RotationCompleted):
+            value = record.rotation_id
+            extra = str(record.archive_path).encode("utf-8")
+        elif isinstance(record, RotationOngoing):
+            value = record.rotation_id
+            extra = b""
+        elif isinstance(record, ConsumedSize):
+            value = record.consumed_size
+            extra = b""
+        else:
+            value = record.usage
+            ratio = record.usage_ratio
+            extra = record.channel_name.encode("utf-8")
+
+        size = BINARY_HEADER.size + len(session_name) + len(extra)
+        return (
+            BINARY_HEADER.pack(
+                size,
+                record.condition_type,
+                record.timestamp,
+                value,
+                ratio,
+                len(session_name),
+                len(extra),
+            )
+            + session_name
+            + extra
+        )
+
+
+# Yield the records of a stream of binary records.
+def read_binary(stream):
+    while True:
+        header = stream.read(BINARY_HEADER.size)
+        if len(header) < BINARY_HEADER.size:
+            return
+
+        (
+            size,
+            condition_type,
+            timestamp,
+            value,
+            ratio,
+            name_len,
+            extra_len,
+        ) = BINARY_HEADER.unpack(header)
+        payload = stream.read(size - BINARY_HEADER.size)
+        session_name = payload[:name_len].decode("utf-8")
+        extra = payload[name_len : name_len + extra_len].decode("utf-8")
+
+        record = RECORDS[condition_type]
+        if record is RotationCompleted:
+            yield record(session_name, value, parse_archive_path(extra), timestamp)
+        elif record in (RotationOngoing, ConsumedSize):
+            yield record(session_name, value, timestamp)
+        else:
+            yield record(session_name, extra, value, ratio, timestamp)
+
+
+SINKS = {
+    "text": TextSink,
+    "ndjson": NDJSONSink,
+    "binary": BinarySink,
+}
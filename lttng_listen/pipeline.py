@@ -0,0 +1,312 @@
+import collections
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+from .manifest import ManifestStage
+from .relay import is_relay, parse_relay_stage
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 1024
+
+# What submit() does when the queue is full: wait for room, or drop the
+# chunk and count it.
+BLOCK = "block"
+DROP = "drop"
+
+logger = logging.getLogger(__name__)
+
+
+class Chunk:
+    """Trace archive chunk going through the stages of a pipeline.
+
+    Stages may replace `path` (e.g. by the path of a compressed archive) and
+    store their results in `results`, keyed by stage name. `notification` is
+    the record the chunk was submitted from, if any.
+    """
+
+    __slots__ = ("session_name", "rotation_id", "path", "results", "notification")
+
+    def __init__(self, session_name, rotation_id, path, notification=None):
+        self.session_name = session_name
+        self.rotation_id = rotation_id
+        self.path = path
+        self.results = {}
+        self.notification = notification
+
+
+# Stages working on the files of a chunk cannot process the chunks stored
+# by a relay daemon.
+def _local_path(chunk):
+    if is_relay(chunk.path):
+        raise RuntimeError("Chunk is stored by a relay daemon")
+    return chunk.path
+
+
+# Yield the files of a chunk: the chunk itself once compressed, the files of
+# its directory otherwise.
+def _files(path):
+    if os.path.isfile(path):
+        yield path
+        return
+    if not os.path.isdir(path):
+        raise RuntimeError("Chunk {} does not exist".format(path))
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+class HashStage:
+    """Checksum every file of the chunk into a sha256sum-style sidecar."""
+
+    name = "hash"
+
+    def __init__(self, algorithm="sha256", block_size=1024 * 1024):
+        self._algorithm = algorithm
+        self._block_size = block_size
+
+    def __call__(self, chunk):
+        digests = {}
+        for path in _files(_local_path(chunk)):
+            h = hashlib.new(self._algorithm)
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(self._block_size), b""):
+                    h.update(block)
+            name = (
+                os.path.basename(path)
+                if path == chunk.path
+                else os.path.relpath(path, chunk.path)
+            )
+            digests[name] = h.hexdigest()
+
+        sidecar = "{}.{}".format(chunk.path.rstrip(os.sep), self._algorithm)
+        with open(sidecar, "w") as f:
+            for path, digest in sorted(digests.items()):
+                f.write("{}  {}\n".format(digest, path))
+
+        chunk.results[self.name] = sidecar
+
+
+class CompressStage:
+    """Replace the chunk directory by a compressed tarball."""
+
+    name = "compress"
+
+    def __init__(self, format="gztar", remove=True):
+        self._format = format
+        self._remove = remove
+
+    def __call__(self, chunk):
+        path = _local_path(chunk).rstrip(os.sep)
+        archive = shutil.make_archive(
+            path,
+            self._format,
+            root_dir=os.path.dirname(path),
+            base_dir=os.path.basename(path),
+        )
+        if self._remove:
+            shutil.rmtree(path)
+
+        chunk.results[self.name] = archive
+        chunk.path = archive
+
+
+class MoveStage:
+    """Move the chunk (and its sidecar files) to a destination directory."""
+
+    name = "move"
+
+    def __init__(self, destination):
+        self._destination = destination
+
+    def __call__(self, chunk):
+        destination = os.path.join(self._destination, chunk.session_name)
+        os.makedirs(destination, exist_ok=True)
+
+        source = _local_path(chunk)
+        chunk.path = shutil.move(source, destination)
+        for stage, result in chunk.results.items():
+            if result == source:
+                chunk.results[stage] = chunk.path
+            elif isinstance(result, str) and os.path.exists(result):
+                chunk.results[stage] = shutil.move(result, destination)
+        chunk.results[self.name] = chunk.path
+
+
+# Build a stage from its command line specification: "hash[=ALGORITHM]",
+# "manifest[=ALGORITHM]", "compress[=FORMAT]", "move=DESTINATION" or
+# "relay=[HOST:]PORT".
+def parse_stage(spec):
+    name, _, argument = spec.partition("=")
+    if name == "hash":
+        return HashStage(argument or "sha256")
+    if name == "manifest":
+        return ManifestStage(argument or "sha256")
+    if name == "compress":
+        return CompressStage(argument or "gztar")
+    if name == "move":
+        if not argument:
+            raise ValueError("The move stage needs a destination")
+        return MoveStage(argument)
+    if name == "relay":
+        return parse_relay_stage(argument)
+
+    raise ValueError("Unknown pipeline stage '{}'".format(name))
+
+
+class StageStats:
+    __slots__ = ("count", "failures", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+class Pipeline:
+    """Run the stages over completed chunks from a bounded pool of threads.
+
+    Up to `queue_size` chunks wait for the threads. Once the queue is full,
+    submit() drops the chunks, counting and logging them, under the DROP
+    `overflow` policy, so that a saturated pool never delays the listener, and waits
+    for room under the BLOCK policy. `on_done` is
+    called with the submitted notification once a chunk went through all
+    the stages, and `on_failed` once a chunk failed one of them or was
+    dropped.
+    """
+
+    def __init__(
+        self,
+        stages,
+        workers=DEFAULT_WORKERS,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        on_done=None,
+        overflow=DROP,
+        on_failed=None,
+    ):
+        if overflow not in (BLOCK, DROP):
+            raise ValueError("Unknown overflow policy '{}'".format(overflow))
+
+        self._stages = stages
+        self._on_done = on_done
+        self._on_failed = on_failed
+        self._block = overflow == BLOCK
+        self._work = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._stats = collections.OrderedDict((s.name, StageStats()) for s in stages)
+        self._max_depth = 0
+        self._completed = 0
+        self._dropped = 0
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True) for _ in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, notification):
+        chunk = Chunk(
+            notification.session_name,
+            notification.rotation_id,
+            notification.archive_path,
+            notification,
+        )
+        try:
+            self._work.put(chunk, self._block)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning("Pipeline queue full: dropped chunk %s", chunk.path)
+            if self._on_failed is not None:
+                self._on_failed(notification)
+            return
+
+        depth = self.depth()
+        if depth > self._max_depth:
+            self._max_depth = depth
+
+    def submit_batch(self, notifications):
+        for notification in notifications:
+            self.submit(notification)
+
+    def depth(self):
+        return self._work.qsize()
+
+    def _run(self):
+        while True:
+            chunk = self._work.get()
+            if chunk is None:
+                # Let the other workers see the end of the stream.
+                self._work.put(None)
+                return
+
+            for stage in self._stages:
+                stats = self._stats[stage.name]
+                start = time.perf_counter()
+                try:
+                    stage(chunk)
+                except Exception as e:
+                    with self._lock:
+                        stats.failures += 1
+                    logger.error(
+                        "Stage %s failed for chunk %s: %s", stage.name, chunk.path, e
+                    )
+                    if self._on_failed is not None:
+                        self._on_failed(chunk.notification)
+                    break
+
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    stats.add(elapsed)
+            else:
+                with self._lock:
+                    self._completed += 1
+                if self._on_done is not None:
+                    self._on_done(chunk.notification)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "queue_depth": self.depth(),
+                "max_queue_depth": self._max_depth,
+                "completed": self._completed,
+                "dropped": self._dropped,
+                "stages": {
+                    name: {
+                        "count": s.count,
+                        "failures": s.failures,
+                        "mean": s.total / s.count if s.count else 0.0,
+                        "max": s.max,
+                    }
+                    for name, s in self._stats.items()
+                },
+            }
+
+    # Process the chunks that were already submitted, then stop the threads.
+    def close(self):
+        self._work.put(None)
+        for thread in self._threads:
+            thread.join()
+        for stage in self._stages:
+            if hasattr(stage, "close"):
+                stage.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,209 @@
+import collections
+import json
+import re
+import socket
+import threading
+
+# Where the chunks stored by a relay daemon are written as a string (e.g. in
+# the outputs and the journal): PROTOCOL://HOST:CONTROL_PORT:DATA_PORT/PATH,
+# with brackets around an IPv6 host.
+RELAY_URL = "{}://{}:{}:{}/{}"
+RELAY_URL_PATTERN = re.compile(
+    r"([a-z]+)://(?:\[([^\]]*)\]|([^:/\[\]]*)):(\d+):(\d+)/(.*)", re.DOTALL
+)
+
+DEFAULT_MAX_IDLE = 4
+DEFAULT_TIMEOUT = 10.0
+
+
+class RelayLocation(
+    collections.namedtuple(
+        "RelayLocation", ["host", "protocol", "control_port", "data_port", "path"]
+    )
+):
+    """Archive location of a chunk stored by a relay daemon.
+
+    The archive path of a completed chunk is a RelayLocation when the chunk
+    is stored by a relay daemon, and a string, its absolute path, otherwise.
+    `path` is relative to the output directory of the relay daemon.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        host = "[{}]".format(self.host) if ":" in self.host else self.host
+        return RELAY_URL.format(
+            self.protocol, host, self.control_port, self.data_port, self.path
+        )
+
+
+def is_relay(archive_path):
+    return isinstance(archive_path, RelayLocation)
+
+
+def parse_archive_path(string):
+    """Return the archive path written as `string` by str()."""
+    match = RELAY_URL_PATTERN.fullmatch(string)
+    if match is None:
+        return string
+
+    protocol, ipv6_host, host, control_port, data_port, path = match.groups()
+    return RelayLocation(
+        host if ipv6_host is None else ipv6_host,
+        protocol,
+        int(control_port),
+        int(data_port),
+        path,
+    )
+
+
+# Raised when the collector closed or reset a connection before replying at
+# all, which is how a kept connection it closed in the meantime fails.
+class _ConnectionClosed(ConnectionError):
+    pass
+
+
+class Connection:
+    """Line-oriented connection to a collector."""
+
+    def __init__(self, address, timeout):
+        self.address = address
+        self.reused = False
+        self._socket = socket.create_connection(address, timeout)
+        self._reader = self._socket.makefile("rb")
+
+    def request(self, line):
+        try:
+            self._socket.sendall(line.encode("utf-8") + b"\n")
+            first = self._reader.read(1)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise _ConnectionClosed("Connection reset by the collector") from e
+        if not first:
+            raise _ConnectionClosed("Connection closed by the collector")
+
+        reply = first + self._reader.readline()
+        if not reply.endswith(b"\n"):
+            raise ConnectionError("Connection closed by the collector mid-reply")
+        return reply.decode("utf-8").rstrip("\n")
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+
+class ConnectionPool:
+    """Connections to collectors, kept open between requests.
+
+    Up to `max_idle` idle connections are kept per address. A request on a
+    kept connection which the collector closed in the meantime, i.e. which
+    is closed or reset before any byte of the reply is received, is retried
+    on another connection. Other failures, like timeouts, are not retried:
+    the collector may have received the request.
+    """
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE, timeout=DEFAULT_TIMEOUT):
+        self._max_idle = max_idle
+        self._timeout = timeout
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _take(self, address):
+        with self._lock:
+            idle = self._idle[address]
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.opened += 1
+
+        return Connection(address, self._timeout)
+
+    def _give_back(self, connection):
+        with self._lock:
+            idle = self._idle[connection.address]
+            if len(idle) < self._max_idle:
+                connection.reused = True
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, address, line):
+        """Send a line to the collector at `address` and return its reply."""
+        while True:
+            connection = self._take(address)
+            try:
+                reply = connection.request(line)
+            except _ConnectionClosed:
+                connection.close()
+                if connection.reused:
+                    continue
+                raise
+            except OSError:
+                connection.close()
+                raise
+
+            self._give_back(connection)
+            return reply
+
+    def close(self):
+        with self._lock:
+            idle = [c for connections in self._idle.values() for c in connections]
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
+
+
+class RelayStage:
+    """Tell the collector of the relay host that a chunk is available.
+
+    Each chunk stored by a relay daemon is announced to the collector
+    listening on `port` on the relay host, or on `host` when it is set, as a
+    JSON line. The collector fetches or processes the chunk and replies
+    with a line starting with "ok". Local chunks are skipped.
+    """
+
+    name = "relay"
+
+    def __init__(self, port, host=None, pool=None):
+        self._port = port
+        self._host = host
+        self.pool = ConnectionPool() if pool is None else pool
+
+    def __call__(self, chunk):
+        location = chunk.path
+        if not is_relay(location):
+            return
+
+        address = (self._host or location.host, self._port)
+        reply = self.pool.request(
+            address,
+            json.dumps(
+                {
+                    "session": chunk.session_name,
+                    "rotation_id": chunk.rotation_id,
+                    "host": location.host,
+                    "protocol": location.protocol,
+                    "control_port": location.control_port,
+                    "data_port": location.data_port,
+                    "path": location.path,
+                }
+            ),
+        )
+        if not reply.startswith("ok"):
+            raise RuntimeError(
+                "Collector at {}:{} replied: {}".format(address[0], address[1], reply)
+            )
+
+        chunk.results[self.name] = reply
+
+    def close(self):
+        self.pool.close()
+
+
+# "relay=PORT" or "relay=HOST:PORT".
+def parse_relay_stage(argument):
+    host, _, port = argument.rpartition(":")
+    if not port.isdigit():
+        raise ValueError("The relay stage needs a collector port")
+    return RelayStage(int(port), host or None)
@@ -0,0 +1,159 @@
+import threading
+
+DEFAULT_CAPACITY = 4096
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of the last records received.
+
+    The receive loop appends records without ever waiting for the
+    consumers: once the buffer is full, the oldest record is overwritten.
+    Every record gets a sequence number and each reader keeps its own
+    position, so a reader which falls more than `capacity` records behind
+    counts the records it missed and resumes from the oldest one retained.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1")
+
+        self.capacity = capacity
+        self._records = [None] * capacity
+        # Sequence number of the next record, i.e. the number of records
+        # appended so far.
+        self._sequence = 0
+        self._readers = []
+        self._closed = False
+        self._changed = threading.Condition()
+
+    def __len__(self):
+        return min(self._sequence, self.capacity)
+
+    @property
+    def sequence(self):
+        return self._sequence
+
+    @property
+    def oldest(self):
+        return max(0, self._sequence - self.capacity)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def append(self, record):
+        with self._changed:
+            self._records[self._sequence % self.capacity] = record
+            self._sequence += 1
+            self._changed.notify_all()
+
+    def extend(self, records):
+        with self._changed:
+            capacity = self.capacity
+            # Records overwritten within the batch still count as received.
+            kept = records[-capacity:]
+            sequence = self._sequence + len(records) - len(kept)
+            for record in kept:
+                self._records[sequence % capacity] = record
+                sequence += 1
+            self._sequence = sequence
+            self._changed.notify_all()
+
+    # Records [start, end), which must still be retained. The caller holds
+    # the lock.
+    def _slice(self, start, end):
+        count = end - start
+        if count <= 0:
+            return []
+
+        first = start % self.capacity
+        if first + count <= self.capacity:
+            return self._records[first : first + count]
+        return self._records[first:] + self._records[: first + count - self.capacity]
+
+    def history(self, count=None):
+        """Return up to the `count` most recent records, oldest first."""
+        with self._changed:
+            start = self.oldest
+            if count is not None:
+                start = max(start, self._sequence - count)
+            return self._slice(start, self._sequence)
+
+    def reader(self, replay=0):
+        """Return a reader starting `replay` records before the latest one."""
+        with self._changed:
+            reader = RingReader(self, max(self.oldest, self._sequence - replay))
+            self._readers.append(reader)
+            return reader
+
+    @property
+    def dropped(self):
+        return sum(reader.dropped for reader in self._readers)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "received": self._sequence,
+            "retained": len(self),
+            "dropped": self.dropped,
+        }
+
+    # Wake the readers up: they return the records left and then stop.
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+
+class RingReader:
+    """Position of a consumer in a ring buffer."""
+
+    def __init__(self, ring, position):
+        self._ring = ring
+        self.position = position
+        self.dropped = 0
+
+    @property
+    def lag(self):
+        return self._ring.sequence - self.position
+
+    def _take(self, limit):
+        ring = self._ring
+        oldest = ring.oldest
+        if self.position < oldest:
+            self.dropped += oldest - self.position
+            self.position = oldest
+
+        end = ring.sequence
+        if limit is not None:
+            end = min(end, self.position + limit)
+        records = ring._slice(self.position, end)
+        self.position = end
+        return records
+
+    def read(self, limit=None, timeout=None):
+        """Return the records appended since the last read, up to `limit`.
+
+        Waits up to `timeout` seconds (forever if None) for a record to be
+        appended. Returns an empty list on timeout or when the buffer is
+        closed and every record was read.
+        """
+        ring = self._ring
+        with ring._changed:
+            ring._changed.wait_for(
+                lambda: self.position < ring.sequence or ring.closed, timeout
+            )
+            return self._take(limit)
+
+    # Move back to return up to `count` records which were already read, or
+    # missed, again.
+    def replay(self, count):
+        with self._ring._changed:
+            self.position = max(self._ring.oldest, self.position - count)
+
+    def __iter__(self):
+        while True:
+            batch = self.read()
+            if not batch:
+                return
+            yield batch
@@ -0,0 +1,116 @@
+import bisect
+import collections
+
+from .notification import RotationCompleted, RotationOngoing
+
+# Rotations started and not completed yet which are remembered, the oldest
+# being forgotten first.
+DEFAULT_MAX_PENDING = 4096
+# Durations per session used to compute the rolling percentiles.
+DEFAULT_WINDOW = 256
+
+RotationDuration = collections.namedtuple(
+    "RotationDuration", ["session_name", "rotation_id", "duration"]
+)
+
+
+def percentile(values, fraction):
+    """Return the value at `fraction` of the sorted `values`."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class SessionDurations:
+    """Durations of the last `window` rotations of a session."""
+
+    __slots__ = ("count", "max", "_window", "_recent", "_sorted")
+
+    def __init__(self, window):
+        self.count = 0
+        self.max = 0.0
+        self._window = window
+        self._recent = collections.deque()
+        self._sorted = []
+
+    def add(self, duration):
+        self.count += 1
+        self.max = max(self.max, duration)
+        if len(self._recent) == self._window:
+            oldest = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._recent.append(duration)
+        bisect.insort(self._sorted, duration)
+
+    def percentile(self, fraction):
+        return percentile(self._sorted, fraction)
+
+
+class RotationTracker:
+    """Measure the duration of rotations from their start to their completion.
+
+    The reception timestamp of each rotation ongoing notification is kept,
+    keyed by session and rotation id, until the matching rotation completed
+    notification arrives. At most `max_pending` rotations are kept: the
+    oldest one is evicted to make room. `on_duration` is called with a
+    RotationDuration for every completed rotation whose start was seen.
+    """
+
+    condition_types = (RotationOngoing.condition_type, RotationCompleted.condition_type)
+
+    def __init__(
+        self,
+        on_duration=None,
+        max_pending=DEFAULT_MAX_PENDING,
+        window=DEFAULT_WINDOW,
+    ):
+        self._on_duration = on_duration
+        self._max_pending = max_pending
+        self._window = window
+        self._pending = collections.OrderedDict()
+        self._sessions = {}
+        # Rotations evicted before their completion and completions whose
+        # start was not seen (e.g. it happened before the listener started).
+        self.evicted = 0
+        self.unmatched = 0
+
+    def __call__(self, record):
+        key = (record.session_name, record.rotation_id)
+        if type(record) is RotationOngoing:
+            self._pending[key] = record.timestamp
+            if len(self._pending) > self._max_pending:
+                self._pending.popitem(last=False)
+                self.evicted += 1
+            return
+
+        start = self._pending.pop(key, None)
+        if start is None:
+            self.unmatched += 1
+            return
+
+        duration = (record.timestamp - start) / 1e9
+        durations = self._sessions.get(record.session_name)
+        if durations is None:
+            durations = self._sessions[record.session_name] = SessionDurations(
+                self._window
+            )
+        durations.add(duration)
+        if self._on_duration is not None:
+            self._on_duration(
+                RotationDuration(record.session_name, record.rotation_id, duration)
+            )
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def stats(self):
+        """Return the rotation count, max and rolling p50/p90/p99 by session."""
+        return {
+            session_name: {
+                "rotations": durations.count,
+                "p50": durations.percentile(0.5),
+                "p90": durations.percentile(0.9),
+                "p99": durations.percentile(0.99),
+                "max": durations.max,
+            }
+            for session_name, durations in self._sessions.items()
+        }
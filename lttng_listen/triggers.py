@@ -0,0 +1,373 @@
+import collections
+import concurrent.futures
+import fcntl
+import functools
+import json
+import os
+import tempfile
+import time
+
+from . import binding
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "lttng-listen",
+    "triggers.json",
+)
+
+# Description of a condition to subscribe to. `kind` is the `kind` of the
+# notification records (e.g. "rotation-completed"). `channel_name` and
+# `domain` ("kernel" or "ust") only apply to buffer usage conditions, and
+# `threshold` is a ratio for those and a size in bytes for the consumed size
+# condition.
+ConditionSpec = collections.namedtuple(
+    "ConditionSpec", ["kind", "session_name", "channel_name", "domain", "threshold"]
+)
+ConditionSpec.__new__.__defaults__ = (None, None, None)
+
+SetupTiming = collections.namedtuple(
+    "SetupTiming", ["session_name", "kind", "cached", "register", "subscribe"]
+)
+
+
+# Identifies the condition of a spec within a session, in the cache.
+def spec_key(spec):
+    if spec.kind.startswith("buffer-usage-"):
+        return "{}:{}:{}:{!r}".format(
+            spec.kind, spec.domain, spec.channel_name, spec.threshold
+        )
+    if spec.kind == "consumed-size":
+        return "{}:{}".format(spec.kind, spec.threshold)
+    return spec.kind
+
+
+class RegistrationCache:
+    """On-disk index of the triggers known to be registered.
+
+    Entries are keyed by session name and condition (see spec_key()). A
+    stale entry (the session daemon was restarted, the trigger was
+    unregistered) is detected when subscribing to its condition fails and
+    is then evicted.
+
+    Several listeners may share a cache: save() merges their changes with
+    the entries saved by the others, under a lock.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self._path = path
+        self._entries = self._read()
+        self._discarded = set()
+
+    def _read(self):
+        try:
+            with open(self._path) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return set()
+        except ValueError:
+            # A corrupted cache only costs a few extra registrations.
+            return set()
+
+        return {
+            (session_name, key)
+            for key, session_names in index.items()
+            for session_name in session_names
+        }
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    def add(self, session_name, key):
+        self._entries.add((session_name, key))
+        self._discarded.discard((session_name, key))
+
+    def discard(self, session_name, key):
+        self._entries.discard((session_name, key))
+        self._discarded.add((session_name, key))
+
+    def save(self):
+        directory = os.path.dirname(self._path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with open(self._path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._entries |= self._read() - self._discarded
+            self._discarded.clear()
+
+            index = {}
+            for session_name, key in sorted(self._entries):
+                index.setdefault(key, []).append(session_name)
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".triggers-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(index, f)
+                os.replace(tmp_path, self._path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+def _check(ctl, condition, status, what):
+    if status != ctl.LTTNG_CONDITION_STATUS_OK:
+        ctl.lttng_condition_destroy(condition)
+        raise RuntimeError("Failed to set {}".format(what))
+
+
+def _session_rotation(create):
+    def build(ffi, ctl, spec):
+        condition = create(ctl)
+        bSessionName = ffi.new("char[]", bytes(spec.session_name, "utf-8"))
+        status = ctl.lttng_condition_session_rotation_set_session_name(
+            condition, bSessionName
+        )
+        _check(ctl, condition, status, "{} condition name".format(spec.kind))
+        return condition
+
+    return build
+
+
+def _consumed_size(ffi, ctl, spec):
+    condition = ctl.lttng_condition_session_consumed_size_create()
+
+    bSessionName = ffi.new("char[]", bytes(spec.session_name, "utf-8"))
+    status = ctl.lttng_condition_session_consumed_size_set_session_name(
+        condition, bSessionName
+    )
+    _check(ctl, condition, status, "consumed size condition name")
+
+    status = ctl.lttng_condition_session_consumed_size_set_threshold(
+        condition, spec.threshold
+    )
+    _check(ctl, condition, status, "consumed size condition threshold")
+    return condition
+
+
+def _buffer_usage(create):
+    def build(ffi, ctl, spec):
+        condition = create(ctl)
+
+        bSessionName = ffi.new("char[]", bytes(spec.session_name, "utf-8"))
+        status = ctl.lttng_condition_buffer_usage_set_session_name(
+            condition, bSessionName
+        )
+        _check(ctl, condition, status, "buffer usage condition session name")
+
+        bChannelName = ffi.new("char[]", bytes(spec.channel_name, "utf-8"))
+        status = ctl.lttng_condition_buffer_usage_set_channel_name(
+            condition, bChannelName
+        )
+        _check(ctl, condition, status, "buffer usage condition channel name")
+
+        domain = {
+            "kernel": ctl.LTTNG_DOMAIN_KERNEL,
+            "ust": ctl.LTTNG_DOMAIN_UST,
+        }[spec.domain]
+        status = ctl.lttng_condition_buffer_usage_set_domain_type(condition, domain)
+        _check(ctl, condition, status, "buffer usage condition domain")
+
+        status = ctl.lttng_condition_buffer_usage_set_threshold_ratio(
+            condition, spec.threshold
+        )
+        _check(ctl, condition, status, "buffer usage condition threshold")
+        return condition
+
+    return build
+
+
+# Condition builders, by kind.
+_BUILDERS = {
+    "rotation-completed": _session_rotation(
+        lambda ctl: ctl.lttng_condition_session_rotation_completed_create()
+    ),
+    "rotation-ongoing": _session_rotation(
+        lambda ctl: ctl.lttng_condition_session_rotation_ongoing_create()
+    ),
+    "consumed-size": _consumed_size,
+    "buffer-usage-high": _buffer_usage(
+        lambda ctl: ctl.lttng_condition_buffer_usage_high_create()
+    ),
+    "buffer-usage-low": _buffer_usage(
+        lambda ctl: ctl.lttng_condition_buffer_usage_low_create()
+    ),
+}
+
+KINDS = tuple(_BUILDERS)
+
+
+def create_condition(ffi, ctl, spec):
+    return _BUILDERS[spec.kind](ffi, ctl, spec)
+
+
+def _register(ffi, ctl, condition, spec):
+    notify_action = ctl.lttng_action_notify_create()
+    trigger = ctl.lttng_trigger_create(condition, notify_action)
+
+    try:
+        status = ctl.lttng_register_trigger(trigger)
+        if status != 0 and status != ctl.LTTNG_ERR_TRIGGER_EXISTS:
+            raise RuntimeError(
+                "Failed to register {} trigger for session {}".format(
+                    spec.kind, spec.session_name
+                )
+            )
+    finally:
+        ctl.lttng_trigger_destroy(trigger)
+        ctl.lttng_action_destroy(notify_action)
+
+
+# Register the trigger of a condition and subscribe to its notifications.
+def subscribe_condition(ffi, ctl, channel, spec):
+    condition = create_condition(ffi, ctl, spec)
+
+    try:
+        _register(ffi, ctl, condition, spec)
+        channel.subscribe(condition)
+    finally:
+        ctl.lttng_condition_destroy(condition)
+
+
+# Unsubscribe from the condition of a spec and unregister its trigger.
+def unsubscribe_condition(ffi, ctl, channel, spec):
+    condition = create_condition(ffi, ctl, spec)
+    notify_action = ctl.lttng_action_notify_create()
+    trigger = ctl.lttng_trigger_create(condition, notify_action)
+
+    try:
+        channel.unsubscribe(condition)
+        status = ctl.lttng_unregister_trigger(trigger)
+        if status != 0:
+            raise RuntimeError(
+                "Failed to unregister {} trigger for session {}".format(
+                    spec.kind, spec.session_name
+                )
+            )
+    finally:
+        ctl.lttng_trigger_destroy(trigger)
+        ctl.lttng_action_destroy(notify_action)
+        ctl.lttng_condition_destroy(condition)
+
+
+def _timed_register(ffi, ctl, spec):
+    start = time.perf_counter()
+    condition = create_condition(ffi, ctl, spec)
+    try:
+        _register(ffi, ctl, condition, spec)
+    finally:
+        ctl.lttng_condition_destroy(condition)
+
+    return time.perf_counter() - start
+
+
+# liblttng-ctl talks to the session daemon through a process-wide socket, so
+# concurrent registrations run in separate processes, each with its own
+# bindings. They are started from a fork server: subscriptions may be set up
+# once the listener runs threads, which a forked process would inherit in
+# whatever state they were.
+_pool_binding = None
+
+# Specs to register from which a process pool is worth its startup: about
+# 0.3 s for 4 processes, against ~1 ms per registration (see
+# benchmarks/registration.py).
+POOL_THRESHOLD = 1000
+
+
+def _init_pool(load):
+    global _pool_binding
+    _pool_binding = load()
+
+
+def _pool_register(spec):
+    ffi, ctl = _pool_binding
+    return _timed_register(ffi, ctl, spec)
+
+
+def setup_conditions(
+    ffi, ctl, channel, specs, cache=None, jobs=1, load=binding.load, errors=None
+):
+    """Subscribe to the conditions described by `specs`.
+
+    Triggers found in `cache` are not registered again. The others are
+    registered by `jobs` concurrent processes when there are at least
+    POOL_THRESHOLD of them. The processes import the main module of the
+    program again: it must only start listening under
+    `if __name__ == "__main__"`. They load their bindings with `load`.
+
+    The first failure raises a RuntimeError, unless `errors` is a list: the
+    (spec, error) of each condition that failed is then appended to it, and
+    the others are still set up. Returns a SetupTiming per condition set
+    up.
+    """
+    timings = []
+    unregistered = []
+
+    def failed(spec, error):
+        if errors is None:
+            raise error
+        errors.append((spec, error))
+
+    for spec in specs:
+        key = spec_key(spec)
+        if cache is None or (spec.session_name, key) not in cache:
+            unregistered.append(spec)
+            continue
+
+        start = time.perf_counter()
+        condition = create_condition(ffi, ctl, spec)
+        try:
+            subscribed = channel.subscribe(condition, allow_unknown=True)
+        except RuntimeError as e:
+            failed(spec, e)
+            continue
+        finally:
+            ctl.lttng_condition_destroy(condition)
+
+        if subscribed:
+            elapsed = time.perf_counter() - start
+            timings.append(
+                SetupTiming(spec.session_name, spec.kind, True, 0.0, elapsed)
+            )
+        else:
+            cache.discard(spec.session_name, key)
+            unregistered.append(spec)
+
+    if jobs > 1 and len(unregistered) >= POOL_THRESHOLD:
+        import multiprocessing
+
+        with concurrent.futures.ProcessPoolExecutor(
+            jobs,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_pool,
+            initargs=(load,),
+        ) as pool:
+            futures = [pool.submit(_pool_register, s) for s in unregistered]
+        registrations = [future.result for future in futures]
+    else:
+        registrations = [
+            functools.partial(_timed_register, ffi, ctl, s) for s in unregistered
+        ]
+
+    for spec, registration in zip(unregistered, registrations):
+        condition = None
+        try:
+            register_time = registration()
+            start = time.perf_counter()
+            condition = create_condition(ffi, ctl, spec)
+            channel.subscribe(condition)
+        except RuntimeError as e:
+            failed(spec, e)
+            continue
+        finally:
+            if condition is not None:
+                ctl.lttng_condition_destroy(condition)
+
+        if cache is not None:
+            cache.add(spec.session_name, spec_key(spec))
+        elapsed = time.perf_counter() - start
+        timings.append(
+            SetupTiming(spec.session_name, spec.kind, False, register_time, elapsed)
+        )
+
+    if cache is not None:
+        cache.save()
+
+    return timings
@@ -0,0 +1,187 @@
+import heapq
+import multiprocessing
+import queue
+import signal
+import time
+
+from . import binding
+from .channel import NotificationChannel
+from .triggers import subscribe_condition
+
+# Interval at which an idle worker polls its channel and reports its
+# progress to the parent.
+POLL_INTERVAL = 0.01
+
+
+def shard(sessions, count):
+    return [sessions[i::count] for i in range(count) if sessions[i::count]]
+
+
+# Each worker owns a notification channel and the subscriptions of the
+# conditions of its share of the sessions. It sends (index, timestamp, batch,
+# dropped) messages: the timestamp of a message is a promise that the worker
+# will never send a notification received earlier, which lets the parent merge
+# the streams in order, and `dropped` counts the notifications dropped since
+# the previous message. A None batch reports the closing of the channel, after
+# which the worker exits. Errors are reported as (index, None, message, 0).
+# `stop` is a shared flag rather than an Event: setting an Event waits for its
+# waiters, which never happens if one of them was killed.
+def _work(index, specs, messages, stop, load, poll_interval):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        ffi, ctl = load()
+        with NotificationChannel(ffi, ctl) as channel:
+            for spec in specs:
+                subscribe_condition(ffi, ctl, channel, spec)
+
+            reported = 0
+            while not stop.value and not channel.closed:
+                batch = channel.drain()
+                dropped = channel.dropped - reported
+                reported += dropped
+                messages.put((index, time.monotonic(), batch, dropped))
+                if not batch:
+                    time.sleep(poll_interval)
+
+            if channel.closed:
+                dropped = channel.dropped - reported
+                messages.put((index, time.monotonic(), None, dropped))
+    except Exception as e:
+        messages.put((index, None, "Worker {}: {}".format(index, e), 0))
+
+
+class ShardedListener:
+    """Spread the sessions over worker processes and merge their streams.
+
+    `specs` are the ConditionSpecs of every session: all the conditions of a
+    session are subscribed to by the same worker. The workers are started
+    from a fork server: like triggers.setup_conditions, the main module of
+    the program must be guarded by `if __name__ == "__main__"`.
+
+    `closed` is set once the channels of all the workers are closed, and
+    `dropped` counts the notifications dropped by all the workers.
+    """
+
+    def __init__(self, specs, workers, load=binding.load, poll_interval=POLL_INTERVAL):
+        sessions = list(dict.fromkeys(spec.session_name for spec in specs))
+        context = multiprocessing.get_context("forkserver")
+        self._messages = context.Queue()
+        self._stop = context.RawValue("b", 0)
+        self.closed = False
+        self.dropped = 0
+        self._processes = [
+            context.Process(
+                target=_work,
+                args=(
+                    i,
+                    [spec for spec in specs if spec.session_name in share],
+                    self._messages,
+                    self._stop,
+                    load,
+                    poll_interval,
+                ),
+                daemon=True,
+            )
+            for i, share in enumerate(map(set, shard(sessions, workers)))
+        ]
+
+    def start(self):
+        for process in self._processes:
+            process.start()
+
+    # Yield lists of notifications, ordered by reception time across all
+    # workers, until the channels of all the workers are closed. Once
+    # stopped, the notifications already received are yielded in a last
+    # batch.
+    def batches(self):
+        watermarks = [None] * len(self._processes)
+        closed = set()
+        pending = []
+        sequence = 0
+        next_check = time.monotonic() + POLL_INTERVAL
+
+        while not self._stop.value and len(closed) < len(self._processes):
+            # A worker which died without reporting an error would hold the
+            # watermark back forever.
+            now = time.monotonic()
+            if now >= next_check:
+                self._check_workers()
+                next_check = now + POLL_INTERVAL
+
+            try:
+                message = self._messages.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            sequence = self._push(pending, sequence, watermarks, closed, *message)
+            if None in watermarks:
+                continue
+
+            low = min(watermarks)
+            ready = []
+            while pending and pending[0][0] <= low:
+                ready.append(heapq.heappop(pending)[2])
+            if ready:
+                yield ready
+
+        self.closed = len(closed) == len(self._processes)
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            sequence = self._push(pending, sequence, watermarks, closed, *message)
+        if pending:
+            yield [notification for _, _, notification in sorted(pending)]
+
+    # A closed worker sends nothing more: it no longer holds the watermark
+    # back.
+    def _push(
+        self, pending, sequence, watermarks, closed, index, stamp, batch, dropped
+    ):
+        if stamp is None:
+            raise RuntimeError(batch)
+
+        self.dropped += dropped
+        if batch is None:
+            closed.add(index)
+            watermarks[index] = float("inf")
+            return sequence
+
+        watermarks[index] = stamp
+        for notification in batch:
+            heapq.heappush(pending, (stamp, sequence, notification))
+            sequence += 1
+        return sequence
+
+    # Workers exit successfully once their channel is closed, after
+    # reporting it.
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process.exitcode:
+                raise RuntimeError(
+                    "Worker {} exited with code {}".format(index, process.exitcode)
+                )
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    # Safe to call from a signal handler: only asks the workers to exit.
+    def stop(self):
+        self._stop.value = 1
+
+    def close(self):
+        self.stop()
+        for process in self._processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,88 @@
+import unittest
+
+from lttng_listen.coalesce import Coalesced, Coalescer, expand
+from lttng_listen.notification import ConsumedSize, RotationCompleted
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def completed(session_name, rotation_id):
+    return RotationCompleted(session_name, rotation_id, "/tmp", 0)
+
+
+def consumed(session_name, size):
+    return ConsumedSize(session_name, size, 0)
+
+
+class CoalescerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.emitted = []
+        self.coalescer = Coalescer(
+            self.emitted.extend, window=1.0, max_size=3, clock=self.clock
+        )
+
+    def records(self, groups):
+        return [group.record() for group in groups]
+
+    def test_deadline(self):
+        self.coalescer.extend([completed("a", 1), consumed("a", 10)])
+        self.clock.now = 0.5
+        self.coalescer.extend([completed("a", 2), consumed("a", 20)])
+        self.assertEqual(self.coalescer.expire(0.99), [])
+        self.assertEqual(self.coalescer.next_deadline(), 1.0)
+
+        chunks, size = self.records(self.coalescer.expire(1.0))
+        self.assertEqual((chunks.count, chunks.first_rotation_id), (2, 1))
+        self.assertEqual(chunks.last_rotation_id, 2)
+        # Only the latest sample of a level is kept.
+        self.assertEqual(size, consumed("a", 20))
+        self.assertIsNone(self.coalescer.next_deadline())
+
+    def test_order(self):
+        self.coalescer.add(completed("b", 1))
+        self.clock.now = 0.5
+        self.coalescer.add(completed("a", 1))
+        self.coalescer.add(completed("b", 2))
+        groups = self.records(self.coalescer.expire(2.0))
+        self.assertEqual(
+            [[r.rotation_id for r in group] for group in groups], [[1, 2], [1]]
+        )
+        self.assertEqual([group.session_name for group in groups], ["b", "a"])
+
+    def test_max_size(self):
+        self.clock.now = 0.25
+        self.coalescer.extend([completed("a", i) for i in range(4)])
+        # The full group is due right away, the next record opens a new one.
+        (full,) = self.records(self.coalescer.expire())
+        self.assertEqual(len(full), 3)
+        (rest,) = self.records(self.coalescer.expire(1.25))
+        self.assertEqual(rest.first_rotation_id, 3)
+
+    def test_flush_on_close(self):
+        self.coalescer.start()
+        self.coalescer.extend([completed("a", 1), consumed("a", 10)])
+        self.coalescer.close()
+
+        self.assertEqual(len(self.emitted), 2)
+        self.assertEqual(self.emitted[1], consumed("a", 10))
+        self.assertEqual((self.coalescer.received, self.coalescer.emitted), (2, 2))
+
+    def test_expand(self):
+        handled = []
+        handler = expand(handled.append)
+        handler(Coalesced(2, [completed("a", 1), completed("a", 2)]))
+        handler(consumed("a", 10))
+        self.assertEqual(
+            handled, [completed("a", 1), completed("a", 2), consumed("a", 10)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from lttng_listen.controller import RotationController
+from lttng_listen.notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+)
+
+
+def high(session_name):
+    return BufferUsageHigh(session_name, "channel0", 100, 0.9, 0)
+
+
+def low(session_name):
+    return BufferUsageLow(session_name, "channel0", 10, 0.1, 0)
+
+
+def consumed(session_name, size):
+    return ConsumedSize(session_name, size, 0)
+
+
+class RotationControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.rotations = []
+        self.rearms = []
+        self.controller = RotationController(
+            self.rotate,
+            1000,
+            min_interval=5.0,
+            clock=lambda: self.now,
+            rearm=self.rearm,
+        )
+
+    def rotate(self, session_name):
+        self.rotations.append(session_name)
+        return True
+
+    def rearm(self, session_name, threshold):
+        self.rearms.append(threshold)
+        return True
+
+    def factor(self):
+        return self.controller.stats()["a"]["factor"]
+
+    def test_decrease(self):
+        for factor in (0.5, 0.25, 0.125, 0.125):
+            self.controller(high("a"))
+            self.assertEqual(self.factor(), factor)
+
+    def test_increase(self):
+        self.controller(high("a"))
+        self.controller(high("a"))
+        for factor in (0.5, 0.75, 1.0, 1.0):
+            self.controller(low("a"))
+            self.assertEqual(self.factor(), factor)
+
+    def test_rotation(self):
+        self.controller(consumed("a", 999))
+        self.assertEqual(self.rotations, [])
+        self.controller(consumed("a", 1000))
+        self.assertEqual(self.rotations, ["a"])
+
+        # Under pressure, the session is rotated early, but no more than once
+        # per interval.
+        self.now = 1.0
+        self.controller(high("a"))
+        self.controller(consumed("a", 1600))
+        self.assertEqual(self.rotations, ["a"])
+        self.now = 5.0
+        self.controller(consumed("a", 1600))
+        self.assertEqual(self.rotations, ["a", "a"])
+        stats = self.controller.stats()["a"]
+        self.assertEqual((stats["rotations"], stats["early_rotations"]), (2, 1))
+
+    def test_rearm(self):
+        self.controller(consumed("a", 400))
+        self.assertEqual(self.rearms, [])
+        self.controller(high("a"))
+        self.assertEqual(self.rearms, [500])
+        # A completed rotation starts a new chunk.
+        self.controller(consumed("a", 450))
+        self.controller(RotationCompleted("a", 1, "/tmp", 0))
+        self.assertEqual(self.rearms, [500, 950])
+        # Once the factor is at its minimum, the trigger stays in place.
+        self.controller(high("a"))
+        self.controller(high("a"))
+        self.controller(high("a"))
+        self.assertEqual(self.rearms, [500, 950, 700, 575])
+        # A session which cannot be rotated yet is evaluated again on the
+        # next consumed size sample.
+        self.controller(consumed("a", 2000))
+        self.controller(consumed("a", 2200))
+        self.assertEqual(self.rotations, ["a"])
+        self.assertEqual(self.rearms[-2:], [2125, 2201])
+
+
+if __name__ == "__main__":
+    unittest.main()
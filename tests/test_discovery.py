@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import tempfile
+import unittest
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.discovery import SubscriptionSet, follow_commands
+from lttng_listen.triggers import ConditionSpec, RegistrationCache
+
+
+def specs(session_name):
+    return [
+        ConditionSpec("rotation-completed", session_name),
+        ConditionSpec("rotation-ongoing", session_name),
+    ]
+
+
+class FailingCtl(fake.FakeCtl):
+    """Refuse the rotation ongoing subscriptions of the `failing` sessions."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+    def lttng_notification_channel_subscribe(self, channel, condition):
+        if (
+            condition.type == self.LTTNG_CONDITION_TYPE_SESSION_ROTATION_ONGOING
+            and condition.session_name.decode("utf-8") in self.failing
+        ):
+            return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_ERROR
+        return super().lttng_notification_channel_subscribe(channel, condition)
+
+
+class SubscriptionSetTest(unittest.TestCase):
+    def setUp(self):
+        self.ffi = fake.FakeFFI()
+        self.ctl = FailingCtl()
+        self.channel = NotificationChannel(self.ffi, self.ctl)
+        self.subscriptions = SubscriptionSet(self.ffi, self.ctl, self.channel, specs)
+
+    def test_second_session_fails(self):
+        self.ctl.failing.add("b")
+        with self.assertLogs("lttng_listen.discovery") as logs:
+            self.assertEqual(self.subscriptions.update(["a", "b"]), (["a"], []))
+        self.assertEqual(
+            logs.output,
+            [
+                "ERROR:lttng_listen.discovery:Failed to monitor session b: "
+                "Failed to subscribe to condition"
+            ],
+        )
+        self.assertEqual(self.subscriptions.sessions(), {"a"})
+        # The failed session left no subscription behind.
+        self.assertEqual(self.channel.subscriptions, 2)
+
+        # Retried by the next update, without touching the first one.
+        self.ctl.failing.clear()
+        self.assertEqual(self.subscriptions.update(["a", "b"]), (["b"], []))
+        self.assertEqual(self.subscriptions.sessions(), {"a", "b"})
+        self.assertEqual(self.channel.subscriptions, 4)
+
+    def test_cache_saved_once(self):
+        saves = []
+
+        class Cache(RegistrationCache):
+            def save(self):
+                saves.append(sorted(self._entries))
+                super().save()
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Cache(os.path.join(directory, "triggers.json"))
+            subscriptions = SubscriptionSet(
+                self.ffi, self.ctl, self.channel, specs, cache
+            )
+            self.ctl.failing.add("b")
+            with self.assertLogs("lttng_listen.discovery"):
+                self.assertEqual(subscriptions.add(["a", "b", "c"]), ["a", "c"])
+        self.assertEqual(len(saves), 1)
+        self.assertEqual({name for name, _ in saves[0]}, {"a", "b", "c"})
+
+    def test_remove(self):
+        self.subscriptions.update(["a", "b"])
+        self.assertEqual(self.subscriptions.update(["b"]), ([], ["a"]))
+        self.assertEqual(self.channel.subscriptions, 2)
+
+    def test_set_threshold(self):
+        subscriptions = SubscriptionSet(
+            self.ffi,
+            self.ctl,
+            self.channel,
+            lambda s: [ConditionSpec("consumed-size", s, threshold=100)],
+        )
+        subscriptions.add(["a"])
+        subscriptions.set_threshold("a", "consumed-size", 200)
+        self.assertEqual(
+            [c.threshold for c in self.channel._channel.subscriptions], [200]
+        )
+
+        # Removing the session unsubscribes from the moved condition.
+        subscriptions.remove(["a"])
+        self.assertEqual(self.channel.subscriptions, 0)
+        with self.assertRaises(RuntimeError):
+            subscriptions.set_threshold("a", "consumed-size", 300)
+
+
+class FollowCommandsTest(unittest.TestCase):
+    def test_commands_in_one_read(self):
+        added = []
+
+        class Subscriptions:
+            def add(self, session_names):
+                added.extend(session_names)
+                return session_names
+
+        async def follow():
+            read_fd, write_fd = os.pipe()
+            with os.fdopen(read_fd) as stream:
+                task = asyncio.ensure_future(follow_commands(Subscriptions(), stream))
+                os.write(write_fd, b"add a\nadd b\nadd c\nadd ")
+                await asyncio.sleep(0.1)
+                # Applied without waiting for more input.
+                self.assertEqual(added, ["a", "b", "c"])
+                os.write(write_fd, b"d")
+                os.close(write_fd)
+                await asyncio.wait_for(task, 1)
+
+        with self.assertLogs("lttng_listen.discovery", logging.INFO):
+            asyncio.run(follow())
+        self.assertEqual(added, ["a", "b", "c", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
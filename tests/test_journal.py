@@ -0,0 +1,135 @@
+import os
+import tempfile
+import time
+import unittest
+
+from lttng_listen import pipeline
+from lttng_listen.journal import (
+    CURSOR_NAME,
+    DEAD_LETTERS_NAME,
+    JOURNAL_NAME,
+    Journal,
+    read_entries,
+)
+from lttng_listen.notification import RotationCompleted
+
+
+def record(session_name, rotation_id, path):
+    return RotationCompleted(session_name, rotation_id, path, 0)
+
+
+class FailingStage:
+    name = "fail"
+
+    def __init__(self, failing):
+        self.failing = failing
+        self.calls = 0
+
+    def __call__(self, chunk):
+        if chunk.rotation_id in self.failing:
+            self.calls += 1
+            raise RuntimeError("failed")
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def restart(self, **kwargs):
+        delivered = []
+        journal = Journal(self.directory, **kwargs)
+        journal.start(delivered.append)
+        return journal, delivered
+
+    def test_failed_chunks_are_delivered_again(self):
+        journal = Journal(self.directory)
+        archives = pipeline.Pipeline([FailingStage({1})], on_done=journal.ack)
+        archives.start()
+        journal.start(archives.submit)
+        for i in range(3):
+            journal.append(record("s", i, "/tmp/s/{}".format(i)))
+        journal.stop()
+        archives.close()
+        journal.close()
+
+        journal, delivered = self.restart()
+        journal.close()
+        self.assertEqual([r.rotation_id for r in delivered], [1])
+
+    def test_compaction(self):
+        archives = os.path.join(self.directory, "archives")
+        records = []
+        for i in range(100):
+            session_name = "s{}".format(i % 2)
+            path = os.path.join(archives, session_name, "chunk-{}".format(i))
+            os.makedirs(path)
+            records.append(record(session_name, i, path))
+
+        journal = Journal(self.directory, compact_size=1)
+        journal.start(lambda r: r.rotation_id != 50 and journal.ack(r))
+        for r in records:
+            journal.append(r)
+        journal.close()
+        self.assertGreater(journal.compactions, 0)
+        self.assertLess(
+            os.path.getsize(os.path.join(self.directory, JOURNAL_NAME)), 100 * 40
+        )
+
+        # Only the unacknowledged chunk is delivered again, and the chunks
+        # removed from the journal are not recovered.
+        journal, delivered = self.restart()
+        self.assertEqual(journal.reconcile(), [])
+        journal.close()
+        self.assertEqual([r.rotation_id for r in delivered], [50])
+
+    def test_dead_letters(self):
+        journal = Journal(self.directory, commit_interval=0.01, max_attempts=2)
+        stage = FailingStage({1})
+        archives = pipeline.Pipeline(
+            [stage], on_done=journal.ack, on_failed=journal.fail
+        )
+        archives.start()
+        journal.start(archives.submit)
+        for i in range(3):
+            journal.append(record("s", i, "/tmp/s/{}".format(i)))
+        with self.assertLogs("lttng_listen.journal", "ERROR"):
+            while not journal.dead_letters:
+                time.sleep(0.01)
+        journal.stop()
+        archives.close()
+        journal.close()
+        self.assertEqual(stage.calls, 2)
+
+        with open(os.path.join(self.directory, DEAD_LETTERS_NAME), "rb") as f:
+            dead = [r for _, r in read_entries(f.read())]
+        self.assertEqual([r.archive_path for r in dead], ["/tmp/s/1"])
+        journal, delivered = self.restart()
+        journal.close()
+        self.assertEqual(delivered, [])
+
+    # An entry which is never acknowledged does not keep the compaction from
+    # removing the acknowledged entries which follow it.
+    def test_compaction_past_unacknowledged_entry(self):
+        journal = Journal(self.directory, compact_size=1)
+        journal.start(lambda r: r.rotation_id and journal.ack(r))
+        for i in range(2000):
+            journal.append(record("s", i, "/tmp/s/{}".format(i)))
+        journal.close()
+        self.assertGreater(journal.compactions, 0)
+        self.assertLess(
+            os.path.getsize(os.path.join(self.directory, JOURNAL_NAME)), 200
+        )
+        with open(os.path.join(self.directory, CURSOR_NAME)) as f:
+            self.assertLess(len(f.readlines()), 10)
+
+        journal, delivered = self.restart()
+        journal.close()
+        self.assertEqual([r.rotation_id for r in delivered], [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
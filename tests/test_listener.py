@@ -0,0 +1,62 @@
+import unittest
+
+from lttng_listen import fake
+from lttng_listen.listener import Listener
+
+
+class FailingCtl(fake.FakeCtl):
+    """Refuse the subscriptions to the conditions of the `failing` sessions."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+    def lttng_notification_channel_subscribe(self, channel, condition):
+        if condition.session_name.decode("utf-8") in self.failing:
+            return self.LTTNG_NOTIFICATION_CHANNEL_STATUS_ERROR
+        return super().lttng_notification_channel_subscribe(channel, condition)
+
+
+class ListenerTest(unittest.TestCase):
+    def setUp(self):
+        self.ffi = fake.FakeFFI()
+        self.ctl = FailingCtl()
+        self.listener = Listener(["a", "b"], ffi=self.ffi, ctl=self.ctl)
+        self.received = []
+        self.listener.add_handler(self.handle)
+
+    def handle(self, record):
+        self.received.append(record.rotation_id)
+        self.listener.stop()
+
+    def run_once(self, rotation_id):
+        self.listener.open()
+        self.ctl.emit(fake.DROPPED)
+        self.ctl.emit(self.ctl.rotation_completed("a", rotation_id, "/tmp"))
+        self.listener.run()
+        self.listener.close()
+
+    def test_reopen(self):
+        self.run_once(1)
+        self.assertIsNone(self.listener.channel)
+        self.assertEqual(self.ctl.channels, [])
+
+        # Stopped by the previous run, the listener runs again once reopened.
+        self.run_once(2)
+        self.assertEqual(self.received, [1, 2])
+        self.assertEqual(self.listener.dropped, 2)
+
+    def test_open_fails(self):
+        self.ctl.failing.add("b")
+        with self.assertRaises(RuntimeError):
+            self.listener.open()
+        self.assertIsNone(self.listener.channel)
+        self.assertEqual(self.ctl.channels, [])
+
+        self.ctl.failing.clear()
+        self.run_once(1)
+        self.assertEqual(self.received, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
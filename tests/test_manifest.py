@@ -0,0 +1,74 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+
+from lttng_listen.manifest import (
+    CTF_MAGIC,
+    PACKET_HEADER_SIZE,
+    PACKET_SIZE_OFFSET,
+    TIMESTAMP_BEGIN_OFFSET,
+    ManifestStage,
+    index_packets,
+)
+from lttng_listen.pipeline import Chunk
+
+
+# A packet of `size` bytes whose header and context are followed by padding.
+def packet(order, size, begin, end):
+    data = bytearray(size)
+    struct.pack_into(order + "I", data, 0, CTF_MAGIC)
+    struct.pack_into(order + "QQ", data, TIMESTAMP_BEGIN_OFFSET, begin, end)
+    struct.pack_into(order + "Q", data, PACKET_SIZE_OFFSET, size * 8)
+    return bytes(data)
+
+
+def stream(order="<"):
+    return (
+        packet(order, 128, 1000, 1999)
+        + packet(order, PACKET_HEADER_SIZE, 2000, 2999)
+        + packet(order, 256, 3000, 3999)
+    )
+
+
+PACKETS = [(0, 128, 1000, 1999), (128, 64, 2000, 2999), (192, 256, 3000, 3999)]
+
+
+class IndexPacketsTest(unittest.TestCase):
+    def test_stream(self):
+        for order in ("<", ">"):
+            self.assertEqual(index_packets(stream(order)), (PACKETS, True))
+
+    def test_truncated(self):
+        data = stream()
+        self.assertEqual(index_packets(data[:-1]), (PACKETS[:2], False))
+        self.assertEqual(index_packets(data + b"\0" * 64), (PACKETS, False))
+
+    def test_not_ctf(self):
+        self.assertEqual(index_packets(bytes(256)), ([], False))
+        self.assertEqual(index_packets(b""), ([], False))
+
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chunk-1")
+            os.makedirs(os.path.join(path, "kernel"))
+            with open(os.path.join(path, "kernel", "channel0_0"), "wb") as f:
+                f.write(stream())
+            with open(os.path.join(path, "metadata"), "wb") as f:
+                f.write(b"/* CTF 1.8 */")
+
+            chunk = Chunk("s", 1, path)
+            ManifestStage()(chunk)
+            with open(chunk.results["manifest"]) as f:
+                files = json.load(f)["files"]
+
+        channel = files[os.path.join("kernel", "channel0_0")]
+        self.assertEqual(channel["size"], 448)
+        self.assertEqual([tuple(p) for p in channel["packets"]], PACKETS)
+        self.assertTrue(channel["complete"])
+        self.assertNotIn("packets", files["metadata"])
+
+
+if __name__ == "__main__":
+    unittest.main()
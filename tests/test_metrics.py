@@ -0,0 +1,35 @@
+import unittest
+
+from lttng_listen import fake
+from lttng_listen.metrics import InstrumentedChannel
+
+
+class InstrumentedChannelTest(unittest.TestCase):
+    def setUp(self):
+        ffi, ctl = fake.load()
+        self.channel = InstrumentedChannel(ffi, ctl)
+        for i in range(10):
+            ctl.emit(ctl.rotation_completed("s", i, "/tmp/{}".format(i)))
+        ctl.emit(fake.CLOSED)
+
+    def observations(self):
+        metrics = self.channel.metrics
+        return sum(metrics.get_next_time.counts), sum(metrics.decode_time.counts)
+
+    # The closing of the channel is received too, but not decoded: once by
+    # drain(), and once more by the wait for the next batch.
+    def test_drain(self):
+        self.assertEqual(len(self.channel.drain()), 10)
+        self.assertEqual(self.observations(), (11, 10))
+
+    def test_batches(self):
+        self.assertEqual(sum(map(len, self.channel.batches())), 10)
+        self.assertEqual(self.observations(), (12, 10))
+
+    def test_next(self):
+        self.assertEqual(len(list(self.channel)), 10)
+        self.assertEqual(self.observations(), (11, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
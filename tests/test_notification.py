@@ -0,0 +1,71 @@
+import unittest
+
+from lttng_listen import fake
+from lttng_listen.channel import NotificationChannel
+from lttng_listen.listener import Listener
+from lttng_listen.notification import RotationCompleted
+
+
+class NotificationViewTest(unittest.TestCase):
+    def setUp(self):
+        self.ffi, self.ctl = fake.load()
+        self.calls = []
+
+    # Record the calls to a liblttng-ctl function.
+    def count(self, name):
+        function = getattr(self.ctl, name)
+
+        def wrapper(*args):
+            self.calls.append(name)
+            return function(*args)
+
+        setattr(self.ctl, name, wrapper)
+
+    def test_unread_fields_are_not_decoded(self):
+        self.count("lttng_evaluation_session_rotation_get_id")
+        self.count("lttng_evaluation_session_rotation_completed_get_location")
+        sessions = []
+        records = []
+
+        def keep(view):
+            sessions.append(view.session_name)
+            if view.session_name == "s1":
+                records.append(view.record())
+
+        listener = Listener(["s0", "s1"], ffi=self.ffi, ctl=self.ctl, lazy=True)
+        listener.add_handler(keep)
+        listener.open()
+        self.ctl.emit(self.ctl.rotation_completed("s0", 1, "/tmp/s0/1"))
+        self.ctl.emit(self.ctl.rotation_completed("s1", 2, "/tmp/s1/2"))
+        self.ctl.emit(fake.CLOSED)
+        listener.run()
+        listener.close()
+
+        self.assertEqual(sessions, ["s0", "s1"])
+        self.assertEqual(
+            self.calls,
+            [
+                "lttng_evaluation_session_rotation_get_id",
+                "lttng_evaluation_session_rotation_completed_get_location",
+            ],
+        )
+        self.assertEqual(
+            records[0], RotationCompleted("s1", 2, "/tmp/s1/2", records[0].timestamp)
+        )
+
+    def test_fields(self):
+        channel = NotificationChannel(self.ffi, self.ctl)
+        self.ctl.emit(self.ctl.buffer_usage("s", "channel0", 100, 0.5))
+        self.ctl.emit(fake.CLOSED)
+        for view in channel.views():
+            self.assertEqual(view.kind, "buffer-usage-high")
+            self.assertEqual(view.channel_name, "channel0")
+            self.assertEqual((view.usage, view.usage_ratio), (100, 0.5))
+            with self.assertRaises(AttributeError):
+                view.rotation_id
+        with self.assertRaises(RuntimeError):
+            view.session_name
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import io
+import json
+import unittest
+
+from lttng_listen.coalesce import Coalesced
+from lttng_listen.notification import (
+    BufferUsageHigh,
+    BufferUsageLow,
+    ConsumedSize,
+    RotationCompleted,
+    RotationOngoing,
+)
+from lttng_listen.output import BinarySink, NDJSONSink, read_binary
+from lttng_listen.relay import RelayLocation
+
+RECORDS = [
+    RotationCompleted("sé", 1, "/tmp/s/archives/chunk-1", 10),
+    RotationCompleted("s", 2, RelayLocation("relay", "tcp", 5342, 5343, "s/2"), 11),
+    RotationOngoing("s", 3, 12),
+    ConsumedSize("s", 1 << 40, 13),
+    BufferUsageHigh("s", "channel0", 4096, 0.75, 14),
+    BufferUsageLow("s", "channel0", 0, 0.0, 15),
+]
+
+
+class BinarySinkTest(unittest.TestCase):
+    def test_round_trip(self):
+        stream = io.BytesIO()
+        with BinarySink(stream) as sink:
+            for record in RECORDS:
+                sink.write(record)
+
+        stream.seek(0)
+        self.assertEqual(list(read_binary(stream)), RECORDS)
+
+    def test_coalesced(self):
+        stream = io.BytesIO()
+        with BinarySink(stream) as sink:
+            sink.write_coalesced(Coalesced(2, RECORDS[:2]))
+            sink.write_coalesced(RECORDS[2])
+
+        stream.seek(0)
+        self.assertEqual(list(read_binary(stream)), RECORDS[:3])
+
+    def test_buffering(self):
+        stream = io.BytesIO()
+        sink = BinarySink(stream, buffer_size=1 << 20, flush_interval=3600)
+        sink.write(RECORDS[0])
+        self.assertEqual(stream.getvalue(), b"")
+        sink.flush()
+        self.assertNotEqual(stream.getvalue(), b"")
+
+
+class NDJSONSinkTest(unittest.TestCase):
+    def test_json(self):
+        stream = io.BytesIO()
+        with NDJSONSink(stream) as sink:
+            for record in RECORDS:
+                sink.write(record)
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([line["type"] for line in lines], [r.kind for r in RECORDS])
+        self.assertEqual(lines[0]["session"], "sé")
+        self.assertEqual(lines[1]["archive_path"], str(RECORDS[1].archive_path))
+        self.assertEqual(lines[4]["usage_ratio"], 0.75)
+
+
+if __name__ == "__main__":
+    unittest.main()
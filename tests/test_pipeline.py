@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from lttng_listen.notification import RotationCompleted
+from lttng_listen.pipeline import (
+    BLOCK,
+    DROP,
+    CompressStage,
+    HashStage,
+    MoveStage,
+    Pipeline,
+)
+
+
+def make_chunk(root, session_name, index):
+    path = os.path.join(root, session_name, "archives", "chunk-{}".format(index))
+    os.makedirs(os.path.join(path, "kernel"))
+    with open(os.path.join(path, "kernel", "channel0_0"), "wb") as f:
+        f.write(os.urandom(1024))
+    return path
+
+
+class BlockingStage:
+    name = "block"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def __call__(self, chunk):
+        self.release.wait()
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def notifications(self, count):
+        return [
+            RotationCompleted(
+                "session-{}".format(i % 2),
+                i,
+                make_chunk(self.root, "session-{}".format(i % 2), i),
+                0,
+            )
+            for i in range(count)
+        ]
+
+    def test_stages(self):
+        destination = os.path.join(self.root, "uploaded")
+        notifications = self.notifications(4)
+        done = []
+        stages = [HashStage(), CompressStage(), MoveStage(destination)]
+        with Pipeline(stages, on_done=done.append, overflow=BLOCK) as pipeline:
+            pipeline.submit_batch(notifications)
+
+        self.assertEqual(sorted(done), sorted(notifications))
+        self.assertEqual(pipeline.metrics()["completed"], 4)
+        for n in notifications:
+            self.assertFalse(os.path.exists(n.archive_path))
+            name = os.path.join(
+                destination, n.session_name, os.path.basename(n.archive_path)
+            )
+            self.assertTrue(os.path.isfile(name + ".tar.gz"))
+            with open(name + ".sha256") as f:
+                self.assertTrue(f.read().endswith("  kernel/channel0_0\n"))
+
+    def test_drop(self):
+        stage = BlockingStage()
+        failed = []
+        pipeline = Pipeline(
+            [stage], workers=1, queue_size=1, on_failed=failed.append, overflow=DROP
+        )
+        pipeline.start()
+        notifications = self.notifications(4)
+        with self.assertLogs("lttng_listen.pipeline", "WARNING") as logs:
+            # The first chunk is taken by the thread, the second one queued.
+            pipeline.submit(notifications[0])
+            while pipeline.depth():
+                pass
+            pipeline.submit_batch(notifications[1:])
+        stage.release.set()
+        pipeline.close()
+
+        self.assertEqual(failed, notifications[2:])
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn(notifications[2].archive_path, logs.output[0])
+        metrics = pipeline.metrics()
+        self.assertEqual((metrics["completed"], metrics["dropped"]), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
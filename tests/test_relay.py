@@ -0,0 +1,113 @@
+import socket
+import threading
+import time
+import unittest
+
+from lttng_listen.relay import (
+    ConnectionPool,
+    RelayLocation,
+    is_relay,
+    parse_archive_path,
+)
+
+
+class ArchivePathTest(unittest.TestCase):
+    def test_round_trip(self):
+        for location in (
+            RelayLocation("relay.example", "tcp", 5342, 5343, "s/archives/1"),
+            RelayLocation("10.0.0.1", "tcp", 5342, 5343, "/s/1"),
+            RelayLocation("::1", "tcp", 5342, 5343, "s/1"),
+            RelayLocation("fe80::1%eth0", "tcp", 1, 2, "s/a:b"),
+        ):
+            self.assertEqual(parse_archive_path(str(location)), location)
+
+    def test_ipv6_url(self):
+        location = RelayLocation("::1", "tcp", 5342, 5343, "x")
+        self.assertEqual(str(location), "tcp://[::1]:5342:5343/x")
+
+    def test_local_path(self):
+        path = "/var/lib/lttng/s/archives/20200101T000000+0000-1"
+        self.assertEqual(parse_archive_path(path), path)
+        self.assertFalse(is_relay(path))
+
+
+class Collector:
+    """Collector replying to each request line as told by `actions`.
+
+    "ok" replies, "partial" sends part of a reply and closes the connection
+    and "silent" never replies. Requests are replied to by default.
+    """
+
+    def __init__(self):
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self.address = self._socket.getsockname()
+        self.actions = []
+        self.lines = []
+        self._connections = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            self._connections.append(connection)
+            threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            ).start()
+
+    def _serve(self, connection):
+        with connection, connection.makefile("rb") as reader:
+            for line in reader:
+                self.lines.append(line)
+                action = self.actions.pop(0) if self.actions else "ok"
+                if action == "ok":
+                    connection.sendall(b"ok\n")
+                elif action == "partial":
+                    connection.sendall(b"o")
+                    return
+
+    # Close the connections on the collector side, as an idle timeout does.
+    def drop_connections(self):
+        for connection in self._connections:
+            connection.shutdown(socket.SHUT_RDWR)
+        # Let the connections be closed.
+        time.sleep(0.05)
+
+    def close(self):
+        self._socket.close()
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.collector = Collector()
+        self.pool = ConnectionPool(timeout=0.2)
+        self.assertEqual(self.pool.request(self.collector.address, "a"), "ok")
+
+    def tearDown(self):
+        self.pool.close()
+        self.collector.close()
+
+    def test_closed_connection_retried(self):
+        self.collector.drop_connections()
+        self.assertEqual(self.pool.request(self.collector.address, "b"), "ok")
+        self.assertEqual((self.pool.opened, self.pool.reused), (2, 1))
+        self.assertEqual(self.collector.lines, [b"a\n", b"b\n"])
+
+    def test_timeout_not_retried(self):
+        self.collector.actions.append("silent")
+        with self.assertRaises(socket.timeout):
+            self.pool.request(self.collector.address, "b")
+        self.assertEqual(self.pool.opened, 1)
+        self.assertEqual(self.collector.lines, [b"a\n", b"b\n"])
+
+    def test_partial_reply_not_retried(self):
+        self.collector.actions.append("partial")
+        with self.assertRaises(ConnectionError):
+            self.pool.request(self.collector.address, "b")
+        self.assertEqual(self.pool.opened, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from lttng_listen.ring import RingBuffer
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_wraparound(self):
+        ring = RingBuffer(4)
+        reader = ring.reader()
+        for i in range(3):
+            ring.append(i)
+        self.assertEqual(reader.read(), [0, 1, 2])
+
+        ring.extend([3, 4, 5])
+        self.assertEqual(reader.read(), [3, 4, 5])
+        self.assertEqual(ring.history(), [2, 3, 4, 5])
+        self.assertEqual(ring.history(2), [4, 5])
+        self.assertEqual((len(ring), ring.oldest, ring.sequence), (4, 2, 6))
+
+    def test_extend_larger_than_capacity(self):
+        ring = RingBuffer(3)
+        reader = ring.reader()
+        ring.extend(list(range(5)))
+        self.assertEqual(reader.read(), [2, 3, 4])
+        self.assertEqual(reader.dropped, 2)
+
+    def test_reader_falls_behind(self):
+        ring = RingBuffer(4)
+        slow = ring.reader()
+        fast = ring.reader()
+        for i in range(10):
+            ring.append(i)
+            fast.read()
+
+        self.assertEqual(slow.lag, 10)
+        self.assertEqual(slow.read(limit=2), [6, 7])
+        self.assertEqual(slow.dropped, 6)
+        self.assertEqual(fast.dropped, 0)
+        self.assertEqual(ring.stats()["dropped"], 6)
+
+        # Replay goes back to the oldest record retained at most.
+        slow.replay(10)
+        self.assertEqual(slow.read(), [6, 7, 8, 9])
+        self.assertEqual(slow.dropped, 6)
+
+    def test_reader_replay_on_creation(self):
+        ring = RingBuffer(4)
+        ring.extend(list(range(6)))
+        self.assertEqual(ring.reader(replay=2).read(), [4, 5])
+        self.assertEqual(ring.reader(replay=10).read(), [2, 3, 4, 5])
+        self.assertEqual(ring.reader().read(timeout=0), [])
+
+    def test_close(self):
+        ring = RingBuffer(4)
+        reader = ring.reader()
+        batches = []
+        thread = threading.Thread(target=lambda: batches.extend(reader))
+        thread.start()
+        ring.extend([0, 1])
+        ring.close()
+        thread.join(1)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([r for batch in batches for r in batch], [0, 1])
+
+    def test_capacity(self):
+        with self.assertRaises(ValueError):
+            RingBuffer(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
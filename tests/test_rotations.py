@@ -0,0 +1,63 @@
+import unittest
+
+from lttng_listen.notification import RotationCompleted, RotationOngoing
+from lttng_listen.rotations import RotationDuration, RotationTracker
+
+
+def ongoing(session_name, rotation_id, seconds):
+    return RotationOngoing(session_name, rotation_id, int(seconds * 1e9))
+
+
+def completed(session_name, rotation_id, seconds):
+    return RotationCompleted(session_name, rotation_id, "/tmp", int(seconds * 1e9))
+
+
+class RotationTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.durations = []
+        self.tracker = RotationTracker(self.durations.append, max_pending=2)
+
+    def test_pairing(self):
+        self.tracker(ongoing("a", 1, 10))
+        self.tracker(ongoing("b", 1, 11))
+        self.tracker(completed("b", 1, 12))
+        self.tracker(completed("a", 1, 14))
+
+        self.assertEqual(
+            self.durations,
+            [RotationDuration("b", 1, 1.0), RotationDuration("a", 1, 4.0)],
+        )
+        self.assertEqual(self.tracker.pending, 0)
+        stats = self.tracker.stats()
+        self.assertEqual(stats["a"]["rotations"], 1)
+        self.assertEqual((stats["b"]["p50"], stats["b"]["max"]), (1.0, 1.0))
+
+    def test_missing_start(self):
+        self.tracker(completed("a", 1, 10))
+        self.tracker(ongoing("a", 2, 10))
+        # The completion of another rotation does not match.
+        self.tracker(completed("a", 3, 11))
+        self.assertEqual(self.durations, [])
+        self.assertEqual((self.tracker.unmatched, self.tracker.pending), (2, 1))
+
+    def test_duplicates(self):
+        # A repeated start restarts the measure, a repeated completion is
+        # unmatched.
+        self.tracker(ongoing("a", 1, 10))
+        self.tracker(ongoing("a", 1, 11))
+        self.tracker(completed("a", 1, 12))
+        self.tracker(completed("a", 1, 13))
+        self.assertEqual(self.durations, [RotationDuration("a", 1, 1.0)])
+        self.assertEqual(self.tracker.unmatched, 1)
+
+    def test_eviction(self):
+        for i in range(3):
+            self.tracker(ongoing("a", i, i))
+        self.tracker(completed("a", 0, 5))
+        self.tracker(completed("a", 2, 5))
+        self.assertEqual(self.durations, [RotationDuration("a", 2, 3.0)])
+        self.assertEqual((self.tracker.evicted, self.tracker.unmatched), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from lttng_listen.triggers import RegistrationCache
+
+
+class RegistrationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "triggers.json")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_save_merges(self):
+        first = RegistrationCache(self.path)
+        second = RegistrationCache(self.path)
+        first.add("a", "k")
+        first.add("b", "k")
+        first.save()
+        second.add("c", "k")
+        second.save()
+        self.assertEqual(
+            RegistrationCache(self.path)._entries,
+            {("a", "k"), ("b", "k"), ("c", "k")},
+        )
+
+        # Evicted entries are removed from the saved ones.
+        first.discard("c", "k")
+        first.save()
+        self.assertNotIn(("c", "k"), RegistrationCache(self.path))
+
+    def test_concurrent_saves(self):
+        def save(index):
+            cache = RegistrationCache(self.path)
+            for i in range(20):
+                cache.add("s{}-{}".format(index, i), "k")
+                cache.save()
+
+        threads = [threading.Thread(target=save, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(RegistrationCache(self.path)._entries), 80)
+        self.assertEqual(
+            sorted(os.listdir(self._directory.name)),
+            ["triggers.json", "triggers.json.lock"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
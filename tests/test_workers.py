@@ -0,0 +1,34 @@
+import functools
+import unittest
+
+from lttng_listen import fake
+from lttng_listen.triggers import ConditionSpec
+from lttng_listen.workers import ShardedListener
+
+SCRIPT = [
+    "rotation-completed s0 1 /tmp/a",
+    "dropped",
+    "rotation-completed s1 1 /tmp/b",
+    "closed",
+]
+
+
+# Every worker plays the whole script.
+def load(lines):
+    ffi, ctl = fake.load()
+    ctl.player = fake.Player(ctl, list(fake.read_script(ctl, lines)))
+    return ffi, ctl
+
+
+class ShardedListenerTest(unittest.TestCase):
+    def test_closed(self):
+        specs = [ConditionSpec("rotation-completed", name) for name in ("s0", "s1")]
+        with ShardedListener(specs, 2, functools.partial(load, SCRIPT)) as listener:
+            received = [n for batch in listener.batches() for n in batch]
+            self.assertTrue(listener.closed)
+            self.assertEqual(listener.dropped, 2)
+        self.assertEqual(len(received), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()